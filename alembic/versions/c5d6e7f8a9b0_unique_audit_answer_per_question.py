@@ -0,0 +1,34 @@
+"""Make audit answers unique per (audit_id, question_id)
+
+Answer autosave (PATCH /audits/{id}/answers) looks answers up by audit and
+question and re-scores the audit from its answers; both were sequential
+scans of audit_answers.  Full audit updates upsert answers with
+INSERT ... ON CONFLICT on this constraint, whose index serves the lookups.
+Duplicate answers (a question sent twice in one payload) are removed first,
+keeping the most recent row; their photo rows go with them (ON DELETE CASCADE).
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-10-19 17:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d6e7f8a9b0'
+down_revision = 'b4c5d6e7f8a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM audit_answers a USING audit_answers b "
+        "WHERE a.audit_id = b.audit_id AND a.question_id = b.question_id AND a.id < b.id"
+    )
+    op.create_unique_constraint('uq_audit_answers_audit_question', 'audit_answers', ['audit_id', 'question_id'])
+
+
+def downgrade():
+    op.drop_constraint('uq_audit_answers_audit_question', 'audit_answers', type_='unique')
@@ -0,0 +1,103 @@
+"""Add photos table and backfill it from the photo_url JSON columns
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-19 09:12:00.000000
+
+Each entry of audits.photo_url / audit_answers.photo_url (a JSON array, or a
+legacy single path) becomes one row.  The hash is taken from content-addressed
+file names and the size from the file when it is present on this host;
+dimensions are filled in for new uploads only.
+"""
+import json
+import os
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a3b4c5d6e7'
+down_revision = 'e1f2a3b4c5d6'
+branch_labels = None
+depends_on = None
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+_BATCH = 1000
+
+
+def _parse(raw):
+    if not raw:
+        return []
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list):
+            return [u for u in parsed if isinstance(u, str)]
+    except (json.JSONDecodeError, TypeError):
+        pass
+    return [raw]
+
+
+def _row(audit_id, answer_id, position, url):
+    stem = os.path.splitext(os.path.basename(url))[0]
+    path = "app" + url if url.startswith("/static/") else url
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = None
+    return {
+        "audit_id": audit_id,
+        "answer_id": answer_id,
+        "position": position,
+        "path": url,
+        "hash": stem if _HASH_RE.match(stem) else None,
+        "size": size,
+    }
+
+
+def upgrade():
+    photos = op.create_table('photos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hash', sa.String(length=64), nullable=True),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('audit_id', sa.Integer(), nullable=False),
+        sa.Column('answer_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['audit_id'], ['audits.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['answer_id'], ['audit_answers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_photos_id'), 'photos', ['id'], unique=False)
+    op.create_index(op.f('ix_photos_hash'), 'photos', ['hash'], unique=False)
+    op.create_index(op.f('ix_photos_path'), 'photos', ['path'], unique=False)
+    op.create_index(op.f('ix_photos_audit_id'), 'photos', ['audit_id'], unique=False)
+    op.create_index(op.f('ix_photos_answer_id'), 'photos', ['answer_id'], unique=False)
+
+    # Backfill
+    conn = op.get_bind()
+    rows = []
+    result = conn.execute(sa.text("SELECT id, photo_url FROM audits WHERE photo_url IS NOT NULL"))
+    for audit_id, raw in result:
+        rows.extend(_row(audit_id, None, i, url) for i, url in enumerate(_parse(raw)))
+    result = conn.execute(sa.text(
+        "SELECT id, audit_id, photo_url FROM audit_answers "
+        "WHERE photo_url IS NOT NULL AND audit_id IS NOT NULL"
+    ))
+    for answer_id, audit_id, raw in result:
+        rows.extend(_row(audit_id, answer_id, i, url) for i, url in enumerate(_parse(raw)))
+    for start in range(0, len(rows), _BATCH):
+        op.bulk_insert(photos, rows[start:start + _BATCH])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_photos_answer_id'), table_name='photos')
+    op.drop_index(op.f('ix_photos_audit_id'), table_name='photos')
+    op.drop_index(op.f('ix_photos_path'), table_name='photos')
+    op.drop_index(op.f('ix_photos_hash'), table_name='photos')
+    op.drop_index(op.f('ix_photos_id'), table_name='photos')
+    op.drop_table('photos')
@@ -0,0 +1,30 @@
+"""Store the response headers of idempotency keys
+
+Revision ID: f8a9b0c1d2e3
+Revises: e7f8a9b0c1d2
+Create Date: 2026-10-19 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8a9b0c1d2e3'
+down_revision = 'e7f8a9b0c1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('idempotency_keys', sa.Column('response_headers', sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE idempotency_keys SET response_headers = json_build_array(json_build_array('content-type', content_type))::text "
+        "WHERE content_type IS NOT NULL"
+    )
+    op.drop_column('idempotency_keys', 'content_type')
+
+
+def downgrade():
+    op.add_column('idempotency_keys', sa.Column('content_type', sa.String(length=128), nullable=True))
+    op.drop_column('idempotency_keys', 'response_headers')
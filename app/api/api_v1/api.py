@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import auth, audits, kpi, users, coffees, categories, questions, notifications, user_rights, config, daily_logs
+from app.api.api_v1.endpoints import auth, audits, kpi, users, coffees, categories, questions, notifications, user_rights, config, daily_logs, diagnostics, jobs, photos
 
 api_router = APIRouter()
 api_router.include_router(auth.router, tags=["login"])
@@ -13,3 +13,6 @@ api_router.include_router(notifications.router, prefix="/notifications", tags=["
 api_router.include_router(user_rights.router, prefix="/user-rights", tags=["user-rights"])
 api_router.include_router(config.router, prefix="/config", tags=["config"])
 api_router.include_router(daily_logs.router, prefix="/daily-logs", tags=["daily-logs"])
+api_router.include_router(photos.router, prefix="/photos", tags=["photos"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(diagnostics.router, prefix="/diagnostics", tags=["diagnostics"])
@@ -1,28 +1,42 @@
+import asyncio
 import json
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 
 from app.api import deps
-from app.models.models import Audit, AuditAnswer, AuditQuestion, AuditCategory, AuditStatus, User, UserRole, Coffee, CoffeeSchedule
+from app.core import admission as admission_control, metrics
+from app.core.query_stats import query_budget
+from app.models.models import Audit, AuditAnswer, AuditQuestion, AuditCategory, AuditStatus, User, UserRole, Coffee, CoffeeSchedule, ConformityThreshold
 from app.schemas import schemas
-from app.utils.image_utils import save_base64_image
-from app.utils.pdf_generator import generate_audit_pdf
+from app.core.config import settings
+from app.services import image_ingest, jobs, pdf_cache, pdf_export, pdf_render, photo_refs
+from app.utils.pdf_generator import audit_snapshot
 
 
-def _save_photo_list(photo_data_list: list[str] | None) -> str | None:
+async def _save_photo_list(photo_data_list: list[str] | None) -> str | None:
     """Save a list of base64 images and return a JSON array of URLs.
-    Correctly retains existing image HTTP URLs without breaking."""
+    Correctly retains existing image HTTP URLs without breaking.
+    New images are decoded and written in parallel off the event loop."""
     if not photo_data_list:
         return None
+    new_images = [item for item in photo_data_list if item.startswith("data:")]
+    saved = iter(await image_ingest.save_images(new_images))
+
     urls = []
     for item in photo_data_list:
         if item.startswith("data:"):
-            url = save_base64_image(item)
+            url = next(saved)
             if url:
                 urls.append(url)
         else:
@@ -36,7 +50,7 @@ def _save_photo_list(photo_data_list: list[str] | None) -> str | None:
     return json.dumps(urls) if urls else None
 
 
-def _merge_photo_urls(
+async def _merge_photo_urls(
     existing_photo_urls: list[str] | None,
     new_photo_data: list[str] | None,
 ) -> str | None:
@@ -60,16 +74,162 @@ def _merge_photo_urls(
 
     # Save new base64 photos and add their URLs
     if new_photo_data:
-        for b64 in new_photo_data:
-            url = save_base64_image(b64)
-            if url:
-                all_urls.append(url)
+        all_urls.extend(url for url in await image_ingest.save_images(new_photo_data) if url)
 
     return json.dumps(all_urls) if all_urls else None
 
+
+async def _save_audit_photos(audit_in, answers) -> tuple[str | None, list[str | None]]:
+    """Store the general photos and every answer's photos of an audit concurrently.
+
+    Returns the audit-level photo_url and one photo_url per answer (same order).
+    """
+    general, per_answer = await asyncio.gather(
+        _merge_photo_urls(audit_in.existing_photo_urls, audit_in.photo_data),
+        asyncio.gather(*(_save_photo_list(answer.photo_data) for answer in answers)),
+    )
+    return general, list(per_answer)
+
+# Stored answer columns a full update may change
+_ANSWER_FIELDS = ("value", "choice", "comment", "photo_url")
+
+
+def _answer_value(question: AuditQuestion, choice: str | None) -> int:
+    """Points scored by ``choice`` on ``question`` (wrong answers and N/A score 0)."""
+    user_choice = choice.lower() if choice else ""
+    correct_ans = question.correct_answer.lower() if question.correct_answer else "oui"
+    if user_choice != "n/a" and user_choice == correct_ans:
+        return question.weight or 1
+    return 0
+
+
+async def _audit_score(db: AsyncSession, audit_id: int) -> float:
+    """Percentage score of an audit from its stored answer values, in one query.
+
+    Same rule as the full computation: N/A answers count neither in the
+    points scored nor in the points possible.
+    """
+    counted = func.lower(func.coalesce(AuditAnswer.choice, "")) != "n/a"
+    scored, possible = (await db.execute(
+        select(
+            func.sum(AuditAnswer.value).filter(counted),
+            func.sum(func.coalesce(func.nullif(AuditQuestion.weight, 0), 1)).filter(counted),
+        )
+        .join(AuditQuestion, AuditQuestion.id == AuditAnswer.question_id)
+        .where(AuditAnswer.audit_id == audit_id)
+    )).one()
+    if not possible:
+        return 0.0
+    return round(((scored or 0) / possible) * 100, 2)
+
 router = APIRouter()
 
+def _audit_access_conditions(current_user: User) -> list | None:
+    """Conditions restricting audit lists to what the user may read (None: nothing).
+    - Admin/Boss: All audits
+    - Auditor: Own audits
+    - Manager: Audits for their managed coffees
+    - Viewer: Audits for their assigned coffee
+    """
+    has_read_rights = current_user.rights and current_user.rights.audits_read
+
+    if current_user.role in (UserRole.ADMIN, UserRole.BOSS):
+        return []
+    elif current_user.role == UserRole.AUDITOR:
+        return [Audit.auditor_id == current_user.id]
+    elif has_read_rights:
+        return []
+    elif current_user.role == UserRole.MANAGER:
+        managed_ids = [c.id for c in current_user.managed_coffees] if current_user.managed_coffees else []
+        if not managed_ids:
+            return None
+        return [Audit.coffee_id.in_(managed_ids)]
+    elif current_user.role == UserRole.VIEWER:
+        if not current_user.coffee_id:
+            return None
+        return [Audit.coffee_id == current_user.coffee_id]
+    return None
+
+
+def _parse_filter_date(value: str | None):
+    """Date of an ISO datetime or YYYY-MM-DD query value (None if absent or invalid)."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+    except ValueError:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+
+
+def _audit_filters(
+    base_conditions: list,
+    *,
+    search: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    coffee_id: int | None = None,
+    coffee_shop: str | None = None,
+    auditor_id: int | None = None,
+    auditor_name: str | None = None,
+):
+    """Filters shared by GET /audits and its exports.
+
+    Adds the date / scalar conditions to ``base_conditions`` (the caller's
+    access-control conditions) and returns a function applying joins,
+    conditions and text filters to any SELECT.
+    """
+    from sqlalchemy import and_, or_
+    from app.models.models import User as DBUser
+
+    conditions = list(base_conditions)
+    start = _parse_filter_date(start_date)
+    if start:
+        conditions.append(Audit.date >= start)
+    end = _parse_filter_date(end_date)
+    if end:
+        conditions.append(Audit.date <= end)
+    if coffee_id:
+        conditions.append(Audit.coffee_id == coffee_id)
+    if auditor_id:
+        conditions.append(Audit.auditor_id == auditor_id)
+
+    need_coffee_join  = bool(coffee_shop or search)
+    need_auditor_join = bool(auditor_name or search)
+
+    def _build(base_select):
+        """Apply joins, conditions, and text-filters to any SELECT."""
+        q = base_select
+        if need_coffee_join:
+            q = q.join(Coffee, Audit.coffee_id == Coffee.id)
+        if need_auditor_join:
+            q = q.join(DBUser, Audit.auditor_id == DBUser.id)
+        if conditions:
+            q = q.where(and_(*conditions))
+        if coffee_shop:
+            q = q.where(Coffee.name == coffee_shop)
+        if auditor_name:
+            q = q.where(
+                (DBUser.full_name == auditor_name) | (DBUser.email == auditor_name)
+            )
+        if search:
+            s = f"%{search.lower()}%"
+            q = q.where(
+                or_(
+                    func.lower(Coffee.name).like(s),
+                    func.lower(func.coalesce(DBUser.full_name, "")).like(s),
+                    func.lower(DBUser.email).like(s),
+                )
+            )
+        return q
+
+    return _build
+
+
 @router.get("", response_model=schemas.AuditListResponse)
+@query_budget(12)
 async def read_audits(
     db: AsyncSession = Depends(deps.get_db),
     page: int = 1,
@@ -92,9 +252,6 @@ async def read_audits(
     """
     try:
         import math
-        from datetime import datetime
-        from sqlalchemy import func, and_, or_
-        from app.models.models import Coffee, User as DBUser
 
         empty_response = {
             "items": [], "total": 0, "page": page,
@@ -102,85 +259,17 @@ async def read_audits(
         }
 
         # ── 1. Access-control conditions ──────────────────────────────────
-        base_conditions = []
-        has_read_rights = current_user.rights and current_user.rights.audits_read
-
-        if current_user.role in (UserRole.ADMIN, UserRole.BOSS):
-            pass
-        elif current_user.role == UserRole.AUDITOR:
-            base_conditions.append(Audit.auditor_id == current_user.id)
-        elif has_read_rights:
-            pass
-        elif current_user.role == UserRole.MANAGER:
-            managed_ids = [c.id for c in current_user.managed_coffees] if current_user.managed_coffees else []
-            if not managed_ids:
-                return empty_response
-            base_conditions.append(Audit.coffee_id.in_(managed_ids))
-        elif current_user.role == UserRole.VIEWER:
-            if not current_user.coffee_id:
-                return empty_response
-            base_conditions.append(Audit.coffee_id == current_user.coffee_id)
-        else:
+        base_conditions = _audit_access_conditions(current_user)
+        if base_conditions is None:
             return empty_response
 
-        # ── 2. Date / scalar filter conditions ────────────────────────────
-        if start_date:
-            try:
-                dt = datetime.fromisoformat(start_date.replace("Z", "+00:00")).date()
-                base_conditions.append(Audit.date >= dt)
-            except ValueError:
-                try:
-                    dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-                    base_conditions.append(Audit.date >= dt)
-                except ValueError:
-                    pass
-
-        if end_date:
-            try:
-                dt = datetime.fromisoformat(end_date.replace("Z", "+00:00")).date()
-                base_conditions.append(Audit.date <= dt)
-            except ValueError:
-                try:
-                    dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-                    base_conditions.append(Audit.date <= dt)
-                except ValueError:
-                    pass
-
-        if coffee_id:
-            base_conditions.append(Audit.coffee_id == coffee_id)
-
-        if auditor_id:
-            base_conditions.append(Audit.auditor_id == auditor_id)
-
-        # ── 3. Determine which JOINs are required ─────────────────────────
-        need_coffee_join  = bool(coffee_shop or search)
-        need_auditor_join = bool(auditor_name or search)
-
-        def _build(base_select):
-            """Apply joins, conditions, and text-filters to any SELECT."""
-            q = base_select
-            if need_coffee_join:
-                q = q.join(Coffee, Audit.coffee_id == Coffee.id)
-            if need_auditor_join:
-                q = q.join(DBUser, Audit.auditor_id == DBUser.id)
-            if base_conditions:
-                q = q.where(and_(*base_conditions))
-            if coffee_shop:
-                q = q.where(Coffee.name == coffee_shop)
-            if auditor_name:
-                q = q.where(
-                    (DBUser.full_name == auditor_name) | (DBUser.email == auditor_name)
-                )
-            if search:
-                s = f"%{search.lower()}%"
-                q = q.where(
-                    or_(
-                        func.lower(Coffee.name).like(s),
-                        func.lower(func.coalesce(DBUser.full_name, "")).like(s),
-                        func.lower(DBUser.email).like(s),
-                    )
-                )
-            return q
+        # ── 2. Filters + required JOINs ────────────────────────────────────
+        _build = _audit_filters(
+            base_conditions,
+            search=search, start_date=start_date, end_date=end_date,
+            coffee_id=coffee_id, coffee_shop=coffee_shop,
+            auditor_id=auditor_id, auditor_name=auditor_name,
+        )
 
         # ── 4. COUNT + AVG query ───────────────────────────────────────────
         count_q = _build(
@@ -225,6 +314,7 @@ async def read_audits(
 
 
 @router.post("", response_model=schemas.AuditResponse)
+@query_budget(11)
 async def create_audit(
     *,
     db: AsyncSession = Depends(deps.get_db),
@@ -243,99 +333,99 @@ async def create_audit(
         if not can_create:
             raise HTTPException(status_code=403, detail="Not enough permissions")
 
-        photo_url = _merge_photo_urls(audit_in.existing_photo_urls, audit_in.photo_data)
-
-        audit = Audit(
-            coffee_id=audit_in.coffee_id,
-            auditor_id=current_user.id,
-            date=audit_in.date,
-            score=0.0,
-            status=audit_in.status or AuditStatus.IN_PROGRESS,
-            shift=audit_in.shift,
-            staff_present=audit_in.staff_present,
-            actions_correctives=audit_in.actions_correctives,
-            training_needs=audit_in.training_needs,
-            purchases=audit_in.purchases,
-            conclusion=audit_in.conclusion,
-            photo_url=photo_url
-        )
-        db.add(audit)
-        await db.commit()
-        await db.refresh(audit)
-        
-        # Calculate weighted score
-        total_weighted_score = 0
-        total_max_weighted_score = 0
-        
-        # Batch fetch all questions to avoid N+1 queries during autosave
+        # Questions with their category (and its questions, for total_score):
+        # everything the response needs besides the coffee
         question_ids = [ans.question_id for ans in audit_in.answers if ans.question_id]
         questions_map = {}
         if question_ids:
-            q_result = await db.execute(select(AuditQuestion).where(AuditQuestion.id.in_(question_ids)))
+            q_result = await db.execute(
+                select(AuditQuestion)
+                .options(joinedload(AuditQuestion.category).selectinload(AuditCategory.questions))
+                .where(AuditQuestion.id.in_(question_ids))
+            )
             questions_map = {q.id: q for q in q_result.scalars().all()}
-        
+
         for answer in audit_in.answers:
-            question = questions_map.get(answer.question_id)
-            
-            if not question:
+            if answer.question_id not in questions_map:
                 print(f"Skipping invalid question_id: {answer.question_id}")
-                continue
-
-            if question:
-                weight = question.weight or 1
-                
-                user_choice = answer.choice.lower() if answer.choice else ""
-                correct_ans = question.correct_answer.lower() if question.correct_answer else "oui"
-                
-                calculated_value = 0
-                max_score_possible = weight 
-
-                if user_choice == 'n/a':
-                     # New Logic: N/A skips the question entirely from scoring
-                     # We store 0 for value, and do NOT add to totals
-                     calculated_value = 0
-                else:
-                    # Normal scoring
-                    if user_choice == correct_ans:
-                        calculated_value = weight
-                    else:
-                        calculated_value = 0
-                    
-                    total_weighted_score += calculated_value
-                    total_max_weighted_score += max_score_possible
-            else:
-                # Should not happen due to 'if not question: continue' check, but safe default
-                calculated_value = 0
-
-            answer_photo_url = _save_photo_list(answer.photo_data)
-
-            db_answer = AuditAnswer(
-                audit_id=audit.id,
-                question_id=answer.question_id,
-                value=calculated_value,
-                choice=answer.choice,
-                comment=answer.comment,
-                photo_url=answer_photo_url
-            )
-            db.add(db_answer)
-        
-        # Calculate percentage score
+        # One answer per question (the last one sent wins)
+        valid_answers = list({
+            ans.question_id: ans for ans in audit_in.answers if ans.question_id in questions_map
+        }.values())
+
+        c_result = await db.execute(
+            select(Coffee).options(joinedload(Coffee.schedules)).where(Coffee.id == audit_in.coffee_id)
+        )
+        coffee = c_result.unique().scalars().first()
+        if not coffee:
+            raise HTTPException(status_code=404, detail="Coffee not found")
+
+        # Decode and store every photo of the audit in parallel, off the event loop
+        photo_url, answer_photo_urls = await _save_audit_photos(audit_in, valid_answers)
+
+        # Calculate weighted score (N/A answers are left out of both totals)
+        total_weighted_score = 0
+        total_max_weighted_score = 0
+        answer_rows = []
+        for answer, answer_photo_url in zip(valid_answers, answer_photo_urls):
+            question = questions_map[answer.question_id]
+            calculated_value = _answer_value(question, answer.choice)
+            if (answer.choice or "").lower() != "n/a":
+                total_weighted_score += calculated_value
+                total_max_weighted_score += question.weight or 1
+            answer_rows.append({
+                "question_id": answer.question_id,
+                "value": calculated_value,
+                "choice": answer.choice,
+                "comment": answer.comment,
+                "photo_url": answer_photo_url,
+            })
+
         if total_max_weighted_score > 0:
-            audit.score = round((total_weighted_score / total_max_weighted_score) * 100, 2)
+            score = round((total_weighted_score / total_max_weighted_score) * 100, 2)
         else:
-            audit.score = 0.0
-        
+            score = 0.0
+
+        # One transaction: the audit row, then every answer in one multi-row
+        # INSERT; RETURNING gives back the rows with their ids and defaults
+        audit = await db.scalar(
+            insert(Audit).values(
+                coffee_id=audit_in.coffee_id,
+                auditor_id=current_user.id,
+                date=audit_in.date,
+                score=score,
+                status=audit_in.status or AuditStatus.IN_PROGRESS,
+                shift=audit_in.shift,
+                staff_present=audit_in.staff_present,
+                actions_correctives=audit_in.actions_correctives,
+                training_needs=audit_in.training_needs,
+                purchases=audit_in.purchases,
+                conclusion=audit_in.conclusion,
+                photo_url=photo_url,
+            ).returning(Audit)
+        )
+        db_answers = []
+        if answer_rows:
+            for row in answer_rows:
+                row["audit_id"] = audit.id
+            a_result = await db.scalars(
+                insert(AuditAnswer).returning(AuditAnswer, sort_by_parameter_order=True),
+                answer_rows,
+            )
+            db_answers = a_result.all()
+
+        if photo_url or any(answer_photo_urls):
+            await photo_refs.sync_audit_photos(db, audit, db_answers)
+
         await db.commit()
-        await db.refresh(audit)
-        
-        # Reload for response
-        query = select(Audit).options(
-            selectinload(Audit.coffee).selectinload(Coffee.schedules),
-            selectinload(Audit.auditor),
-            selectinload(Audit.answers).selectinload(AuditAnswer.question).selectinload(AuditQuestion.category).selectinload(AuditCategory.questions)
-        ).where(Audit.id == audit.id)
-        result = await db.execute(query)
-        return result.scalars().first()
+
+        # Build the response from what is already loaded instead of re-selecting
+        for db_answer in db_answers:
+            set_committed_value(db_answer, "question", questions_map[db_answer.question_id])
+        set_committed_value(audit, "coffee", coffee)
+        set_committed_value(audit, "auditor", current_user)
+        set_committed_value(audit, "answers", list(db_answers))
+        return audit
     except HTTPException:
         raise
     except Exception as e:
@@ -343,7 +433,8 @@ async def create_audit(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error creating audit: {str(e)}")
 
-@router.get("/export-excel")
+@router.get("/export-excel", dependencies=[Depends(deps.admission("export", route="audits_excel"))])
+@metrics.timed(metrics.EXPORT_DURATION, kind="audits_excel")
 async def export_audits_excel(
     db: AsyncSession = Depends(deps.get_db),
     search: str | None = None,
@@ -359,9 +450,7 @@ async def export_audits_excel(
     Export audits in Excel format.
     """
     try:
-        from datetime import datetime
-        from sqlalchemy import func, and_, or_
-        from app.models.models import Coffee, User as DBUser, ConformityThreshold, AuditStatus
+        from app.models.models import ConformityThreshold, AuditStatus
         
         # ── 1. Access-control conditions ──────────────────────────────────
         base_conditions = []
@@ -385,62 +474,13 @@ async def export_audits_excel(
         else:
             raise HTTPException(status_code=403, detail="Accès non autorisé.")
 
-        # ── 2. Date / scalar filter conditions ────────────────────────────
-        if start_date:
-            try:
-                dt = datetime.fromisoformat(start_date.replace("Z", "+00:00")).date()
-                base_conditions.append(Audit.date >= dt)
-            except ValueError:
-                try:
-                    dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-                    base_conditions.append(Audit.date >= dt)
-                except ValueError:
-                    pass
-
-        if end_date:
-            try:
-                dt = datetime.fromisoformat(end_date.replace("Z", "+00:00")).date()
-                base_conditions.append(Audit.date <= dt)
-            except ValueError:
-                try:
-                    dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-                    base_conditions.append(Audit.date <= dt)
-                except ValueError:
-                    pass
-
-        if coffee_id:
-            base_conditions.append(Audit.coffee_id == coffee_id)
-
-        if auditor_id:
-            base_conditions.append(Audit.auditor_id == auditor_id)
-
-        need_coffee_join  = bool(coffee_shop or search)
-        need_auditor_join = bool(auditor_name or search)
-
-        def _build(base_select):
-            q = base_select
-            if need_coffee_join:
-                q = q.join(Coffee, Audit.coffee_id == Coffee.id)
-            if need_auditor_join:
-                q = q.join(DBUser, Audit.auditor_id == DBUser.id)
-            if base_conditions:
-                q = q.where(and_(*base_conditions))
-            if coffee_shop:
-                q = q.where(Coffee.name == coffee_shop)
-            if auditor_name:
-                q = q.where(
-                    (DBUser.full_name == auditor_name) | (DBUser.email == auditor_name)
-                )
-            if search:
-                s = f"%{search.lower()}%"
-                q = q.where(
-                    or_(
-                        func.lower(Coffee.name).like(s),
-                        func.lower(func.coalesce(DBUser.full_name, "")).like(s),
-                        func.lower(DBUser.email).like(s),
-                    )
-                )
-            return q
+        # ── 2. Filters + required JOINs ────────────────────────────────────
+        _build = _audit_filters(
+            base_conditions,
+            search=search, start_date=start_date, end_date=end_date,
+            coffee_id=coffee_id, coffee_shop=coffee_shop,
+            auditor_id=auditor_id, auditor_name=auditor_name,
+        )
 
         # ── 3. Query all filtered audits (non-paginated) ──────────────────
         data_q = _build(
@@ -613,7 +653,96 @@ async def export_audits_excel(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+jobs.register("audits_excel", export_audits_excel)
+
+
+async def _audits_pdf_zip(db: AsyncSession, current_user: User, admit: bool, **filters) -> StreamingResponse:
+    base_conditions = _audit_access_conditions(current_user)
+    if base_conditions is None:
+        raise HTTPException(status_code=403, detail="Accès non autorisé.")
+    _build = _audit_filters(base_conditions, **filters)
+
+    result = await db.execute(
+        _build(select(Audit.id)).order_by(Audit.date.desc(), Audit.created_at.desc())
+        .limit(settings.PDF_ZIP_MAX_AUDITS + 1)
+    )
+    audit_ids = list(result.scalars().all())
+    if not audit_ids:
+        raise HTTPException(status_code=404, detail="Aucun audit ne correspond aux filtres.")
+    if len(audit_ids) > settings.PDF_ZIP_MAX_AUDITS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Plus de {settings.PDF_ZIP_MAX_AUDITS} audits correspondent aux filtres, veuillez les affiner.",
+        )
+
+    slot = AsyncExitStack()
+    if admit:
+        try:
+            await slot.enter_async_context(admission_control.admit("export", current_user.id, "audits_pdf_zip"))
+        except admission_control.AdmissionRejected as e:
+            raise deps.admission_rejected(e)
+
+    filename = f"audits_pdf_{datetime.now().strftime('%Y-%m-%d')}.zip"
+    return StreamingResponse(
+        pdf_export.stream_audit_pdfs_zip(audit_ids, slot),
+        media_type="application/zip",
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+        # Releases the slot if the client is gone before the stream started
+        background=BackgroundTask(slot.aclose),
+    )
+
+
+@router.get("/export-pdf-zip")
+async def export_audits_pdf_zip(
+    db: AsyncSession = Depends(deps.get_db),
+    search: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    coffee_id: int | None = None,
+    coffee_shop: str | None = None,
+    auditor_id: int | None = None,
+    auditor_name: str | None = None,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Download the PDF reports of all audits matching the GET /audits filters as
+    one ZIP, streamed while the PDFs are rendered (PDF_ZIP_CONCURRENCY at a time).
+    The "export" admission slot is taken here (429 when none frees up) and held
+    until the stream ends.
+    """
+    return await _audits_pdf_zip(
+        db, current_user, admit=True,
+        search=search, start_date=start_date, end_date=end_date,
+        coffee_id=coffee_id, coffee_shop=coffee_shop,
+        auditor_id=auditor_id, auditor_name=auditor_name,
+    )
+
+
+async def _audits_pdf_zip_job(
+    db: AsyncSession,
+    current_user: User,
+    search: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    coffee_id: int | None = None,
+    coffee_shop: str | None = None,
+    auditor_id: int | None = None,
+    auditor_name: str | None = None,
+) -> StreamingResponse:
+    # Jobs are already throttled by JOB_CONCURRENCY: don't compete with the
+    # user's own downloads for the export slot (a 429 would fail the job for good).
+    return await _audits_pdf_zip(
+        db, current_user, admit=False,
+        search=search, start_date=start_date, end_date=end_date,
+        coffee_id=coffee_id, coffee_shop=coffee_shop,
+        auditor_id=auditor_id, auditor_name=auditor_name,
+    )
+
+jobs.register("audits_pdf_zip", _audits_pdf_zip_job)
+
+
 @router.get("/{audit_id}", response_model=schemas.AuditResponse)
+@query_budget(11)
 async def read_audit(
     *,
     db: AsyncSession = Depends(deps.get_db),
@@ -658,50 +787,86 @@ async def download_audit_pdf(
     *,
     db: AsyncSession = Depends(deps.get_db),
     audit_id: int,
+    request: Request,
     current_user: User = Depends(deps.get_current_user),
 ) -> Response:
     """
     Get audit report as PDF.
+    Rendered PDFs are cached per audit version; the version is also the ETag,
+    so a repeated download with If-None-Match gets a 304.
     """
-    query = select(Audit).options(
-        selectinload(Audit.coffee).selectinload(Coffee.schedules),
-        selectinload(Audit.auditor),
-        selectinload(Audit.answers).selectinload(AuditAnswer.question).selectinload(AuditQuestion.category).selectinload(AuditCategory.questions)
-    ).where(Audit.id == audit_id)
-    
-    result = await db.execute(query)
-    audit = result.scalars().first()
+    # Only what the permission check and the cache key need; the full audit
+    # is loaded on a cache miss
+    result = await db.execute(
+        select(Audit.auditor_id, Audit.coffee_id, Audit.created_at, Audit.updated_at, Coffee.name)
+        .outerjoin(Coffee, Coffee.id == Audit.coffee_id)
+        .where(Audit.id == audit_id)
+    )
+    row = result.first()
     
-    if not audit:
+    if not row:
         raise HTTPException(status_code=404, detail="Audit not found")
         
     if current_user.role in (UserRole.ADMIN, UserRole.BOSS):
         pass
     elif current_user.role == UserRole.AUDITOR:
-        if audit.auditor_id != current_user.id:
+        if row.auditor_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized to view this audit")
     elif current_user.role == UserRole.MANAGER:
         managed_ids = [c.id for c in current_user.managed_coffees] if current_user.managed_coffees else []
-        if audit.coffee_id not in managed_ids:
+        if row.coffee_id not in managed_ids:
             raise HTTPException(status_code=403, detail="Not authorized to view this audit")
     elif current_user.role == UserRole.VIEWER:
-        if audit.coffee_id != current_user.coffee_id:
+        if row.coffee_id != current_user.coffee_id:
             raise HTTPException(status_code=403, detail="Not authorized to view this audit")
 
+    thresholds_updated_at = await db.scalar(select(func.max(ConformityThreshold.updated_at)))
+    version = pdf_cache.audit_version(row.updated_at or row.created_at, thresholds_updated_at)
+    etag = f'"{audit_id}-{version}"'
+    filename = f"audit_{row.name}_{row.created_at.strftime('%Y%m%d') if row.created_at else 'report'}.pdf"
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'ETag': etag,
+        'Cache-Control': 'private, no-cache',
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
+    cached_path = await pdf_cache.lookup(audit_id, version)
+    if cached_path:
+        return FileResponse(cached_path, media_type="application/pdf", headers=headers)
+
+    query = select(Audit).options(
+        selectinload(Audit.coffee),
+        selectinload(Audit.auditor),
+        selectinload(Audit.answers).selectinload(AuditAnswer.question).selectinload(AuditQuestion.category)
+    ).where(Audit.id == audit_id)
+    result = await db.execute(query)
+    audit = result.scalars().first()
+    if not audit:
+        raise HTTPException(status_code=404, detail="Audit not found")
+
     try:
-        pdf_bytes = generate_audit_pdf(audit)
-        
-        filename = f"audit_{audit.coffee.name}_{audit.created_at.strftime('%Y%m%d') if audit.created_at else 'report'}.pdf"
-        headers = {
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
-        return Response(content=bytes(pdf_bytes), media_type="application/pdf", headers=headers)
+        # Rendered in the PDF process pool; the event loop stays free meanwhile
+        pdf_bytes = await pdf_render.render_audit_pdf(audit_snapshot(audit))
+        await pdf_cache.store(audit_id, version, pdf_bytes)
+        return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+    except pdf_render.PdfBusy:
+        raise HTTPException(
+            status_code=429, detail="Too many PDF reports are being generated, retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    except pdf_render.PdfTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
 @router.put("/{id}", response_model=schemas.AuditResponse)
+@query_budget(30)
 async def update_audit(
     *,
     db: AsyncSession = Depends(deps.get_db),
@@ -714,6 +879,11 @@ async def update_audit(
     - Admin can update any audit (including completed ones).
     - Auditor can only update their own IN_PROGRESS audits.
     """
+    if audit_in.answers is not None:
+        # Serialise with answer autosaves (PATCH /answers) of the same audit,
+        # before the stored answers are read for the diff
+        await db.execute(select(Audit.id).where(Audit.id == id).with_for_update())
+
     query = select(Audit).options(
         selectinload(Audit.coffee).selectinload(Coffee.schedules),
         selectinload(Audit.auditor),
@@ -754,23 +924,14 @@ async def update_audit(
     if audit_in.conclusion is not None:
         audit.conclusion = audit_in.conclusion
     # Merge existing photo URLs with any new uploads
-    if audit_in.photo_data is not None or audit_in.existing_photo_urls is not None:
-        merged = _merge_photo_urls(audit_in.existing_photo_urls, audit_in.photo_data)
+    photos_changed = audit_in.photo_data is not None or audit_in.existing_photo_urls is not None
+    if photos_changed:
+        merged = await _merge_photo_urls(audit_in.existing_photo_urls, audit_in.photo_data)
         audit.photo_url = merged
 
-    # If answers provided, replace logic
+    # If answers provided they are the full answer set: diff them with the
+    # stored ones and write only what changed (row ids and photos are kept)
     if audit_in.answers is not None:
-        # Delete old answers
-        # Simple approach: delete all DB answers for this audit
-        # In async sqlalchemy this is delete(AuditAnswer).where(AuditAnswer.audit_id == id)
-        # But we loaded them via selectinload, so usage of relationship might interfere or be updated?
-        # Let's try explicit delete query
-        from sqlalchemy import delete
-        await db.execute(delete(AuditAnswer).where(AuditAnswer.audit_id == id))
-        
-        total_weighted_score = 0
-        total_max_weighted_score = 0
-
         # Batch fetch all questions to avoid N+1 queries during autosave
         question_ids = [ans.question_id for ans in audit_in.answers if ans.question_id]
         questions_map = {}
@@ -779,60 +940,147 @@ async def update_audit(
             questions_map = {q.id: q for q in q_result.scalars().all()}
 
         for answer in audit_in.answers:
-            question = questions_map.get(answer.question_id)
-            
-            if not question:
+            if answer.question_id not in questions_map:
                 print(f"Skipping invalid question_id in update: {answer.question_id}")
-                continue
-
-            if question:
-                weight = question.weight or 1
-                max_score_possible = weight 
-                
-                user_choice = answer.choice.lower() if answer.choice else ""
-                correct_ans = question.correct_answer.lower() if question.correct_answer else "oui"
-
-                calculated_value = 0
-
-                if user_choice == 'n/a':
-                     # New Logic: N/A skips scoring
-                     calculated_value = 0
-                else:
-                    if user_choice == correct_ans:
-                         calculated_value = weight
-                    else:
-                         calculated_value = 0
-                    
-                    total_weighted_score += calculated_value
-                    total_max_weighted_score += max_score_possible
-            else:
-                 calculated_value = 0
+        # One answer per question (the last one sent wins)
+        answers_in = {ans.question_id: ans for ans in audit_in.answers if ans.question_id in questions_map}
 
+        # Decode and store new answer photos in parallel, off the event loop
+        # (lists of already stored URLs are only normalised)
+        answer_photo_urls = await asyncio.gather(
+            *(_save_photo_list(answer.photo_data) for answer in answers_in.values())
+        )
 
-            db_answer = AuditAnswer(
-                audit_id=audit.id,
-                question_id=answer.question_id,
-                value=calculated_value,
-                choice=answer.choice,
-                comment=answer.comment,
-                photo_url=_save_photo_list(answer.photo_data)
+        stored = {answer.question_id: answer for answer in audit.answers}
+        total_weighted_score = 0
+        total_max_weighted_score = 0
+        changed_rows = []
+        photo_question_ids = set()
+        for answer, answer_photo_url in zip(answers_in.values(), answer_photo_urls):
+            question = questions_map[answer.question_id]
+            calculated_value = _answer_value(question, answer.choice)
+            if (answer.choice or "").lower() != "n/a":
+                total_weighted_score += calculated_value
+                total_max_weighted_score += question.weight or 1
+
+            row = {
+                "audit_id": audit.id,
+                "question_id": answer.question_id,
+                "value": calculated_value,
+                "choice": answer.choice,
+                "comment": answer.comment,
+                "photo_url": answer_photo_url,
+            }
+            current = stored.get(answer.question_id)
+            if current is None or any(getattr(current, key) != row[key] for key in _ANSWER_FIELDS):
+                changed_rows.append(row)
+            if (current.photo_url if current is not None else None) != answer_photo_url:
+                photo_question_ids.add(answer.question_id)
+
+        removed_ids = [answer.id for qid, answer in stored.items() if qid not in answers_in]
+        if removed_ids:
+            # Their photo rows go with them (ON DELETE CASCADE)
+            await db.execute(delete(AuditAnswer).where(AuditAnswer.id.in_(removed_ids)))
+        if changed_rows:
+            stmt = pg_insert(AuditAnswer).values(changed_rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AuditAnswer.audit_id, AuditAnswer.question_id],
+                set_={key: stmt.excluded[key] for key in _ANSWER_FIELDS},
+            ).returning(AuditAnswer)
+            upserted = (await db.scalars(stmt, execution_options={"populate_existing": True})).all()
+            await photo_refs.sync_answer_photos(
+                db, audit.id, [answer for answer in upserted if answer.question_id in photo_question_ids]
             )
-            db.add(db_answer)
-        
+
         # Calculate percentage score
         if total_max_weighted_score > 0:
             audit.score = round((total_weighted_score / total_max_weighted_score) * 100, 2)
         else:
             audit.score = 0.0
 
-    
+    if photos_changed:
+        await photo_refs.sync_audit_photos(db, audit)
+
+    # Set explicitly: answer-only edits do not touch the audits row, and
+    # updated_at is the version of the cached PDF
+    audit.updated_at = datetime.now(timezone.utc)
     await db.commit()
-    await db.refresh(audit)
-    
-    # Re-fetch for response with eager loading to be safe
-    result = await db.execute(query)
+    await pdf_cache.invalidate(id)
+
+    # Re-fetch for response: the answers were written with Core statements
+    result = await db.execute(query.execution_options(populate_existing=True))
     return result.scalars().first()
 
+@router.patch("/{id}/answers", response_model=schemas.AuditScoreResponse)
+@query_budget(12)
+async def patch_audit_answers(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    id: int,
+    patch_in: schemas.AuditAnswersPatch,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Autosave one answer (or a few): each is inserted or updated by question,
+    fields left out of an answer are kept, and only the photos of the answers
+    sent are processed.  Returns the audit's new score.
+    Same permissions as PUT /audits/{id}.
+    """
+    # Row lock: concurrent autosaves of one audit are applied one at a time,
+    # so no answer is inserted twice and the score matches the stored answers
+    result = await db.execute(select(Audit).where(Audit.id == id).with_for_update())
+    audit = result.scalars().first()
+    if not audit:
+        raise HTTPException(status_code=404, detail="Audit not found")
+
+    is_owner = audit.auditor_id == current_user.id
+    has_update_rights = current_user.rights and current_user.rights.audits_update
+    if current_user.role != UserRole.ADMIN and not has_update_rights and not is_owner:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    answers_in = {answer.question_id: answer for answer in patch_in.answers}   # last one wins
+    q_result = await db.execute(select(AuditQuestion).where(AuditQuestion.id.in_(list(answers_in))))
+    questions_map = {q.id: q for q in q_result.scalars().all()}
+    unknown = sorted(set(answers_in) - set(questions_map))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Questions introuvables: {unknown}")
+
+    a_result = await db.execute(
+        select(AuditAnswer)
+        .where(AuditAnswer.audit_id == id, AuditAnswer.question_id.in_(list(answers_in)))
+        .order_by(AuditAnswer.id)
+    )
+    existing = {answer.question_id: answer for answer in a_result.scalars().all()}
+
+    # Decode and store the photos of these answers only, in parallel
+    with_photos = [qid for qid, answer in answers_in.items() if "photo_data" in answer.model_fields_set]
+    saved_photos = await asyncio.gather(*(_save_photo_list(answers_in[qid].photo_data) for qid in with_photos))
+    photo_urls = dict(zip(with_photos, saved_photos))
+
+    photos_changed = []
+    for question_id, answer_in in answers_in.items():
+        db_answer = existing.get(question_id)
+        if db_answer is None:
+            db_answer = AuditAnswer(audit_id=id, question_id=question_id)
+            db.add(db_answer)
+        if "choice" in answer_in.model_fields_set:
+            db_answer.choice = answer_in.choice
+        if "comment" in answer_in.model_fields_set:
+            db_answer.comment = answer_in.comment
+        if question_id in photo_urls and (db_answer.id is None or db_answer.photo_url != photo_urls[question_id]):
+            db_answer.photo_url = photo_urls[question_id]
+            photos_changed.append(db_answer)
+        db_answer.value = _answer_value(questions_map[question_id], db_answer.choice)
+
+    await photo_refs.sync_answer_photos(db, id, photos_changed)
+    await db.flush()
+    audit.score = await _audit_score(db, id)
+    # Answer-only edits do not touch the audits row; updated_at versions the cached PDF
+    audit.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    await pdf_cache.invalidate(id)
+    return schemas.AuditScoreResponse(id=audit.id, score=audit.score, updated_at=audit.updated_at)
+
 @router.delete("/{id}")
 async def delete_audit(
     *,
@@ -855,6 +1103,7 @@ async def delete_audit(
 
     await db.delete(audit)
     await db.commit()
+    await pdf_cache.invalidate(id)
     return {"message": "Audit deleted successfully", "id": id}
 
 
@@ -880,5 +1129,6 @@ async def bulk_delete_audits(
     query = delete(Audit).where(Audit.id.in_(body.ids))
     await db.execute(query)
     await db.commit()
+    await pdf_cache.invalidate(*body.ids)
     
     return {"message": f"Successfully deleted {len(body.ids)} audits"}
@@ -6,8 +6,10 @@ from sqlalchemy.orm import selectinload
 import datetime
 
 from app.api import deps
+from app.core import metrics
 from app.models.models import DailyTimeRecord, ScheduleThreshold, UserRole, User, Coffee, CoffeeSchedule
 from app.schemas import schemas
+from app.services import jobs
 from app.services.schedule_scoring import (
     compute_schedule_score, score_result_to_dict,
     get_schedule_for_day, _date_to_day_of_week
@@ -167,7 +169,8 @@ async def read_daily_logs(
     }
 
 
-@router.get("/export-excel")
+@router.get("/export-excel", dependencies=[Depends(deps.admission("export", route="daily_logs_excel"))])
+@metrics.timed(metrics.EXPORT_DURATION, kind="daily_logs_excel")
 async def export_daily_logs_excel(
     coffee_id: Optional[int] = None,
     start_date: Optional[datetime.date] = None,
@@ -367,6 +370,8 @@ async def export_daily_logs_excel(
         }
     )
 
+jobs.register("daily_logs_excel", export_daily_logs_excel)
+
 @router.post("", response_model=schemas.DailyTimeRecordEnriched)
 async def create_daily_log(
     *,
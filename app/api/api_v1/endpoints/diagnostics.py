@@ -0,0 +1,53 @@
+from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app.api import deps
+from app.core import profiling
+from app.core.config import settings
+from app.db import slow_query
+from app.models.models import User
+
+router = APIRouter()
+
+
+@router.get("/profiles")
+def list_profiles(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> List[dict]:
+    """List stored request profiles, most recent first. Admin only."""
+    return profiling.list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(
+    profile_id: str,
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """Download a profile as folded stacks (flamegraph.pl / speedscope). Admin only."""
+    path = profiling.profile_file(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"profile_{profile_id}.folded")
+
+
+@router.get("/slow-queries")
+def read_slow_queries(
+    limit: int = 50,
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """Recent statements slower than SLOW_QUERY_THRESHOLD_MS, with EXPLAIN plans. Admin only."""
+    return {
+        "enabled": settings.SLOW_QUERY_ENABLED,
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "items": slow_query.recent(limit),
+    }
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """Empty the slow-query ring buffer. Admin only."""
+    slow_query.clear()
+    return {"ok": True}
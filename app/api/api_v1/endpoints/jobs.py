@@ -0,0 +1,108 @@
+import json
+import os
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.models.models import Job, JobStatus, User, UserRole
+from app.schemas import schemas
+from app.services import jobs
+
+router = APIRouter()
+
+# Job types clients may submit through POST /jobs (others have their own endpoint)
+EXPORT_JOB_TYPES = ("audits_excel", "audits_pdf_zip", "kpi_monthly_excel", "daily_logs_excel")
+
+
+def job_response(job: Job) -> schemas.JobResponse:
+    result = json.loads(job.result) if job.result else {}
+    artifact_url = None
+    if job.status == JobStatus.SUCCEEDED.value and result.get("artifact"):
+        artifact_url = f"{settings.API_V1_STR}/jobs/{job.id}/artifact"
+    return schemas.JobResponse(
+        id=job.id,
+        type=job.type,
+        status=job.status,
+        error=job.error,
+        message=result.get("message"),
+        artifact_url=artifact_url,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+    )
+
+
+async def submit_job(db: AsyncSession, job_type: str, params: dict, current_user: User, response: Response) -> schemas.JobResponse:
+    """Queue a job and answer 202 with its status URL in Location."""
+    try:
+        job = await jobs.submit(db, job_type, params, current_user)
+    except jobs.UnknownJobType:
+        raise HTTPException(status_code=400, detail=f"Type de tâche inconnu: {job_type}")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    response.status_code = status.HTTP_202_ACCEPTED
+    response.headers["Location"] = f"{settings.API_V1_STR}/jobs/{job.id}"
+    return job_response(job)
+
+
+async def _load_job(db: AsyncSession, job_id: str, current_user: User) -> Job:
+    job = await db.get(Job, job_id)
+    # Other users' jobs are reported as missing
+    if not job or (job.created_by != current_user.id and current_user.role != UserRole.ADMIN):
+        raise HTTPException(status_code=404, detail="Tâche introuvable.")
+    return job
+
+
+@router.post("", response_model=schemas.JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_in: schemas.JobCreate,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Run an export in the background: `type` is one of audits_excel,
+    audits_pdf_zip, kpi_monthly_excel or daily_logs_excel and `params` the
+    query parameters of the matching GET endpoint.  Poll `GET /jobs/{id}`
+    and download `artifact_url` once the job has SUCCEEDED.  Permissions are
+    those of the endpoint, checked when the job runs.
+    """
+    if job_in.type not in EXPORT_JOB_TYPES:
+        raise HTTPException(status_code=400, detail=f"Type de tâche inconnu: {job_in.type}")
+    return await submit_job(db, job_in.type, job_in.params, current_user, response)
+
+
+@router.get("/{job_id}", response_model=schemas.JobResponse)
+async def read_job(
+    job_id: str,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    return job_response(await _load_job(db, job_id, current_user))
+
+
+@router.get("/{job_id}/artifact")
+async def download_job_artifact(
+    job_id: str,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    job = await _load_job(db, job_id, current_user)
+    result = json.loads(job.result) if job.result else {}
+    if job.status != JobStatus.SUCCEEDED.value or not result.get("artifact"):
+        raise HTTPException(status_code=409, detail="Aucun fichier disponible pour cette tâche.")
+    path = os.path.join(jobs.artifact_dir(job.id), result["artifact"])
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=410, detail="Le fichier de cette tâche a expiré.")
+    return FileResponse(
+        path,
+        media_type=result.get("media_type"),
+        filename=result["artifact"],
+        headers={"Access-Control-Expose-Headers": "Content-Disposition"},
+    )
@@ -7,8 +7,10 @@ from sqlalchemy import func
 from datetime import datetime
 
 from app.api import deps
+from app.core import metrics
 from app.models.models import Audit, Coffee, User, UserRole, AuditAnswer, AuditQuestion, AuditCategory, DailyTimeRecord
 from app.schemas import schemas
+from app.services import jobs
 from app.services.schedule_scoring import compute_schedule_score
 
 router = APIRouter()
@@ -34,7 +36,7 @@ def _apply_role_filter(query, current_user: User):
     return query.where(func.false()) # Deny by default
 
 
-@router.get("", response_model=schemas.KPIData)
+@router.get("", response_model=schemas.KPIData, dependencies=[Depends(deps.admission("analytics"))])
 async def read_kpi(
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
@@ -209,7 +211,8 @@ async def read_kpi(
     }
 
 
-@router.get("/export-monthly-excel")
+@router.get("/export-monthly-excel", dependencies=[Depends(deps.admission("export", route="kpi_monthly_excel"))])
+@metrics.timed(metrics.EXPORT_DURATION, kind="monthly_excel")
 async def export_monthly_excel(
     start_date: str = None,
     end_date: str = None,
@@ -584,3 +587,5 @@ async def export_monthly_excel(
             "Access-Control-Expose-Headers": "Content-Disposition"
         }
     )
+
+jobs.register("kpi_monthly_excel", export_monthly_excel)
@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
+from app.api.api_v1.endpoints.jobs import submit_job
 from app.models.models import User, UserRole
+from app.schemas import schemas
+from app.services import email_outbox, jobs
 from app.services.notification import send_weekly_report
 
 router = APIRouter()
 
-@router.post("/send-now", status_code=200)
+async def _weekly_report_job(db: AsyncSession, current_user: User) -> str:
+    if not current_user or current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    await send_weekly_report()
+    return "Emails queued for delivery."
+
+jobs.register("weekly_report", _weekly_report_job)
+
+@router.post("/send-now", response_model=schemas.JobResponse, status_code=202)
 async def trigger_email_now(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """Send the weekly report now, as a background job (poll GET /jobs/{id})."""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return await submit_job(db, "weekly_report", {}, current_user, response)
+
+@router.get("/outbox", response_model=schemas.EmailOutboxStats)
+async def read_outbox_stats(
+    db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ):
+    """Depth of the email outbox (pending, due now, sent, dead-lettered)."""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    try:
-        await send_weekly_report()
-        return {"success": True, "message": "Emails sent successfully."}
-    except RuntimeError as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+    return await email_outbox.queue_stats(db)
@@ -0,0 +1,99 @@
+from typing import Any, AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.api import deps
+from app.core.config import settings
+from app.models.models import User, UserRole
+from app.schemas import schemas
+from app.services import image_ingest
+
+router = APIRouter()
+
+_CHUNK_SIZE = 64 * 1024
+_MULTIPART_OVERHEAD = 16 * 1024   # boundaries and part headers allowed on top of MAX_UPLOAD_BYTES
+
+
+class _FormTooLarge(MultiPartException):
+    """The multipart body went over the cap (the parser closes its spooled files)."""
+
+
+async def _iter_upload_file(upload) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def _capped(stream: AsyncIterator[bytes], limit: int) -> AsyncIterator[bytes]:
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+        if size > limit:
+            raise _FormTooLarge(f"Upload exceeds {limit} bytes")
+        yield chunk
+
+
+async def _read_form(request: Request) -> FormData:
+    """Parse a multipart body as it arrives, never reading more than the upload cap.
+
+    ``request.form()`` would spool the whole body whatever its size, and a
+    chunked request has no Content-Length to check beforehand.
+    """
+    stream = _capped(request.stream(), settings.MAX_UPLOAD_BYTES + _MULTIPART_OVERHEAD)
+    return await MultiPartParser(request.headers, stream, max_files=1, max_fields=10).parse()
+
+
+@router.post("", response_model=schemas.PhotoUploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_photo(
+    request: Request,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Upload one photo and get back its URL, to be referenced from audits
+    (`existing_photo_urls` / answer `photo_data`) instead of inlining base64.
+
+    The image is sent either as the raw request body (`Content-Type: image/jpeg`,
+    `image/png` or `image/webp`), which is streamed to disk, or as a
+    multipart form with a `file` field.  Both are capped at MAX_UPLOAD_BYTES
+    while they are read, chunked requests included.
+    """
+    rights = current_user.rights
+    can_upload = current_user.role in (UserRole.ADMIN, UserRole.AUDITOR) or (
+        rights and (rights.audits_create or rights.audits_update)
+    )
+    if not can_upload:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Photo too large")
+
+    content_type = request.headers.get("content-type", "")
+    form = None
+    try:
+        if content_type.startswith("multipart/form-data"):
+            try:
+                form = await _read_form(request)
+            except _FormTooLarge:
+                raise HTTPException(status_code=413, detail="Photo too large")
+            except MultiPartException as e:
+                raise HTTPException(status_code=400, detail=e.message)
+            upload = form.get("file")
+            if upload is None or not hasattr(upload, "read"):
+                raise HTTPException(status_code=400, detail="Missing 'file' field")
+            chunks = _iter_upload_file(upload)
+        else:
+            chunks = request.stream()
+
+        try:
+            return await image_ingest.store_stream(chunks)
+        except image_ingest.UploadTooLarge:
+            raise HTTPException(status_code=413, detail="Photo too large")
+        except image_ingest.UnsupportedImage as e:
+            raise HTTPException(status_code=415, detail=str(e))
+    finally:
+        if form is not None:
+            await form.close()   # releases the spooled temporary file
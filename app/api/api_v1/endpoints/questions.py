@@ -5,6 +5,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
+from app.core.query_stats import query_budget
 from app.models.models import AuditQuestion, AuditCategory, User, UserRole
 from app.schemas import schemas
 
@@ -12,6 +13,7 @@ router = APIRouter()
 
 
 @router.get("", response_model=List[schemas.AuditQuestionResponse])
+@query_budget(6)
 async def read_questions(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
@@ -1,5 +1,5 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
 from fastapi.encoders import jsonable_encoder
 from pydantic.networks import EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,9 +7,11 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
+from app.api.api_v1.endpoints.jobs import submit_job
 from app.models.models import User, UserRole, Coffee, UserRights
 from app.schemas import schemas
 from app.core.security import get_password_hash, verify_password
+from app.services import jobs
 from app.services.notification import send_user_report
 
 router = APIRouter()
@@ -242,23 +244,29 @@ async def delete_user(
     return {"message": "User deleted successfully", "id": user_id}
 
 
-@router.post("/{user_id}/send-report")
+async def _user_report_job(db: AsyncSession, current_user: User, user_id: int, days: int) -> str:
+    if not current_user or current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough privileges")
+    await send_user_report(user_id, days)
+    return f"Rapport ({days} jours) mis en file d'envoi."
+
+jobs.register("user_report", _user_report_job)
+
+
+@router.post("/{user_id}/send-report", response_model=schemas.JobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def trigger_user_report(
     user_id: int,
+    response: Response,
     days: int = Body(..., embed=True),
     current_user: User = Depends(deps.get_current_user),
     db: AsyncSession = Depends(deps.get_db),
 ) -> Any:
-    """Trigger an instant email report for a user."""
+    """Trigger an instant email report for a user, as a background job (poll GET /jobs/{id})."""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough privileges")
     
     user = await _load_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-        
-    try:
-        await send_user_report(user_id, days)
-        return {"message": f"Rapport ({days} jours) envoyé avec succès à {user.email}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors de l'envoi de l'email: {str(e)}")
+
+    return await submit_job(db, "user_report", {"user_id": user_id, "days": days}, current_user, response)
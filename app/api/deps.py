@@ -1,11 +1,11 @@
-from typing import Generator, AsyncGenerator
+from typing import Generator, AsyncGenerator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from app.core import security
+from app.core import admission as admission_control, query_stats, security
 from app.core.config import settings
 from app.db.session import SessionLocal
 from app.models.models import User
@@ -52,8 +52,43 @@ async def get_current_user(
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    stats = query_stats.current_stats()
+    if stats is not None:
+        stats.user_role = user.role.value if user.role else None
     return user
 
+_ADMISSION_MESSAGES = {
+    "export": "Le serveur traite déjà trop d'exports",
+    "analytics": "Le serveur calcule déjà trop d'indicateurs",
+}
+
+def admission_rejected(e: admission_control.AdmissionRejected) -> HTTPException:
+    """The 429 answered when no admission-control slot frees up in time."""
+    if e.reason == "user_limit":
+        message = "Vous avez déjà trop de requêtes de ce type en cours"
+    else:
+        message = _ADMISSION_MESSAGES.get(e.lane, "Le serveur est très sollicité")
+    return HTTPException(
+        status_code=429,
+        detail=f"{message}, veuillez réessayer dans quelques instants.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def admission(lane: str, route: Optional[str] = None):
+    """
+    Dependency holding an admission-control slot of ``lane`` (see app.core.admission)
+    for the request; answers 429 when none frees up in time.
+    Streaming responses must take their slot with ``admission_control.admit``
+    themselves: the dependency is closed before the body is sent.
+    """
+    async def dependency(current_user: User = Depends(get_current_user)) -> AsyncGenerator[None, None]:
+        try:
+            async with admission_control.admit(lane, current_user.id, route):
+                yield
+        except admission_control.AdmissionRejected as e:
+            raise admission_rejected(e)
+    return dependency
+
 def get_current_active_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -0,0 +1,148 @@
+"""Admission control for expensive endpoints.
+
+Expensive routes (exports, KPI aggregates) declare a *lane* through the
+``deps.admission(lane, route)`` dependency.  A request is admitted once it
+holds, in this order:
+
+- a per-user slot (``ADMISSION_PER_USER[lane]``): one manager cannot take the
+  whole lane;
+- a per-route slot (``ADMISSION_ROUTE_LIMITS[route]``), when configured;
+- a lane slot (``ADMISSION_LANES[lane]``);
+- and at least ``ADMISSION_DB_RESERVE`` free database connections.
+
+Everything else — audit autosave, daily logs, logins — runs in the implicit
+priority lane: it never waits here, and the DB reserve keeps connections
+free for it while lanes are busy.  Requests wait at most
+``ADMISSION_QUEUE_TIMEOUT_SECONDS`` (and at most ``ADMISSION_MAX_QUEUE``
+wait per lane) before ``AdmissionRejected`` (429).  Limits are per process.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger("app.admission")
+
+_DB_POLL_SECONDS = 0.05
+
+_lanes: Dict[str, asyncio.Semaphore] = {}
+_routes: Dict[str, asyncio.Semaphore] = {}
+_users: Dict[Tuple[str, int], list] = {}   # (lane, user id) -> [semaphore, holders + waiters]
+_waiting: Dict[str, int] = {}
+_pool = None
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, lane: str, reason: str, retry_after: int = 5):
+        super().__init__(f"{lane}: {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def register_pool(engine) -> None:
+    """Watch this engine's connection pool for ``ADMISSION_DB_RESERVE``."""
+    global _pool
+    _pool = getattr(engine, "sync_engine", engine).pool
+
+
+def _free_connections() -> Optional[int]:
+    if _pool is None or not hasattr(_pool, "checkedout"):
+        return None
+    capacity = _pool.size() + max(getattr(_pool, "_max_overflow", 0), 0)
+    return capacity - _pool.checkedout()
+
+
+def _lane_semaphore(lane: str) -> asyncio.Semaphore:
+    if lane not in _lanes:
+        _lanes[lane] = asyncio.Semaphore(settings.ADMISSION_LANES.get(lane, 1))
+    return _lanes[lane]
+
+
+def _route_semaphore(route: Optional[str]) -> Optional[asyncio.Semaphore]:
+    if route is None or route not in settings.ADMISSION_ROUTE_LIMITS:
+        return None
+    if route not in _routes:
+        _routes[route] = asyncio.Semaphore(settings.ADMISSION_ROUTE_LIMITS[route])
+    return _routes[route]
+
+
+def _user_entry(lane: str, user_id: Optional[int]) -> Optional[list]:
+    if user_id is None or lane not in settings.ADMISSION_PER_USER:
+        return None
+    entry = _users.get((lane, user_id))
+    if entry is None:
+        entry = _users[(lane, user_id)] = [asyncio.Semaphore(settings.ADMISSION_PER_USER[lane]), 0]
+    entry[1] += 1
+    return entry
+
+
+def _drop_user_entry(lane: str, user_id: Optional[int], entry: Optional[list]) -> None:
+    if entry is None:
+        return
+    entry[1] -= 1
+    if entry[1] == 0:
+        _users.pop((lane, user_id), None)
+
+
+async def _wait_for_db(deadline: float) -> bool:
+    while True:
+        free = _free_connections()
+        if free is None or free > settings.ADMISSION_DB_RESERVE:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(_DB_POLL_SECONDS)
+
+
+@asynccontextmanager
+async def admit(lane: str, user_id: Optional[int] = None, route: Optional[str] = None):
+    """Hold the slots of ``lane`` for the enclosed block, or raise ``AdmissionRejected``."""
+    if not settings.ADMISSION_ENABLED:
+        yield
+        return
+
+    if _waiting.get(lane, 0) >= settings.ADMISSION_MAX_QUEUE:
+        metrics.ADMISSION_REJECTED.inc(lane=lane, reason="queue_full")
+        raise AdmissionRejected(lane, "queue_full")
+
+    started = time.monotonic()
+    deadline = started + settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+    user_entry = _user_entry(lane, user_id)
+    semaphores = [s for s in (user_entry[0] if user_entry else None, _route_semaphore(route), _lane_semaphore(lane)) if s]
+    held = []
+    _waiting[lane] = _waiting.get(lane, 0) + 1
+    try:
+        try:
+            for semaphore in semaphores:
+                await asyncio.wait_for(semaphore.acquire(), max(deadline - time.monotonic(), 0))
+                held.append(semaphore)
+        except asyncio.TimeoutError:
+            reason = "user_limit" if user_entry and not held else "timeout"
+            metrics.ADMISSION_REJECTED.inc(lane=lane, reason=reason)
+            raise AdmissionRejected(lane, reason)
+        if not await _wait_for_db(deadline):
+            metrics.ADMISSION_REJECTED.inc(lane=lane, reason="db_busy")
+            raise AdmissionRejected(lane, "db_busy")
+    except BaseException:
+        _waiting[lane] -= 1
+        for semaphore in reversed(held):
+            semaphore.release()
+        _drop_user_entry(lane, user_id, user_entry)
+        raise
+    _waiting[lane] -= 1
+    metrics.ADMISSION_WAIT.observe(time.monotonic() - started, lane=lane)
+
+    metrics.ADMISSION_IN_FLIGHT.inc(lane=lane)
+    try:
+        yield
+    finally:
+        metrics.ADMISSION_IN_FLIGHT.dec(lane=lane)
+        for semaphore in reversed(held):
+            semaphore.release()
+        _drop_user_entry(lane, user_id, user_entry)
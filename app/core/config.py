@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import Dict, List, Union
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings
 
@@ -40,10 +40,105 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str           # Required — set in .env
     EMAILS_FROM_EMAIL: str       # Required — set in .env
     EMAILS_FROM_NAME: str = "Caribou Coffee Report"
+    SMTP_START_TLS: bool = True
+    SMTP_TIMEOUT: float = 10.0
+    SMTP_POOL_SIZE: int = 4                # authenticated connections kept open / sends in parallel
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100   # then reconnect (servers cap messages per session)
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 30.0       # idle connections older than this are not reused
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50      # emails claimed per dispatcher round
+    EMAIL_OUTBOX_POLL_SECONDS: float = 15.0        # dispatcher wake-up when nothing is enqueued
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8     # then the email is dead-lettered
+    EMAIL_OUTBOX_BACKOFF_SECONDS: float = 30.0     # doubled after every failed attempt
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS: float = 6 * 3600
+    EMAIL_OUTBOX_LEASE_SECONDS: float = 300.0      # claimed emails are retried after this if never settled
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 14  # sent and dead emails are purged after this
+    REPORT_RENDER_TTL_SECONDS: int = 600   # rendered report bodies shared by sends in this window
 
     # ── Frontend ──────────────────────────────────────────────────────────────
     FRONTEND_URL: str = "https://auditcariboucoffee.com"
 
+    # ── Uploads ───────────────────────────────────────────────────────────────
+    IMAGE_IO_WORKERS: int = 4              # threads decoding / writing uploaded images
+    MAX_UPLOAD_BYTES: int = 15 * 1024 * 1024
+    IMAGE_PROCESSING_ENABLED: bool = True  # normalise, resize and recompress on ingest
+    IMAGE_MAX_EDGE: int = 2048             # long edge of the stored photo, in pixels
+    IMAGE_QUALITY: int = 82
+    IMAGE_FORMAT: str = "jpeg"             # "jpeg" or "webp"
+    IMAGE_VARIANTS: Dict[str, int] = {"thumb": 320, "medium": 1024}   # name -> long edge
+    PDF_IMAGE_VARIANT: str = "thumb"       # variant embedded in audit PDFs
+    UPLOAD_GC_ENABLED: bool = True         # nightly removal of unreferenced uploads
+    UPLOAD_GC_GRACE_HOURS: float = 24      # never delete files younger than this
+    UPLOAD_GC_SHARDS_PER_RUN: int = 64     # of the 256 hash directories (+ legacy files)
+    UPLOAD_GC_BATCH_SIZE: int = 500
+    UPLOAD_GC_BATCH_PAUSE_MS: int = 100
+    UPLOAD_GC_MAX_DELETES: int = 5000      # per run
+    UPLOADS_MAX_AGE: int = 31536000        # uploads are immutable: cache for a year
+    STATIC_MAX_AGE: int = 3600             # other files under app/static
+
+    # ── PDF reports ───────────────────────────────────────────────────────────
+    PDF_WORKERS: int = 2                   # worker processes rendering audit PDFs
+    PDF_MAX_PENDING: int = 8               # renders accepted at once (running + queued), then 429
+    PDF_TIMEOUT_SECONDS: float = 60.0
+    PDF_TASKS_PER_WORKER: int = 200        # recycle worker processes to bound memory growth
+    PDF_CACHE_ENABLED: bool = True
+    PDF_CACHE_DIR: str = "cache/pdf"
+    PDF_CACHE_MAX_BYTES: int = 512 * 1024 * 1024   # least recently used PDFs are evicted beyond this
+    PDF_ZIP_CONCURRENCY: int = 2           # renders in parallel for one batch ZIP export
+    PDF_BATCH_MAX_IN_FLIGHT: int = 2       # render slots all ZIP exports may hold together (< PDF_MAX_PENDING)
+    PDF_ZIP_MAX_AUDITS: int = 1000
+    PDF_ZIP_MAX_BYTES: int = 1024 * 1024 * 1024
+
+    # ── Admission control ─────────────────────────────────────────────────────
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LANES: Dict[str, int] = {"export": 2, "analytics": 4}      # concurrent requests per lane
+    ADMISSION_PER_USER: Dict[str, int] = {"export": 1, "analytics": 2}   # per user and lane
+    ADMISSION_ROUTE_LIMITS: Dict[str, int] = {"kpi_monthly_excel": 1}
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 15.0   # then 429
+    ADMISSION_MAX_QUEUE: int = 20          # requests waiting per lane, beyond that 429 at once
+    ADMISSION_DB_RESERVE: int = 3          # DB connections lanes leave free for writes
+
+    # ── Background jobs ───────────────────────────────────────────────────────
+    JOB_POLL_SECONDS: float = 2.0          # worker wake-up when no job was submitted by this process
+    JOB_DEFAULT_CONCURRENCY: int = 2       # running jobs of one type, across all API processes
+    JOB_CONCURRENCY: Dict[str, int] = {"audits_pdf_zip": 1, "kpi_monthly_excel": 1}
+    JOB_LEASE_SECONDS: float = 120.0       # renewed while running; expired leases are taken over
+    JOB_MAX_ATTEMPTS: int = 2              # runs of a job whose worker died before giving up
+    JOB_RESULT_TTL_SECONDS: int = 24 * 3600
+    JOB_ARTIFACT_DIR: str = "cache/jobs"
+
+    # ── Idempotency ───────────────────────────────────────────────────────────
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_ROUTES: List[str] = ["POST /audits", "POST /daily-logs"]   # under API_V1_STR
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600   # stored responses are replayed this long
+    IDEMPOTENCY_LOCK_SECONDS: int = 120        # a request still in progress after this is taken over
+
+    # ── Observability ─────────────────────────────────────────────────────────
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_BUDGET_STRICT: bool = False      # raise instead of warn when a budget is exceeded (tests)
+    QUERY_REPEAT_THRESHOLD: int = 10       # identical statements per request before flagging N+1
+    METRICS_ENABLED: bool = True           # serve Prometheus text format at /metrics
+    METRICS_TOKEN: str = ""                # bearer token scrapers must send; /metrics is 404 while empty
+    PROFILING_SAMPLE_RATE: float = 0.0     # fraction of requests profiled automatically
+    PROFILING_INTERVAL_MS: int = 5
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_STORED: int = 50
+    SLOW_QUERY_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_BUFFER_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN: bool = True        # capture EXPLAIN (ANALYZE, BUFFERS) for slow SELECTs
+
+    # ── Logging ───────────────────────────────────────────────────────────────
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: Dict[str, str] = {"sqlalchemy.engine": "INFO"}   # per-logger overrides (JSON in env)
+    LOG_FORMAT: str = "json"               # "json" or "text"
+    LOG_FILE: str = "app.log"
+    CRON_LOG_FILE: str = "cron_jobs.log"
+    LOG_ROTATION: str = "size"             # "size" or "time"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_ROTATE_WHEN: str = "midnight"
+    LOG_BACKUP_COUNT: int = 7
+    LOG_SQL_SAMPLE_RATE: float = 0.1       # fraction of INFO-level SQL statements kept
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,204 @@
+"""Idempotency keys for writes retried by the tablets.
+
+A client may send an ``Idempotency-Key`` header (any string of up to 255
+characters, e.g. a UUID generated per form submission) with the routes of
+``IDEMPOTENCY_ROUTES``.  The first request with a key claims it in the
+``idempotency_keys`` table — scoped to the authenticated user — runs, and
+its response (status, headers, body) is stored.  A retry with the same key gets the stored response
+back (``Idempotent-Replayed: true``) without running the endpoint again, so
+no duplicate audit is created and no photo is decoded twice.
+
+- a retry while the first request is still running gets 409 (Retry-After);
+- the same key with another payload or route gets 422;
+- only results are stored: 2xx responses and the deliberate business
+  refusals of ``_STORED_4XX`` (409).  Anything else — 401/403, validation
+  errors, 429, 5xx — releases the key, and the request may be retried;
+- a key whose request died mid-flight is taken over after
+  ``IDEMPOTENCY_LOCK_SECONDS``; stored responses expire after
+  ``IDEMPOTENCY_TTL_SECONDS``.
+
+Requests without the header, or without a valid bearer token (the endpoint
+rejects them anyway), are passed through untouched.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from jose import JWTError, jwt
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.core import metrics, security
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import IdempotencyKey, IdempotencyStatus
+
+logger = logging.getLogger("app.idempotency")
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+_MAX_KEY_LENGTH = 255
+_STORED_4XX = frozenset({409})   # business conflicts: retrying would get the same answer
+# Not replayed: recomputed for the stored body, or only meaningful on the original connection
+_UNSTORED_HEADERS = frozenset({
+    "content-length", "connection", "keep-alive", "transfer-encoding", "set-cookie",
+})
+
+
+def _user_id(request: Request) -> Optional[int]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        return int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        return None
+
+
+async def _claim(user_id: int, key: str, method: str, path: str, request_hash: str) -> Tuple[Optional[int], Optional[IdempotencyKey]]:
+    """Claim ``key`` for this request: (id of the claimed row, None) or (None, row of the earlier request)."""
+    now = datetime.now(timezone.utc)
+    values = {
+        "method": method,
+        "path": path,
+        "request_hash": request_hash,
+        "status": IdempotencyStatus.IN_PROGRESS.value,
+        "response_status": None,
+        "response_body": None,
+        "response_headers": None,
+        "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+        "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+    }
+    stmt = pg_insert(IdempotencyKey).values(user_id=user_id, key=key, **values)
+    # Expired keys, and keys whose request died while in progress, are taken over
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+        set_=values,
+        where=or_(
+            IdempotencyKey.expires_at <= now,
+            and_(IdempotencyKey.status == IdempotencyStatus.IN_PROGRESS.value, IdempotencyKey.locked_until <= now),
+        ),
+    ).returning(IdempotencyKey.id)
+    async with SessionLocal() as db:
+        key_id = await db.scalar(stmt)
+        earlier = None
+        if key_id is None:
+            result = await db.execute(
+                select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            )
+            earlier = result.scalars().first()
+        await db.commit()
+    return key_id, earlier
+
+
+def _stored_headers(response: Response) -> str:
+    return json.dumps([[name, value] for name, value in response.headers.items() if name not in _UNSTORED_HEADERS])
+
+
+async def _complete(key_id: int, response: Response, body: bytes) -> None:
+    async with SessionLocal() as db:
+        await db.execute(
+            update(IdempotencyKey).where(IdempotencyKey.id == key_id).values(
+                status=IdempotencyStatus.COMPLETED.value,
+                response_status=response.status_code,
+                response_body=body,
+                response_headers=_stored_headers(response),
+                locked_until=None,
+            )
+        )
+        await db.commit()
+
+
+async def _release(key_id: int) -> None:
+    async with SessionLocal() as db:
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == key_id))
+        await db.commit()
+
+
+def _earlier_response(earlier: Optional[IdempotencyKey], request_hash: str, route: str) -> Response:
+    if earlier is not None and earlier.request_hash != request_hash:
+        metrics.IDEMPOTENT_REQUESTS.inc(route=route, outcome="mismatch")
+        return JSONResponse(
+            {"detail": "Cette Idempotency-Key a déjà été utilisée pour une autre requête."},
+            status_code=422,
+        )
+    if earlier is None or earlier.status != IdempotencyStatus.COMPLETED.value:
+        metrics.IDEMPOTENT_REQUESTS.inc(route=route, outcome="in_progress")
+        return JSONResponse(
+            {"detail": "Une requête avec cette Idempotency-Key est déjà en cours."},
+            status_code=409,
+            headers={"Retry-After": "1"},
+        )
+    metrics.IDEMPOTENT_REQUESTS.inc(route=route, outcome="replayed")
+    response = Response(content=earlier.response_body or b"", status_code=earlier.response_status)
+    for name, value in json.loads(earlier.response_headers or "[]"):
+        response.headers.append(name, value)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.routes = set()
+        for route in settings.IDEMPOTENCY_ROUTES:
+            method, _, path = route.partition(" ")
+            self.routes.add(f"{method.upper()} {settings.API_V1_STR}{path.rstrip('/')}")
+
+    async def dispatch(self, request: Request, call_next):
+        key = request.headers.get(HEADER)
+        if key is None or not settings.IDEMPOTENCY_ENABLED:
+            return await call_next(request)
+        route = f"{request.method} {request.url.path.rstrip('/')}"
+        if route not in self.routes:
+            return await call_next(request)
+        user_id = _user_id(request)
+        if user_id is None:
+            return await call_next(request)
+        if not key or len(key) > _MAX_KEY_LENGTH:
+            return JSONResponse(
+                {"detail": f"{HEADER} invalide (1 à {_MAX_KEY_LENGTH} caractères)."}, status_code=400
+            )
+
+        body = await request.body()
+        request_hash = hashlib.sha256(route.encode() + b"\n" + body).hexdigest()
+        key_id, earlier = await _claim(user_id, key, request.method, request.url.path, request_hash)
+        if key_id is None:
+            return _earlier_response(earlier, request_hash, route)
+
+        try:
+            response = await call_next(request)
+            content = b"".join([
+                chunk if isinstance(chunk, bytes) else chunk.encode("utf-8")
+                async for chunk in response.body_iterator
+            ])
+        except BaseException:
+            await _release(key_id)
+            raise
+
+        if 200 <= response.status_code < 300 or response.status_code in _STORED_4XX:
+            await _complete(key_id, response, content)
+            metrics.IDEMPOTENT_REQUESTS.inc(route=route, outcome="executed")
+        else:
+            await _release(key_id)   # not a result: the client may retry with the same key
+            metrics.IDEMPOTENT_REQUESTS.inc(route=route, outcome="released")
+        # The body iterator is consumed: answer with the buffered content
+        buffered = Response(content=content, status_code=response.status_code)
+        buffered.raw_headers = [(name, value) for name, value in response.raw_headers if name != b"content-length"]
+        buffered.headers["content-length"] = str(len(content))
+        return buffered
+
+
+async def purge_expired_keys() -> None:
+    """Scheduled job: delete idempotency keys past their TTL."""
+    async with SessionLocal() as db:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc)))
+        await db.commit()
+    logger.info(f"Idempotency purge: {result.rowcount} expired keys deleted")
@@ -0,0 +1,143 @@
+"""Non-blocking logging pipeline.
+
+Loggers only enqueue records (``QueueHandler``); a ``QueueListener`` thread
+formats them and performs the actual stream / file writes, so disk I/O never
+runs on the event loop.  Records are emitted as JSON lines (or plain text),
+files rotate by size or time, levels can be set per logger from ``Settings``
+and high-volume SQL logging can be sampled.
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.core.config import settings
+
+# Attributes present on every LogRecord; anything else was passed via ``extra``.
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+CRON_LOGGERS = ("apscheduler", "cron_service")
+SQL_LOGGER = "sqlalchemy.engine"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    The stdlib ``prepare()`` merges the traceback into the message and clears
+    ``exc_info``; keep it as ``exc_text`` instead, so the listener's
+    formatters (``exc_info`` field of the JSON lines) still see it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None   # tracebacks hold frames alive until the listener runs
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO/DEBUG records from a noisy logger tree."""
+
+    def __init__(self, prefix: str, rate: float):
+        super().__init__()
+        self.prefix = prefix
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not record.name.startswith(self.prefix):
+            return True
+        return random.random() < self.rate
+
+
+class _NameFilter(logging.Filter):
+    def __init__(self, prefixes, include: bool):
+        super().__init__()
+        self.prefixes = tuple(prefixes)
+        self.include = include
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name.startswith(self.prefixes) == self.include
+
+
+def _file_handler(filename: str) -> logging.Handler:
+    if settings.LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            filename, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        filename, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Install the queue-based pipeline on the root logger (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    stream_handler = logging.StreamHandler()
+    app_file_handler = _file_handler(settings.LOG_FILE)
+    app_file_handler.addFilter(_NameFilter(CRON_LOGGERS, include=False))
+    cron_file_handler = _file_handler(settings.CRON_LOG_FILE)
+    cron_file_handler.addFilter(_NameFilter(CRON_LOGGERS, include=True))
+    for handler in (stream_handler, app_file_handler, cron_file_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _QueueHandler(log_queue)
+    if settings.LOG_SQL_SAMPLE_RATE < 1.0:
+        queue_handler.addFilter(SamplingFilter(SQL_LOGGER, settings.LOG_SQL_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, app_file_handler, cron_file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,268 @@
+"""In-process metrics exposed in the Prometheus text format at ``/metrics``.
+
+A deliberately small registry (counters, gauges, histograms with labels) so
+the API can be scraped without running or depending on an external service.
+All metric objects are thread-safe; they are updated from the event loop as
+well as from worker threads.
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value lazily at scrape time."""
+        self._function = function
+
+    def value(self, **labels) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the enclosed block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(state[-1]) if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, state in items:
+            for bound, bucket_count in zip(self.buckets, state):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {bucket_count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {int(state[-1])}")
+        return lines
+
+
+def timed(histogram: Histogram, **labels) -> Callable:
+    """Decorator observing the duration of an ``async`` function (endpoints included)."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# ── Metric definitions ───────────────────────────────────────────────────────
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured size of the database connection pool.")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Database connections currently checked out.")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Database connections opened beyond the pool size.")
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds", "Duration of scheduled jobs.", ["job"]
+)
+SCHEDULER_JOB_FAILURES = Counter("scheduler_job_failures_total", "Scheduled job failures.", ["job"])
+
+EMAIL_SENT = Counter("email_sent_total", "Emails handed to the SMTP server.", ["status"])
+EMAIL_SEND_DURATION = Histogram("email_send_duration_seconds", "Latency of a single email send.")
+SMTP_CONNECTIONS_OPENED = Counter("smtp_connections_opened_total", "SMTP sessions opened (connect + STARTTLS + AUTH).")
+SMTP_CONNECTIONS_IN_USE = Gauge("smtp_connections_in_use", "SMTP connections currently sending a message.")
+EMAIL_OUTBOX_ENQUEUED = Counter("email_outbox_enqueued_total", "Emails written to the outbox.")
+EMAIL_OUTBOX_RETRIES = Counter("email_outbox_retries_total", "Outbox emails rescheduled after a failed attempt.")
+EMAIL_OUTBOX_DEAD = Counter("email_outbox_dead_total", "Outbox emails dead-lettered after EMAIL_OUTBOX_MAX_ATTEMPTS.")
+EMAIL_OUTBOX_PENDING = Gauge("email_outbox_pending", "Emails waiting in the outbox (as of the last dispatcher round).")
+
+EXPORT_DURATION = Histogram("export_duration_seconds", "Duration of Excel exports.", ["kind"])
+ADMISSION_WAIT = Histogram("admission_wait_seconds", "Time requests waited for an admission slot.", ["lane"])
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests refused by admission control.", ["lane", "reason"])
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests running per lane.", ["lane"])
+JOB_DURATION = Histogram("job_duration_seconds", "Run time of background jobs.", ["type", "status"])
+JOBS_RUNNING = Gauge("jobs_running", "Background jobs running in this process.", ["type"])
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests_total", "Writes sent with an Idempotency-Key, by outcome.", ["route", "outcome"]
+)
+PDF_GENERATION_DURATION = Histogram("pdf_generation_duration_seconds", "Duration of audit PDF rendering.")
+PDF_RENDERS_IN_FLIGHT = Gauge("pdf_renders_in_flight", "Audit PDF renders running or waiting for a worker.")
+PDF_QUEUE_DEPTH = Gauge("pdf_render_queue_depth", "Audit PDF renders waiting for a free worker process.")
+PDF_RENDERS_REJECTED = Counter("pdf_renders_rejected_total", "Audit PDF renders refused because all slots were taken.")
+PDF_RENDERS_TIMED_OUT = Counter("pdf_renders_timed_out_total", "Audit PDF renders that exceeded PDF_TIMEOUT_SECONDS.")
+PDF_CACHE_HITS = Counter("pdf_cache_hits_total", "Audit PDF downloads served from the disk cache.")
+PDF_CACHE_MISSES = Counter("pdf_cache_misses_total", "Audit PDF downloads that had to be rendered.")
+
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes of uploaded images written to disk.")
+UPLOAD_SIZE = Histogram("upload_size_bytes", "Size of individual uploaded images.", buckets=SIZE_BUCKETS)
+UPLOAD_DURATION = Histogram("upload_processing_seconds", "Time to decode and store one uploaded image.")
+UPLOAD_DEDUPLICATED = Counter("upload_deduplicated_total", "Uploaded images whose content was already stored.")
+
+
+def register_pool(engine) -> None:
+    """Expose the connection pool of an (async) engine as scrape-time gauges."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    if hasattr(pool, "checkedout"):
+        DB_POOL_SIZE.set_function(pool.size)
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+        DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = request.scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=request.method,
+                route=getattr(route, "path", "<other>"),
+                status=str(status),
+            )
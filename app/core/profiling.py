@@ -0,0 +1,179 @@
+"""On-demand sampling profiler for individual requests.
+
+A request is profiled when an admin asks for it (``X-Profile: 1`` header or
+``?profile=1``; the caller is checked with ``get_current_active_superuser``)
+or when it is picked by ``PROFILING_SAMPLE_RATE``.  A background thread then
+samples the event-loop thread's call stack every ``PROFILING_INTERVAL_MS``
+and the result is stored under ``PROFILING_DIR`` in the "folded stacks"
+format understood by flamegraph.pl, speedscope and inferno.
+
+The samples describe everything the loop thread did while the request was in
+flight, so concurrent requests show up too; profile on a quiet worker when a
+clean picture is needed.  When no profile is requested the middleware costs a
+header lookup and one ``random()`` call.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.profiling")
+
+_SITE_PACKAGES = "site-packages" + os.sep
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if _SITE_PACKAGES in filename:
+        filename = filename.split(_SITE_PACKAGES, 1)[1]
+    elif filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{filename}:{code.co_name}"
+
+
+class StackSampler(threading.Thread):
+    """Collects folded call stacks of another thread at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+# ── Storage ──────────────────────────────────────────────────────────────────
+
+def _profile_path(profile_id: str, ext: str) -> str:
+    return os.path.join(settings.PROFILING_DIR, f"{profile_id}.{ext}")
+
+
+def _write_profile(profile_id: str, stacks: Counter, meta: dict) -> None:
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    with open(_profile_path(profile_id, "folded"), "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(_profile_path(profile_id, "json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    # Keep only the most recent profiles
+    metas = sorted(
+        (name for name in os.listdir(settings.PROFILING_DIR) if name.endswith(".json")), reverse=True
+    )
+    for name in metas[settings.PROFILING_MAX_STORED:]:
+        stale_id = name[: -len(".json")]
+        for ext in ("json", "folded"):
+            try:
+                os.remove(_profile_path(stale_id, ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[dict]:
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(settings.PROFILING_DIR), reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(settings.PROFILING_DIR, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+    return profiles
+
+
+def profile_file(profile_id: str) -> Optional[str]:
+    """Path of the folded-stacks file for ``profile_id``, if it exists."""
+    if not profile_id.replace("-", "").isalnum():
+        return None
+    path = _profile_path(profile_id, "folded")
+    return path if os.path.exists(path) else None
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+async def _is_superuser(request: Request) -> bool:
+    from app.api import deps
+    from app.db.session import SessionLocal
+
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        async with SessionLocal() as db:
+            user = await deps.get_current_user(db=db, token=token)
+            deps.get_current_active_superuser(current_user=user)
+    except Exception:
+        return False
+    return True
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    _busy = False   # one profile at a time per worker
+
+    async def dispatch(self, request: Request, call_next):
+        requested = (
+            request.headers.get("x-profile") == "1" or request.query_params.get("profile") == "1"
+        )
+        sampled = not requested and random.random() < settings.PROFILING_SAMPLE_RATE
+        if not (requested or sampled) or ProfilingMiddleware._busy:
+            return await call_next(request)
+        if requested and not await _is_superuser(request):
+            return await call_next(request)
+
+        ProfilingMiddleware._busy = True
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            stacks = sampler.stop()
+            ProfilingMiddleware._busy = False
+
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        meta = {
+            "id": profile_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "method": request.method,
+            "path": request.url.path,
+            "query": request.url.query,
+            "status_code": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "samples": sum(stacks.values()),
+            "trigger": "request" if requested else "sampled",
+        }
+        try:
+            await asyncio.to_thread(_write_profile, profile_id, stacks, meta)
+            response.headers["X-Profile-Id"] = profile_id
+        except OSError as e:
+            logger.error(f"Could not store profile {profile_id}: {e}")
+        return response
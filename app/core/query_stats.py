@@ -0,0 +1,153 @@
+"""Per-request SQL statistics collected from SQLAlchemy engine events.
+
+Every statement executed while a request is in flight is counted, timed and
+its row count recorded.  The totals are exposed as a ``Server-Timing`` header
+and logged at the end of the request.  Statements that repeat many times in a
+single request are reported as probable N+1 patterns.
+
+Endpoints may declare a query budget with :func:`query_budget`.  When
+``QUERY_BUDGET_STRICT`` is enabled (test mode) exceeding it raises
+:class:`QueryBudgetExceeded` instead of logging a warning.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.query_stats")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when an endpoint runs more queries than declared."""
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0          # seconds spent waiting on the database
+    rows: int = 0
+    statements: Counter = field(default_factory=Counter)
+    route: Optional[str] = None        # "METHOD /path" of the originating request
+    user_role: Optional[str] = None    # set once the caller is authenticated
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements executed at least ``threshold`` times (likely N+1)."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Stats of the request currently being handled, if any."""
+    return _current_stats.get()
+
+
+def query_budget(max_queries: int) -> Callable:
+    """Declare the maximum number of SQL statements an endpoint may issue.
+
+    Apply below the router decorator::
+
+        @router.get("")
+        @query_budget(6)
+        async def read_things(...): ...
+    """
+    def decorator(func: Callable) -> Callable:
+        func.__query_budget__ = max_queries
+        return func
+    return decorator
+
+
+# ── Engine instrumentation ───────────────────────────────────────────────────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - started
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount and rowcount > 0:
+        stats.rows += rowcount
+    stats.statements[statement] += 1
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def install(engine) -> None:
+    """Attach the counters to an (async) engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if not settings.QUERY_STATS_ENABLED:
+            return await call_next(request)
+
+        stats = QueryStats(route=f"{request.method} {request.url.path}")
+        token = _current_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            _current_stats.reset(token)
+
+        db_ms = stats.duration * 1000
+        response.headers.append(
+            "Server-Timing",
+            f'db;dur={db_ms:.2f};desc="{stats.count} queries, {stats.rows} rows"',
+        )
+
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", request.url.path)
+        log_fields = {
+            "method": request.method,
+            "route": route_path,
+            "status_code": response.status_code,
+            "db_queries": stats.count,
+            "db_ms": round(db_ms, 2),
+            "db_rows": stats.rows,
+        }
+        logger.info(
+            "%s %s -> %s: %d queries, %.2f ms, %d rows",
+            request.method, route_path, response.status_code, stats.count, db_ms, stats.rows,
+            extra=log_fields,
+        )
+
+        for sql, n in stats.repeated(settings.QUERY_REPEAT_THRESHOLD):
+            logger.warning(
+                "Possible N+1 on %s %s: statement executed %d times: %s",
+                request.method, route_path, n, " ".join(sql.split())[:300],
+                extra=log_fields,
+            )
+
+        budget = getattr(getattr(route, "endpoint", None), "__query_budget__", None)
+        if budget is not None and stats.count > budget:
+            message = f"{request.method} {route_path} ran {stats.count} queries (budget {budget})"
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded: %s", message, extra=log_fields)
+
+        return response
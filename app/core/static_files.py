@@ -0,0 +1,160 @@
+"""Static file serving tuned for uploaded photos.
+
+Uploaded photos are never rewritten (content-addressed, or uniquely named
+legacy files), so everything under ``uploads/`` is sent with
+``Cache-Control: public, max-age=UPLOADS_MAX_AGE, immutable`` and a strong
+ETag: browsers re-open an audit without a single request for its photos.
+Other static files get ``STATIC_MAX_AGE`` and are revalidated as before.
+
+On top of ``StaticFiles`` this adds single-range requests (``206 Partial
+Content``, ``If-Range``) and serves a precompressed ``<file>.gz`` sibling
+when one exists and the client accepts gzip.  A missing resized variant of
+an upload (``<name>_<variant>.<ext>``, e.g. a photo Pillow could not
+process, or a legacy one) is answered with the original photo, so API
+responses can build variant URLs without looking at the disk.
+"""
+
+import os
+import re
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_HASH_STEM_RE = re.compile(r"^[0-9a-f]{64}(_\w+)?$")
+
+
+class _FileRangeResponse(Response):
+    """``206 Partial Content`` streaming bytes ``start..end`` (inclusive) of a file."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: PathLike, start: int, end: int, size: int, headers: dict, media_type: str):
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) of a single ``bytes=`` range; (size, size) when unsatisfiable, None when unusable."""
+    match = _RANGE_RE.match(value.strip())
+    if not match or match.groups() == ("", ""):
+        return None   # multiple or malformed ranges: serve the whole file
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return size, size
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return size, size
+    return start, end
+
+
+class CachedStaticFiles(StaticFiles):
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is None and path.split("/", 1)[0] == "uploads":
+            stem, ext = os.path.splitext(path)
+            for variant in settings.IMAGE_VARIANTS:
+                if stem.endswith(f"_{variant}"):
+                    return super().lookup_path(stem[: -len(variant) - 1] + ext)
+        return full_path, stat_result
+
+    def _is_upload(self, full_path: PathLike) -> bool:
+        relative = os.path.relpath(full_path, str(self.directory))
+        return relative.split(os.sep, 1)[0] == "uploads"
+
+    @staticmethod
+    def _etag(full_path: PathLike, stat_result: os.stat_result) -> str:
+        stem = os.path.splitext(os.path.basename(full_path))[0]
+        if _HASH_STEM_RE.match(stem):
+            return f'"{stem}"'
+        return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        if self._is_upload(full_path):
+            cache_control = f"public, max-age={settings.UPLOADS_MAX_AGE}, immutable"
+        else:
+            cache_control = f"public, max-age={settings.STATIC_MAX_AGE}"
+        etag = self._etag(full_path, stat_result)
+        headers = {"cache-control": cache_control, "accept-ranges": "bytes", "vary": "Accept-Encoding"}
+
+        # Precompressed sibling (whole-file responses only)
+        range_header = request_headers.get("range")
+        if not range_header and "gzip" in request_headers.get("accept-encoding", ""):
+            gz_path = f"{full_path}.gz"
+            try:
+                gz_stat = os.stat(gz_path)
+            except OSError:
+                gz_stat = None
+            if gz_stat is not None:
+                media_type = FileResponse(full_path, stat_result=stat_result).media_type
+                response = FileResponse(gz_path, stat_result=gz_stat, media_type=media_type, headers=headers)
+                response.headers["content-encoding"] = "gzip"
+                response.headers["etag"] = etag[:-1] + '-gz"'
+                if self.is_not_modified(response.headers, request_headers):
+                    return NotModifiedResponse(response.headers)
+                return response
+
+        response = FileResponse(full_path, stat_result=stat_result, headers=headers)
+        response.headers["etag"] = etag
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        if range_header:
+            if_range = request_headers.get("if-range")
+            if if_range is None or if_range in (etag, response.headers["last-modified"]):
+                size = stat_result.st_size
+                byte_range = _parse_range(range_header, size)
+                if byte_range == (size, size):
+                    return Response(
+                        status_code=416, headers={"content-range": f"bytes */{size}", "accept-ranges": "bytes"}
+                    )
+                if byte_range is not None:
+                    range_headers = {
+                        key: response.headers[key]
+                        for key in ("cache-control", "accept-ranges", "vary", "etag", "last-modified")
+                    }
+                    return _FileRangeResponse(
+                        full_path, byte_range[0], byte_range[1], size, range_headers, response.media_type
+                    )
+        return response
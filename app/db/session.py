@@ -1,8 +1,17 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core import admission, metrics, query_stats
+from app.db import slow_query
+
+# SQL statement logging is driven by the "sqlalchemy.engine" level in LOG_LEVELS
+# (and sampled by LOG_SQL_SAMPLE_RATE) instead of echo=True.
+engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+query_stats.install(engine)
+metrics.register_pool(engine)
+admission.register_pool(engine)
+slow_query.install(engine)
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
 SessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
@@ -0,0 +1,118 @@
+"""Opt-in slow-query log with automatic EXPLAIN capture.
+
+When ``SLOW_QUERY_ENABLED`` is set, every statement slower than
+``SLOW_QUERY_THRESHOLD_MS`` is recorded with its bound parameters and the
+originating request / user role (taken from the per-request query stats).
+For SELECT statements an ``EXPLAIN (ANALYZE, BUFFERS)`` plan is captured in a
+background task on a separate connection, so the request that triggered it
+is never delayed.  Entries are kept in an in-memory ring buffer and served by
+``GET /diagnostics/slow-queries``.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from sqlalchemy import event
+
+from app.core import query_stats
+from app.core.config import settings
+
+logger = logging.getLogger("app.slow_query")
+
+_SKIP_OPTION = "slow_query_skip"
+_MAX_PENDING_EXPLAINS = 4
+
+_entries: Deque[dict] = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+_ids = itertools.count(1)
+_pending: set = set()
+_engine = None
+
+
+def _format_parameters(parameters) -> Optional[str]:
+    if parameters is None:
+        return None
+    text = repr(parameters)
+    return text if len(text) <= 2000 else text[:2000] + "…"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_slow_query_started", None)
+    if started is None or context.execution_options.get(_SKIP_OPTION):
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    stats = query_stats.current_stats()
+    entry = {
+        "id": next(_ids),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "statement": statement,
+        "parameters": _format_parameters(parameters),
+        "route": stats.route if stats else None,
+        "user_role": stats.user_role if stats else None,
+        "plan": None,
+    }
+    _entries.append(entry)
+    logger.warning(
+        f"Slow query ({entry['duration_ms']} ms) on {entry['route']}: {' '.join(statement.split())[:300]}",
+        extra={"duration_ms": entry["duration_ms"], "route": entry["route"], "user_role": entry["user_role"]},
+    )
+
+    if (
+        settings.SLOW_QUERY_EXPLAIN
+        and not executemany
+        and statement.lstrip().upper().startswith("SELECT")
+        and len(_pending) < _MAX_PENDING_EXPLAINS
+    ):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        entry["plan"] = "pending"
+        task = loop.create_task(_capture_plan(entry, statement, parameters))
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+
+
+async def _capture_plan(entry: dict, statement: str, parameters) -> None:
+    try:
+        async with _engine.connect() as conn:
+            conn = await conn.execution_options(**{_SKIP_OPTION: True})
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters if parameters else ()
+            )
+            entry["plan"] = "\n".join(row[0] for row in result)
+            await conn.rollback()
+    except Exception as e:
+        entry["plan"] = f"EXPLAIN failed: {e}"
+
+
+def install(engine) -> None:
+    """Attach the slow-query hooks to an (async) engine when enabled."""
+    global _engine
+    if not settings.SLOW_QUERY_ENABLED:
+        return
+    _engine = engine
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def recent(limit: int = 50) -> List[dict]:
+    """Most recent slow queries first."""
+    return list(itertools.islice(reversed(_entries), limit))
+
+
+def clear() -> None:
+    _entries.clear()
@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from app.api.api_v1.api import api_router
 from app.core.config import settings
+from app.core import idempotency, metrics
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.core.profiling import ProfilingMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.static_files import CachedStaticFiles
 from app.services.notification import send_weekly_report, send_daily_report, send_monthly_report
+from app.services.upload_gc import run_upload_gc
+from app.services import email_outbox, jobs, mailer, pdf_render
 from app.db.session import engine, SessionLocal
 from app.db.base import Base
 from app.models import User, UserRole, Coffee, AuditCategory, AuditQuestion
@@ -13,20 +20,18 @@ from app.db.seed_data import DEFAULT_ADMIN, DEFAULT_COFFEES, AUDIT_CATEGORIES_DA
 from sqlalchemy import select, func
 import os
 import logging
+import secrets
 
-# Setup basic logging to file and console
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
-)
+# Queue-based logging: file/console writes happen on a listener thread
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+# Replay stored responses of retried writes sent with an Idempotency-Key.
+# Added before CORS so that CORS wraps it: replays, 409s and 422s get CORS headers too
+app.add_middleware(idempotency.IdempotencyMiddleware)
+
 # Set all CORS enabled origins - Always enable for development
 app.add_middleware(
     CORSMiddleware,
@@ -35,14 +40,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-request SQL query counting (Server-Timing header + N+1 warnings)
+app.add_middleware(QueryStatsMiddleware)
+# Request latency / in-flight metrics, scraped from /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+# Admin-triggered / sampled stack profiling, downloadable from /diagnostics/profiles
+app.add_middleware(ProfilingMiddleware)
 
 # Ensure static directory exists
 os.makedirs("app/static", exist_ok=True)
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 # Also mount at /api/static to handle cases where Apache proxies /api to the backend without stripping the prefix
-app.mount("/api/static", StaticFiles(directory="app/static"), name="api_static")
+app.mount("/api/static", CachedStaticFiles(directory="app/static"), name="api_static")
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -182,21 +193,28 @@ async def startup_event():
                 await db.commit()
                 print("Seeded database with 100 test audits and 400 daily logs successfully!")
 
-    # Logging for scheduler
+    # Logging for scheduler (routed to CRON_LOG_FILE by the logging pipeline)
     cron_logger = logging.getLogger("apscheduler")
-    cron_handler = logging.FileHandler("cron_jobs.log")
-    cron_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-    cron_logger.addHandler(cron_handler)
 
-    from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+    from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+    import time
+
+    job_started = {}
 
     def job_listener(event):
+        if event.code == EVENT_JOB_SUBMITTED:
+            job_started[event.job_id] = time.perf_counter()
+            return
+        started = job_started.pop(event.job_id, None)
+        if started is not None:
+            metrics.SCHEDULER_JOB_DURATION.observe(time.perf_counter() - started, job=event.job_id)
         if event.exception:
+            metrics.SCHEDULER_JOB_FAILURES.inc(job=event.job_id)
             cron_logger.error(f"Job {event.job_id} FAILED: {event.exception}")
         else:
             cron_logger.info(f"Job {event.job_id} completed successfully.")
 
-    scheduler.add_listener(job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+    scheduler.add_listener(job_listener, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
 
     # Schedule automated reports
     # Daily: Every day at 08:00
@@ -207,14 +225,45 @@ async def startup_event():
     
     # Monthly: 1st of every month at 09:00
     scheduler.add_job(send_monthly_report, "cron", day=1, hour=9, minute=0, id="monthly_report")
+
+    # Upload GC: every night at 03:15, one slice of the uploads tree per run
+    if settings.UPLOAD_GC_ENABLED:
+        scheduler.add_job(run_upload_gc, "cron", hour=3, minute=15, id="upload_gc", max_instances=1)
+
+    # Email outbox: purge sent / dead emails every night at 03:45
+    scheduler.add_job(email_outbox.purge_old_emails, "cron", hour=3, minute=45, id="email_outbox_purge", max_instances=1)
+
+    # Background jobs: drop expired results and artifacts every hour
+    scheduler.add_job(jobs.purge_expired_jobs, "cron", minute=5, id="jobs_purge", max_instances=1)
+
+    # Idempotency keys: drop expired stored responses every hour
+    scheduler.add_job(idempotency.purge_expired_keys, "cron", minute=35, id="idempotency_purge", max_instances=1)
     
     scheduler.start()
     print("Scheduler started!")
 
+    email_outbox.start()
+    jobs.start()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     scheduler.shutdown()
+    pdf_render.shutdown()
+    await jobs.stop()
+    await email_outbox.stop()
+    await mailer.close()
+    shutdown_logging()
 
 @app.get("/")
 def root():
     return {"message": "Welcome to Caribou Coffee API"}
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(authorization: str | None = Header(None)):
+    # Scrapers authenticate with METRICS_TOKEN; without one configured, /metrics stays hidden
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        return PlainTextResponse("metrics disabled\n", status_code=404)
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return PlainTextResponse("unauthorized\n", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
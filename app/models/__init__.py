@@ -1 +1 @@
-from .models import Audit, AuditAnswer, AuditCategory, AuditQuestion, Coffee, User, UserRole
\ No newline at end of file
+from .models import Audit, AuditAnswer, AuditCategory, AuditQuestion, Coffee, EmailOutbox, EmailStatus, IdempotencyKey, IdempotencyStatus, Job, JobStatus, Photo, User, UserRole
\ No newline at end of file
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import BigInteger, Column, Date, DateTime, Float, ForeignKey, Integer, String, Enum, Boolean, Table
+from sqlalchemy import BigInteger, Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Enum, Boolean, Table, Text, UniqueConstraint, text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -195,6 +195,123 @@ class AuditAnswer(Base):
     audit = relationship("Audit", back_populates="answers")
     question = relationship("AuditQuestion", back_populates="answers")
 
+    __table_args__ = (
+        UniqueConstraint("audit_id", "question_id", name="uq_audit_answers_audit_question"),
+    )
+
+class Photo(Base):
+    """
+    One stored photo referenced by an audit (answer_id NULL) or by one of its answers.
+    Mirrors the JSON lists in Audit.photo_url / AuditAnswer.photo_url so photo
+    lookups and reference counts are indexed queries.
+    """
+    __tablename__ = "photos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hash = Column(String(64), nullable=True, index=True)   # sha256 for content-addressed files
+    path = Column(String, nullable=False, index=True)      # URL as stored, e.g. /static/uploads/ab/cd/<hash>.jpg
+    size = Column(Integer, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    position = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    audit_id = Column(Integer, ForeignKey("audits.id", ondelete="CASCADE"), nullable=False, index=True)
+    answer_id = Column(Integer, ForeignKey("audit_answers.id", ondelete="CASCADE"), nullable=True, index=True)
+
+class EmailStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    DEAD = "DEAD"       # gave up after EMAIL_OUTBOX_MAX_ATTEMPTS
+
+class EmailOutbox(Base):
+    """
+    One rendered email for one recipient, delivered by the outbox dispatcher
+    (app/services/email_outbox.py).  Pending rows are claimed with
+    FOR UPDATE SKIP LOCKED and retried with exponential backoff.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_body = Column(Text, nullable=False)
+    plain_body = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default=EmailStatus.PENDING.value, server_default=EmailStatus.PENDING.value)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'PENDING'")),
+        Index("ix_email_outbox_status", "status"),
+    )
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+class Job(Base):
+    """
+    Background job (export, report sending...) run by the job workers of
+    app/services/jobs.py.  params / result are JSON strings; result may name
+    an artifact file kept until expires_at.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)              # uuid4 hex, handed to clients
+    type = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, default=JobStatus.QUEUED.value, server_default=JobStatus.QUEUED.value)
+    params = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    locked_until = Column(DateTime(timezone=True), nullable=True)   # lease of the worker running it
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    __table_args__ = (
+        Index("ix_jobs_active", "type", "created_at", postgresql_where=text("status IN ('QUEUED', 'RUNNING')")),
+    )
+
+class IdempotencyStatus(str, enum.Enum):
+    IN_PROGRESS = "IN_PROGRESS"
+    COMPLETED = "COMPLETED"
+
+class IdempotencyKey(Base):
+    """
+    Response stored for an ``Idempotency-Key`` (app/core/idempotency.py): a
+    retried write sent with the same key gets this response back instead of
+    running again.  Rows are purged once expires_at has passed.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)
+    method = Column(String(8), nullable=False)
+    path = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)   # sha256 of method, path and body
+    status = Column(String(16), nullable=False, default=IdempotencyStatus.IN_PROGRESS.value,
+                    server_default=IdempotencyStatus.IN_PROGRESS.value)
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    response_headers = Column(Text, nullable=True)   # JSON list of [name, value] pairs
+    locked_until = Column(DateTime(timezone=True), nullable=True)   # while IN_PROGRESS
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
+
 from sqlalchemy.orm import validates
 
 class ConformityThreshold(Base):
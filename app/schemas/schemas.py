@@ -1,8 +1,10 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field, computed_field
+from typing import Any, Dict, List, Optional
 import datetime
 from enum import Enum
 
+from app.utils.photo_urls import parse_photo_urls, variant_url
+
 class UserRole(str, Enum):
     ADMIN = "ADMIN"
     AUDITOR = "AUDITOR"
@@ -159,12 +161,21 @@ class AuditStatus(str, Enum):
     IN_PROGRESS = "IN_PROGRESS"
     COMPLETED = "COMPLETED"
 
+# --- Photo Schemas ---
+class PhotoUploadResponse(BaseModel):
+    """Returned by POST /photos; the url is what audits reference afterwards."""
+    id: str
+    url: str
+    size: int
+    variants: Dict[str, str] = {}   # e.g. {"thumb": ..., "medium": ...}
+
 # --- Audit Schemas ---
 class AuditAnswerBase(BaseModel):
     question_id: Optional[int] = None
     value: Optional[int] = None
     choice: Optional[str] = None
     comment: Optional[str] = None
+    # Photo URLs returned by POST /photos (preferred) or legacy base64 data URIs
     photo_data: Optional[List[str]] = None
 
 class AuditAnswerCreate(AuditAnswerBase):
@@ -175,9 +186,27 @@ class AuditAnswerResponse(AuditAnswerBase):
     photo_url: Optional[str] = None
     question: Optional[AuditQuestionResponse] = None
 
+    @computed_field
+    @property
+    def photo_thumbnails(self) -> List[str]:
+        """Thumbnail URL for each photo in photo_url (served as the original when none exists)."""
+        return [variant_url(url, "thumb") for url in parse_photo_urls(self.photo_url)]
+
     class Config:
         from_attributes = True
 
+class AuditAnswerUpsert(AuditAnswerBase):
+    """One answer of PATCH /audits/{id}/answers; fields left out are kept."""
+    question_id: int
+
+class AuditAnswersPatch(BaseModel):
+    answers: List[AuditAnswerUpsert] = Field(..., min_length=1, max_length=50)
+
+class AuditScoreResponse(BaseModel):
+    id: int
+    score: float
+    updated_at: Optional[datetime.datetime] = None
+
 class AuditCreate(BaseModel):
     coffee_id: int
     date: Optional[datetime.datetime] = None
@@ -188,8 +217,8 @@ class AuditCreate(BaseModel):
     training_needs: Optional[str] = None
     purchases: Optional[str] = None
     conclusion: Optional[str] = None
-    photo_data: Optional[List[str]] = None
-    existing_photo_urls: Optional[List[str]] = None
+    photo_data: Optional[List[str]] = None          # legacy base64 data URIs
+    existing_photo_urls: Optional[List[str]] = None  # photo URLs (e.g. from POST /photos)
     answers: List[AuditAnswerCreate] = []
 
 class AuditUpdate(BaseModel):
@@ -224,6 +253,12 @@ class AuditResponse(BaseModel):
     auditor: Optional[UserResponse] = None
     answers: List[AuditAnswerResponse] = []
 
+    @computed_field
+    @property
+    def photo_thumbnails(self) -> List[str]:
+        """Thumbnail URL for each photo in photo_url (served as the original when none exists)."""
+        return [variant_url(url, "thumb") for url in parse_photo_urls(self.photo_url)]
+
     class Config:
         from_attributes = True
 
@@ -362,3 +397,29 @@ class DailyLogListResponse(BaseModel):
     early_closures: int = 0
     monthly_average: float = 0.0        # average lost minutes for current month
     weekly_average: float = 0.0         # average lost minutes for current week
+
+
+class EmailOutboxStats(BaseModel):
+    pending: int
+    due: int                # pending and ready to be sent now
+    sent: int
+    dead: int
+    oldest_pending_age_seconds: Optional[float] = None
+
+
+class JobCreate(BaseModel):
+    type: str
+    params: Dict[str, Any] = {}
+
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str
+    error: Optional[str] = None
+    message: Optional[str] = None
+    artifact_url: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    expires_at: Optional[datetime.datetime] = None
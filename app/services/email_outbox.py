@@ -0,0 +1,215 @@
+"""Durable email outbox.
+
+Report jobs render their email once and ``enqueue`` one ``email_outbox`` row
+per recipient in a single INSERT, then return; SMTP latency and outages no
+longer hold up (or fail) the job.  A dispatcher task running in every API
+process drains the table:
+
+- due ``PENDING`` rows are claimed ``EMAIL_OUTBOX_BATCH_SIZE`` at a time with
+  ``FOR UPDATE SKIP LOCKED``, so several processes never send the same email;
+  claiming pushes ``next_attempt_at`` out by ``EMAIL_OUTBOX_LEASE_SECONDS``,
+  so rows claimed by a process that dies are picked up again later;
+- the batch is sent over the pooled SMTP connections (``app.services.mailer``);
+- failures are rescheduled with exponential backoff and dead-lettered
+  (``DEAD``) after ``EMAIL_OUTBOX_MAX_ATTEMPTS`` attempts.
+"""
+
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import EmailOutbox, EmailStatus
+from app.services import mailer
+
+logger = logging.getLogger("cron_service")
+
+_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+async def enqueue(db, emails: Sequence[Tuple[str, str, str, str]]) -> int:
+    """Queue (recipient, subject, html_body, plain_body) emails in one INSERT and commit."""
+    if not emails:
+        return 0
+    await db.execute(
+        insert(EmailOutbox),
+        [
+            {"recipient": recipient, "subject": subject, "html_body": html_body, "plain_body": plain_body}
+            for recipient, subject, html_body, plain_body in emails
+        ],
+    )
+    await db.commit()
+    metrics.EMAIL_OUTBOX_ENQUEUED.inc(len(emails))
+    logger.info(f"Queued {len(emails)} emails: {emails[0][1]}")
+    wake()
+    return len(emails)
+
+
+def wake() -> None:
+    """Have the dispatcher of this process look at the outbox now."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    delay = min(delay, settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+async def _claim_batch():
+    now = datetime.now(timezone.utc)
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == EmailStatus.PENDING.value, EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(settings.EMAIL_OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    async with SessionLocal() as db:
+        result = await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due.scalar_subquery()))
+            .values(
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+            )
+            .returning(
+                EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject,
+                EmailOutbox.html_body, EmailOutbox.plain_body, EmailOutbox.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await db.commit()
+    return rows
+
+
+async def _settle(rows, errors) -> None:
+    now = datetime.now(timezone.utc)
+    changes = []
+    for row, error in zip(rows, errors):
+        if error is None:
+            changes.append({"id": row.id, "status": EmailStatus.SENT.value, "sent_at": now, "last_error": None})
+        elif row.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            metrics.EMAIL_OUTBOX_DEAD.inc()
+            logger.error(f"Email {row.id} to {row.recipient} dead-lettered after {row.attempts} attempts: {error}")
+            changes.append({"id": row.id, "status": EmailStatus.DEAD.value, "last_error": error[:2000]})
+        else:
+            metrics.EMAIL_OUTBOX_RETRIES.inc()
+            changes.append({
+                "id": row.id,
+                "next_attempt_at": now + _backoff(row.attempts),
+                "last_error": error[:2000],
+            })
+    async with SessionLocal() as db:
+        # Grouped by key set: executemany needs the same columns in every row
+        by_keys: Dict[tuple, list] = {}
+        for change in changes:
+            by_keys.setdefault(tuple(sorted(change)), []).append(change)
+        for group in by_keys.values():
+            await db.execute(update(EmailOutbox), group)
+        await db.commit()
+
+
+async def dispatch_once() -> int:
+    """Claim, send and settle one batch; returns the number of emails claimed."""
+    rows = await _claim_batch()
+    if not rows:
+        return 0
+    messages = [mailer.build_message(r.subject, r.recipient, r.html_body, r.plain_body) for r in rows]
+    errors = await mailer.send_messages(messages)
+    await _settle(rows, errors)
+    return len(rows)
+
+
+async def _update_pending_gauge() -> None:
+    async with SessionLocal() as db:
+        pending = await db.scalar(
+            select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status == EmailStatus.PENDING.value)
+        )
+    metrics.EMAIL_OUTBOX_PENDING.set(pending or 0)
+
+
+async def _run() -> None:
+    while True:
+        try:
+            while await dispatch_once() >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                pass
+            await _update_pending_gauge()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Email outbox dispatcher error: {e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.EMAIL_OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start() -> None:
+    global _task, _wakeup
+    if _task is None:
+        _wakeup = asyncio.Event()
+        _task = asyncio.create_task(_run(), name="email_outbox_dispatcher")
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        task, _task = _task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def queue_stats(db) -> dict:
+    """Counts per status plus the age of the oldest pending email."""
+    result = await db.execute(
+        select(EmailOutbox.status, func.count(), func.min(EmailOutbox.created_at))
+        .group_by(EmailOutbox.status)
+    )
+    counts = {status.value: 0 for status in EmailStatus}
+    oldest_pending = None
+    for status, count, oldest in result.all():
+        counts[status] = count
+        if status == EmailStatus.PENDING.value:
+            oldest_pending = oldest
+    due = await db.scalar(
+        select(func.count()).select_from(EmailOutbox).where(
+            EmailOutbox.status == EmailStatus.PENDING.value,
+            EmailOutbox.next_attempt_at <= datetime.now(timezone.utc),
+        )
+    )
+    age = (datetime.now(timezone.utc) - oldest_pending).total_seconds() if oldest_pending else None
+    return {
+        "pending": counts[EmailStatus.PENDING.value],
+        "due": due or 0,
+        "sent": counts[EmailStatus.SENT.value],
+        "dead": counts[EmailStatus.DEAD.value],
+        "oldest_pending_age_seconds": age,
+    }
+
+
+async def purge_old_emails() -> None:
+    """Scheduled job: delete sent and dead emails older than EMAIL_OUTBOX_RETENTION_DAYS."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+    async with SessionLocal() as db:
+        result = await db.execute(
+            delete(EmailOutbox).where(
+                EmailOutbox.status.in_([EmailStatus.SENT.value, EmailStatus.DEAD.value]),
+                EmailOutbox.created_at < cutoff,
+            )
+        )
+        await db.commit()
+    logger.info(f"Email outbox purge: {result.rowcount} emails deleted")
@@ -0,0 +1,134 @@
+"""Async image ingestion.
+
+Decoding base64 payloads and writing them to disk is CPU and I/O bound, so it
+runs on a dedicated, bounded thread pool instead of the event loop.  All the
+photos of an audit are submitted together and processed in parallel (up to
+``IMAGE_IO_WORKERS`` at a time), keeping their original order.
+
+Binary uploads (``POST /photos``) are streamed chunk by chunk to a temporary
+file and capped at ``MAX_UPLOAD_BYTES``, so the request body is never buffered
+in memory.  Photos are stored under the sha256 of the uploaded bytes, so the
+same photo sent twice is stored once.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.utils.image_utils import (
+    UPLOAD_DIR, describe_photo, save_base64_image, sniff_image_extension, store_image, variant_url,
+)
+
+logger = logging.getLogger("app.image_ingest")
+
+_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_IO_WORKERS, thread_name_prefix="image-io")
+
+
+def _timed_save(data_uri: str) -> Optional[str]:
+    started = time.perf_counter()
+    url = save_base64_image(data_uri)
+    elapsed = time.perf_counter() - started
+    metrics.UPLOAD_DURATION.observe(elapsed)
+    logger.debug(
+        f"Stored upload {url} in {elapsed * 1000:.1f} ms",
+        extra={"upload_url": url, "upload_ms": round(elapsed * 1000, 2)},
+    )
+    return url
+
+
+async def save_image(data_uri: str) -> Optional[str]:
+    """Decode and store one base64 image off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _timed_save, data_uri)
+
+
+async def save_images(data_uris: List[str]) -> List[Optional[str]]:
+    """Store several base64 images in parallel, preserving order."""
+    if not data_uris:
+        return []
+    return list(await asyncio.gather(*(save_image(item) for item in data_uris)))
+
+
+async def describe_photos(urls: List[str]) -> List[Dict[str, Optional[int]]]:
+    """Hash, size and dimensions of stored photos, read off the event loop."""
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(loop.run_in_executor(_executor, describe_photo, url) for url in urls)))
+
+
+class UploadTooLarge(ValueError):
+    """The streamed upload exceeded ``MAX_UPLOAD_BYTES``."""
+
+
+class UnsupportedImage(ValueError):
+    """The streamed upload is not a JPEG, PNG or WebP image."""
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _finalize_upload(tmp_path: str, digest: str, ext: str) -> Tuple[str, Dict[str, str], bool]:
+    """Store the temporary upload under its hash; returns its URL, variant URLs and dedup flag."""
+    try:
+        url, variants, existed = store_image(tmp_path, digest, ext)
+    finally:
+        _remove_quietly(tmp_path)
+    return url, {name: variant_url(url, name) for name in variants}, existed
+
+
+async def store_stream(chunks: AsyncIterator[bytes]) -> dict:
+    """Stream an uploaded image to disk and return its id, URL and size."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4()}.part")
+    hasher = hashlib.sha256()
+
+    await loop.run_in_executor(_executor, lambda: os.makedirs(UPLOAD_DIR, exist_ok=True))
+    f = await loop.run_in_executor(_executor, open, tmp_path, "wb")
+    size = 0
+    head = b""
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > settings.MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"Upload exceeds {settings.MAX_UPLOAD_BYTES} bytes")
+            if len(head) < 16:
+                head += chunk[:16]
+            hasher.update(chunk)
+            await loop.run_in_executor(_executor, f.write, chunk)
+        await loop.run_in_executor(_executor, f.close)
+
+        ext = sniff_image_extension(head)
+        if ext is None:
+            raise UnsupportedImage("Only JPEG, PNG and WebP images are accepted")
+        digest = hasher.hexdigest()
+        url, variants, existed = await loop.run_in_executor(_executor, _finalize_upload, tmp_path, digest, ext)
+    except BaseException:
+        f.close()
+        await loop.run_in_executor(_executor, _remove_quietly, tmp_path)
+        raise
+
+    elapsed = time.perf_counter() - started
+    if existed:
+        metrics.UPLOAD_DEDUPLICATED.inc()
+    else:
+        metrics.UPLOAD_BYTES.inc(size)
+    metrics.UPLOAD_SIZE.observe(size)
+    metrics.UPLOAD_DURATION.observe(elapsed)
+    logger.debug(
+        f"Streamed upload {url} ({size} bytes{', deduplicated' if existed else ''}) in {elapsed * 1000:.1f} ms",
+        extra={"upload_url": url, "upload_ms": round(elapsed * 1000, 2), "deduplicated": existed},
+    )
+    return {"id": digest, "url": url, "size": size, "variants": variants}
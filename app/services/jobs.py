@@ -0,0 +1,302 @@
+"""Background jobs backed by the ``jobs`` table.
+
+``submit`` inserts a ``QUEUED`` row and returns it; clients poll
+``GET /jobs/{id}`` and download the artifact (if any) from
+``GET /jobs/{id}/artifact``.  Every API process runs a worker task that
+claims queued jobs — under a transaction-level advisory lock, with
+``FOR UPDATE SKIP LOCKED`` — so that at most ``JOB_CONCURRENCY[type]``
+(default ``JOB_DEFAULT_CONCURRENCY``) jobs of a type run at once across all
+processes.  No broker is needed.
+
+A running job holds a lease (``locked_until``) renewed every third of
+``JOB_LEASE_SECONDS``; the job of a process that died is taken over once its
+lease expires, up to ``JOB_MAX_ATTEMPTS`` runs.  Results and artifacts are
+kept for ``JOB_RESULT_TTL_SECONDS``.
+
+Handlers are registered with ``register(type, func)``.  ``func`` is called
+as ``func(db=..., current_user=..., **params)`` (export endpoints can be
+registered as they are) and returns a message, None, or a ``Response`` whose
+body becomes the job's artifact.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.params import Depends as DependsParam, Param
+from pydantic import ValidationError, create_model
+from sqlalchemy import and_, delete, func, or_, select, text, update
+from sqlalchemy.orm import selectinload
+from starlette.responses import Response, StreamingResponse
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import Job, JobStatus, User
+
+logger = logging.getLogger("app.jobs")
+
+_CLAIM_LOCK_ID = 0x6A6F6273   # pg advisory lock serialising claims ("jobs")
+_RESERVED = ("db", "current_user")
+_FILENAME_RE = re.compile(r'filename="?([^";]+)"?')
+
+_handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+_param_models: Dict[str, Any] = {}
+_running: Dict[str, asyncio.Task] = {}
+_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+class UnknownJobType(ValueError):
+    pass
+
+
+def register(job_type: str, func: Callable[..., Awaitable[Any]]) -> None:
+    """Make ``func`` runnable as ``job_type``; its other parameters are the job params."""
+    fields = {}
+    for name, parameter in inspect.signature(func).parameters.items():
+        if name in _RESERVED or isinstance(parameter.default, DependsParam):
+            continue
+        default = parameter.default
+        if isinstance(default, Param):
+            default = default.default
+        annotation = parameter.annotation if parameter.annotation is not inspect.Parameter.empty else Any
+        fields[name] = (annotation, ... if default is inspect.Parameter.empty else default)
+    _handlers[job_type] = func
+    _param_models[job_type] = create_model(f"{job_type}_params", __config__={"extra": "forbid"}, **fields)
+
+
+def validate_params(job_type: str, params: Optional[dict], mode: str = "python") -> dict:
+    """Validated params (raises UnknownJobType or pydantic.ValidationError)."""
+    if job_type not in _handlers:
+        raise UnknownJobType(job_type)
+    return _param_models[job_type](**(params or {})).model_dump(mode=mode)
+
+
+def concurrency(job_type: str) -> int:
+    return settings.JOB_CONCURRENCY.get(job_type, settings.JOB_DEFAULT_CONCURRENCY)
+
+
+def artifact_dir(job_id: str) -> str:
+    return os.path.join(settings.JOB_ARTIFACT_DIR, job_id)
+
+
+async def submit(db, job_type: str, params: Optional[dict], user: Optional[User]) -> Job:
+    job = Job(
+        id=uuid.uuid4().hex,
+        type=job_type,
+        status=JobStatus.QUEUED.value,
+        params=json.dumps(validate_params(job_type, params, mode="json")),
+        created_by=user.id if user else None,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    wake()
+    return job
+
+
+def wake() -> None:
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+# ── Worker ───────────────────────────────────────────────────────────────────
+
+async def _claim():
+    """Claim as many runnable jobs as the per-type limits allow."""
+    now = datetime.now(timezone.utc)
+    lease = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    live = and_(Job.status == JobStatus.RUNNING.value, Job.locked_until > now)
+    runnable = or_(
+        Job.status == JobStatus.QUEUED.value,
+        and_(Job.status == JobStatus.RUNNING.value, Job.locked_until <= now),   # worker lost
+    )
+    claimed = []
+    async with SessionLocal() as db:
+        await db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _CLAIM_LOCK_ID})
+
+        # Runs of a lost worker beyond JOB_MAX_ATTEMPTS: give up
+        await db.execute(
+            update(Job)
+            .where(Job.status == JobStatus.RUNNING.value, Job.locked_until <= now,
+                   Job.attempts >= settings.JOB_MAX_ATTEMPTS)
+            .values(status=JobStatus.FAILED.value, error="Interrompu (processus arrêté)", finished_at=now,
+                    expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        running = dict((await db.execute(select(Job.type, func.count()).where(live).group_by(Job.type))).all())
+        waiting = (await db.execute(select(Job.type).where(runnable).group_by(Job.type))).scalars().all()
+
+        for job_type in waiting:
+            free = concurrency(job_type) - running.get(job_type, 0)
+            if free <= 0 or job_type not in _handlers:
+                continue
+            ids = (
+                select(Job.id).where(Job.type == job_type, runnable)
+                .order_by(Job.created_at).limit(free).with_for_update(skip_locked=True)
+            )
+            result = await db.execute(
+                update(Job)
+                .where(Job.id.in_(ids.scalar_subquery()))
+                .values(status=JobStatus.RUNNING.value, attempts=Job.attempts + 1,
+                        started_at=now, locked_until=lease, error=None)
+                .returning(Job.id, Job.type, Job.params, Job.created_by)
+                .execution_options(synchronize_session=False)
+            )
+            claimed.extend(result.all())
+        await db.commit()
+    return claimed
+
+
+async def _renew_lease(job_id: str) -> None:
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+        try:
+            async with SessionLocal() as db:
+                await db.execute(
+                    update(Job).where(Job.id == job_id, Job.status == JobStatus.RUNNING.value)
+                    .values(locked_until=datetime.now(timezone.utc) + timedelta(seconds=settings.JOB_LEASE_SECONDS))
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Could not renew the lease of job {job_id}: {e}")
+
+
+async def _store_artifact(job_id: str, response: Response) -> dict:
+    match = _FILENAME_RE.search(response.headers.get("content-disposition", ""))
+    filename = os.path.basename(match.group(1)) if match else "resultat"
+    directory = artifact_dir(job_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename)
+    size = 0
+    with open(path, "wb") as f:
+        if isinstance(response, StreamingResponse):
+            async for chunk in response.body_iterator:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(response.charset)
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+        else:
+            await asyncio.to_thread(f.write, response.body)
+            size = len(response.body)
+    return {"artifact": filename, "media_type": response.media_type, "size": size}
+
+
+async def _execute(job_id: str, job_type: str, raw_params: Optional[str], user_id: Optional[int]) -> None:
+    started = time.perf_counter()
+    metrics.JOBS_RUNNING.inc(type=job_type)
+    renew = asyncio.create_task(_renew_lease(job_id))
+    status, result, error = JobStatus.SUCCEEDED.value, None, None
+    try:
+        params = validate_params(job_type, json.loads(raw_params or "{}"))
+        async with SessionLocal() as db:
+            user = None
+            if user_id is not None:
+                user = (await db.execute(
+                    select(User).options(selectinload(User.managed_coffees), selectinload(User.rights))
+                    .where(User.id == user_id)
+                )).scalars().first()
+            output = await _handlers[job_type](db=db, current_user=user, **params)
+        if isinstance(output, Response):
+            if output.status_code >= 400:
+                raise HTTPException(status_code=output.status_code, detail=bytes(output.body).decode(errors="replace"))
+            result = await _store_artifact(job_id, output)
+        else:
+            result = {"message": output} if output is not None else {}
+    except HTTPException as e:
+        status, error = JobStatus.FAILED.value, str(e.detail)
+    except (ValidationError, UnknownJobType) as e:
+        status, error = JobStatus.FAILED.value, f"Paramètres invalides: {e}"
+    except Exception as e:
+        logger.exception(f"Job {job_id} ({job_type}) failed")
+        status, error = JobStatus.FAILED.value, str(e) or type(e).__name__
+    finally:
+        renew.cancel()
+        metrics.JOBS_RUNNING.dec(type=job_type)
+
+    now = datetime.now(timezone.utc)
+    async with SessionLocal() as db:
+        await db.execute(
+            update(Job).where(Job.id == job_id).values(
+                status=status,
+                result=json.dumps(result) if result is not None else None,
+                error=error,
+                finished_at=now,
+                locked_until=None,
+                expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL_SECONDS),
+            )
+        )
+        await db.commit()
+    metrics.JOB_DURATION.observe(time.perf_counter() - started, type=job_type, status=status)
+    logger.info(f"Job {job_id} ({job_type}) {status} in {time.perf_counter() - started:.1f}s")
+
+
+def _spawn(job_id: str, job_type: str, params: Optional[str], user_id: Optional[int]) -> None:
+    task = asyncio.create_task(_execute(job_id, job_type, params, user_id), name=f"job:{job_id}")
+    _running[job_id] = task
+
+    def _done(_):
+        _running.pop(job_id, None)
+        wake()   # a slot of this type is free again
+
+    task.add_done_callback(_done)
+
+
+async def _run() -> None:
+    while True:
+        try:
+            for job_id, job_type, params, user_id in await _claim():
+                _spawn(job_id, job_type, params, user_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job worker error: {e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start() -> None:
+    global _task, _wakeup
+    if _task is None:
+        _wakeup = asyncio.Event()
+        _task = asyncio.create_task(_run(), name="job_worker")
+
+
+async def stop() -> None:
+    """Stop claiming; jobs still running are abandoned and taken over after their lease."""
+    global _task
+    if _task is not None:
+        task, _task = _task, None
+        task.cancel()
+        for job in list(_running.values()):
+            job.cancel()
+        await asyncio.gather(task, *_running.values(), return_exceptions=True)
+
+
+async def purge_expired_jobs() -> None:
+    """Scheduled job: delete finished jobs past their TTL, with their artifacts."""
+    now = datetime.now(timezone.utc)
+    async with SessionLocal() as db:
+        result = await db.execute(
+            delete(Job)
+            .where(Job.expires_at <= now, Job.status.in_([JobStatus.SUCCEEDED.value, JobStatus.FAILED.value]))
+            .returning(Job.id)
+        )
+        job_ids = result.scalars().all()
+        await db.commit()
+    for job_id in job_ids:
+        await asyncio.to_thread(shutil.rmtree, artifact_dir(job_id), True)
+    logger.info(f"Job purge: {len(job_ids)} expired jobs deleted")
@@ -0,0 +1,164 @@
+"""Outgoing mail over a small pool of authenticated SMTP connections.
+
+Opening an SMTP session costs a TCP connect, STARTTLS and AUTH round trips,
+so connections are kept open and reused across messages: at most
+``SMTP_POOL_SIZE`` are open, which is also the number of messages sent in
+parallel.  A connection is closed after ``SMTP_MAX_MESSAGES_PER_CONNECTION``
+messages, when it has been idle for ``SMTP_IDLE_TIMEOUT_SECONDS`` (servers
+drop idle sessions) and after any error.  A message whose reused connection
+turns out to be closed by the server is retried once on a fresh one.
+"""
+
+import asyncio
+import logging
+import time
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional, Sequence
+
+import aiosmtplib
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger("cron_service")
+
+
+def build_message(subject: str, to: str, html_body: str, plain_body: str) -> MIMEMultipart:
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = f"{settings.EMAILS_FROM_NAME} <{settings.EMAILS_FROM_EMAIL}>"
+    message["To"] = to
+    message.attach(MIMEText(plain_body, "plain", "utf-8"))
+    message.attach(MIMEText(html_body, "html", "utf-8"))
+    return message
+
+
+class _Connection:
+    __slots__ = ("client", "sent", "last_used")
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SmtpPool:
+    def __init__(self, size: int):
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[_Connection] = []
+
+    async def _connect(self) -> _Connection:
+        client = aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER or None,
+            password=settings.SMTP_PASSWORD or None,
+            use_tls=False,
+            start_tls=settings.SMTP_START_TLS,
+            timeout=settings.SMTP_TIMEOUT,
+        )
+        await client.connect()   # also runs STARTTLS and AUTH
+        metrics.SMTP_CONNECTIONS_OPENED.inc()
+        return _Connection(client)
+
+    def _take_idle(self) -> Optional[_Connection]:
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.client.is_connected and now - conn.last_used < settings.SMTP_IDLE_TIMEOUT_SECONDS:
+                return conn
+            conn.client.close()
+        return None
+
+    @staticmethod
+    async def _quit(conn: _Connection) -> None:
+        try:
+            await asyncio.wait_for(conn.client.quit(), settings.SMTP_TIMEOUT)
+        except Exception:
+            conn.client.close()
+
+    async def send(self, message: Message) -> None:
+        async with self._slots:
+            metrics.SMTP_CONNECTIONS_IN_USE.inc()
+            started = time.perf_counter()
+            try:
+                conn = self._take_idle()
+                reused = conn is not None
+                if conn is None:
+                    conn = await self._connect()
+                try:
+                    try:
+                        await conn.client.send_message(message)
+                    except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+                        if not reused:
+                            raise
+                        # The server dropped the idle session: retry once on a new one
+                        conn.client.close()
+                        conn = await self._connect()
+                        await conn.client.send_message(message)
+                except Exception:
+                    conn.client.close()
+                    raise
+                metrics.EMAIL_SEND_DURATION.observe(time.perf_counter() - started)
+
+                conn.sent += 1
+                conn.last_used = time.monotonic()
+                if conn.sent >= settings.SMTP_MAX_MESSAGES_PER_CONNECTION:
+                    await self._quit(conn)
+                else:
+                    self._idle.append(conn)
+            finally:
+                metrics.SMTP_CONNECTIONS_IN_USE.dec()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._quit(conn) for conn in idle))
+
+
+_pool: Optional[SmtpPool] = None
+
+
+def _get_pool() -> SmtpPool:
+    global _pool
+    if _pool is None:
+        _pool = SmtpPool(settings.SMTP_POOL_SIZE)
+    return _pool
+
+
+async def _send_one(pool: SmtpPool, message: Message) -> Optional[str]:
+    try:
+        await pool.send(message)
+    except Exception as e:
+        metrics.EMAIL_SENT.inc(status="failed")
+        logger.error(f"Failed to send email to {message['To']}: {e}")
+        return str(e) or type(e).__name__
+    metrics.EMAIL_SENT.inc(status="sent")
+    logger.info(f"Email sent successfully to {message['To']}")
+    return None
+
+
+async def send_messages(messages: Sequence[Message]) -> List[Optional[str]]:
+    """Send ``messages`` over the pool, ``SMTP_POOL_SIZE`` at a time.
+
+    Returns one entry per message: None when it was sent, else the error.
+    """
+    if not messages:
+        return []
+    pool = _get_pool()
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(_send_one(pool, message) for message in messages))
+    sent = sum(1 for error in errors if error is None)
+    logger.info(
+        f"{sent}/{len(messages)} emails sent in {time.perf_counter() - started:.1f}s"
+    )
+    return list(errors)
+
+
+async def close() -> None:
+    """Politely close the idle connections (application shutdown)."""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
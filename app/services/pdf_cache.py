@@ -0,0 +1,105 @@
+"""Disk cache of rendered audit PDFs.
+
+Entries are stored as ``PDF_CACHE_DIR/<audit_id>-<version>.pdf`` where the
+version hashes the audit's ``updated_at`` and the conformity thresholds'
+``updated_at``, so any edit yields a new key; ``invalidate`` additionally
+drops an audit's files when it is updated or deleted.  The version doubles as
+the ETag of ``GET /audits/{id}/pdf``.
+
+The cache is bounded by ``PDF_CACHE_MAX_BYTES``: a hit refreshes the file's
+mtime and the least recently used files are evicted after each store.
+"""
+
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger("app.pdf_cache")
+
+
+def audit_version(updated_at: Optional[datetime], thresholds_updated_at: Optional[datetime]) -> str:
+    raw = f"{updated_at.isoformat() if updated_at else ''}|{thresholds_updated_at.isoformat() if thresholds_updated_at else ''}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _path(audit_id: int, version: str) -> str:
+    return os.path.join(settings.PDF_CACHE_DIR, f"{audit_id}-{version}.pdf")
+
+
+def _lookup(audit_id: int, version: str) -> Optional[str]:
+    path = _path(audit_id, version)
+    try:
+        os.utime(path)   # LRU clock
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def _evict() -> None:
+    entries = []
+    with os.scandir(settings.PDF_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith(".pdf"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= settings.PDF_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+def _store(audit_id: int, version: str, pdf_bytes: bytes) -> None:
+    os.makedirs(settings.PDF_CACHE_DIR, exist_ok=True)
+    path = _path(audit_id, version)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+    _evict()
+
+
+def _invalidate(audit_ids: Iterable[int]) -> None:
+    for audit_id in audit_ids:
+        for path in glob.glob(os.path.join(settings.PDF_CACHE_DIR, f"{int(audit_id)}-*.pdf")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+async def lookup(audit_id: int, version: str) -> Optional[str]:
+    """Path of the cached PDF for this audit version, if any."""
+    if not settings.PDF_CACHE_ENABLED:
+        return None
+    path = await asyncio.to_thread(_lookup, audit_id, version)
+    (metrics.PDF_CACHE_HITS if path else metrics.PDF_CACHE_MISSES).inc()
+    return path
+
+
+async def store(audit_id: int, version: str, pdf_bytes: bytes) -> None:
+    if not settings.PDF_CACHE_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(_store, audit_id, version, pdf_bytes)
+    except OSError as e:
+        logger.error(f"Could not cache PDF of audit {audit_id}: {e}")
+
+
+async def invalidate(*audit_ids: int) -> None:
+    """Drop every cached PDF of the given audits."""
+    if not settings.PDF_CACHE_ENABLED or not os.path.isdir(settings.PDF_CACHE_DIR):
+        return
+    await asyncio.to_thread(_invalidate, audit_ids)
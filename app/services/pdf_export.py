@@ -0,0 +1,166 @@
+"""Batch export of audit PDFs as a streamed ZIP archive.
+
+PDFs are taken from the PDF cache or rendered in the PDF process pool,
+``PDF_ZIP_CONCURRENCY`` at a time, and each one is written to the archive
+and sent to the client as soon as it is ready (so entries follow completion
+order, not audit order).  Entries are stored uncompressed: PDFs are already
+compressed.  Once ``PDF_ZIP_MAX_BYTES`` would be exceeded no further audits
+are rendered; the ones left out are reported in a ``LISEZ-MOI.txt`` entry at
+the end of the archive.
+
+The generator opens its own DB sessions: request dependencies are closed
+before a streaming response body is produced.  For the same reason the
+endpoint hands over its admission-control slot (``slot``), which the
+generator releases once the archive is done or the client went away.
+"""
+
+import asyncio
+import logging
+import re
+import time
+import zipfile
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import Audit, AuditAnswer, AuditQuestion, ConformityThreshold
+from app.services import pdf_cache, pdf_render
+from app.utils.pdf_generator import audit_snapshot
+
+logger = logging.getLogger("app.pdf_export")
+
+
+class _ZipBuffer:
+    """Write-only, non-seekable sink for ZipFile; drained after every entry."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def entry_name(audit: Audit) -> str:
+    coffee = re.sub(r"[^\w\-]+", "_", audit.coffee.name if audit.coffee else "cafe").strip("_")
+    day = (audit.date or audit.created_at).strftime("%Y%m%d") if (audit.date or audit.created_at) else "report"
+    return f"audit_{audit.id}_{coffee}_{day}.pdf"
+
+
+async def _load_chunk(audit_ids: Sequence[int]):
+    async with SessionLocal() as db:
+        thresholds_updated_at = await db.scalar(select(func.max(ConformityThreshold.updated_at)))
+        result = await db.execute(
+            select(Audit).options(
+                selectinload(Audit.coffee),
+                selectinload(Audit.auditor),
+                selectinload(Audit.answers).selectinload(AuditAnswer.question).selectinload(AuditQuestion.category),
+            ).where(Audit.id.in_(audit_ids))
+        )
+        audits = result.scalars().all()
+        return [
+            (
+                entry_name(audit),
+                audit.id,
+                pdf_cache.audit_version(audit.updated_at or audit.created_at, thresholds_updated_at),
+                audit_snapshot(audit),
+            )
+            for audit in audits
+        ]
+
+
+async def _pdf_for(name: str, audit_id: int, version: str, snapshot, semaphore: asyncio.Semaphore):
+    """(name, PDF bytes), or (name, None) when rendering failed."""
+    try:
+        cached_path = await pdf_cache.lookup(audit_id, version)
+        if cached_path:
+            return name, await asyncio.to_thread(_read, cached_path)
+        async with semaphore:
+            pdf_bytes = await pdf_render.render_audit_pdf(snapshot, batch=True)
+        await pdf_cache.store(audit_id, version, pdf_bytes)
+        return name, pdf_bytes
+    except Exception as e:
+        logger.error(f"PDF export failed for audit {audit_id}: {e}")
+        return name, None
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def stream_audit_pdfs_zip(audit_ids: Sequence[int], slot: Optional[AsyncExitStack] = None) -> AsyncIterator[bytes]:
+    started = time.perf_counter()
+    buffer = _ZipBuffer()
+    archive = zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED)
+    semaphore = asyncio.Semaphore(settings.PDF_ZIP_CONCURRENCY)
+    written = 0
+    skipped: List[str] = []
+    failed: List[str] = []
+    chunk_size = settings.PDF_ZIP_CONCURRENCY * 4
+    not_rendered = 0
+
+    try:
+        for start in range(0, len(audit_ids), chunk_size):
+            entries = await _load_chunk(audit_ids[start:start + chunk_size])
+            tasks = [
+                _pdf_for(name, audit_id, version, snapshot, semaphore)
+                for name, audit_id, version, snapshot in entries
+            ]
+            for done in asyncio.as_completed(tasks):
+                name, pdf_bytes = await done
+                if pdf_bytes is None:
+                    failed.append(name)
+                    continue
+                if written + len(pdf_bytes) > settings.PDF_ZIP_MAX_BYTES:
+                    skipped.append(name)
+                    continue
+                archive.writestr(name, pdf_bytes)
+                written += len(pdf_bytes)
+                yield buffer.drain()
+            if skipped:
+                # Size cap reached: don't render what cannot be included
+                not_rendered = len(audit_ids) - (start + chunk_size)
+                break
+
+        if skipped or failed:
+            lines = []
+            if skipped:
+                lines.append(f"Taille maximale de l'export atteinte ({settings.PDF_ZIP_MAX_BYTES // (1024 * 1024)} Mo).")
+                lines.append("Audits non inclus (affinez les filtres) :")
+                lines.extend(f"  {name}" for name in skipped)
+                if not_rendered > 0:
+                    lines.append(f"  ... et {not_rendered} autres audits")
+            if failed:
+                lines.append("Audits dont la generation a echoue :")
+                lines.extend(f"  {name}" for name in failed)
+            archive.writestr("LISEZ-MOI.txt", "\n".join(lines) + "\n")
+        archive.close()
+        yield buffer.drain()
+    finally:
+        if slot is not None:
+            await slot.aclose()
+        metrics.EXPORT_DURATION.observe(time.perf_counter() - started, kind="audits_pdf_zip")
+        logger.info(
+            f"PDF ZIP export: {len(audit_ids)} audits, {written} bytes, "
+            f"{len(skipped)} skipped, {len(failed)} failed in {time.perf_counter() - started:.1f}s"
+        )
+
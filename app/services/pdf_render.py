@@ -0,0 +1,136 @@
+"""Audit PDF rendering off the event loop.
+
+fpdf2 rendering (and decoding every embedded photo) is CPU bound, so it runs
+in a small process pool of ``PDF_WORKERS`` processes.  At most
+``PDF_MAX_PENDING`` renders are accepted per API process (running + waiting
+for a worker); beyond that ``PdfBusy`` is raised and the endpoint answers 429,
+so a burst of downloads degrades into fast rejections instead of a stalled
+worker.  Batch renders (ZIP exports) wait for a slot instead, but all of them
+together hold at most ``PDF_BATCH_MAX_IN_FLIGHT`` slots, so single downloads
+always keep the rest.  A render that exceeds ``PDF_TIMEOUT_SECONDS`` raises
+``PdfTimeout``; its slot stays taken until the worker process finishes it,
+which keeps the admission count honest.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.core import metrics
+from app.core.config import settings
+from app.utils.pdf_generator import generate_audit_pdf
+
+logger = logging.getLogger("app.pdf_render")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_in_flight = 0
+_batch_slots: Optional[asyncio.Semaphore] = None
+
+
+class PdfBusy(RuntimeError):
+    """All render slots are taken."""
+
+
+class PdfTimeout(TimeoutError):
+    """The render did not finish within ``PDF_TIMEOUT_SECONDS``."""
+
+
+def _render(snapshot) -> bytes:
+    return bytes(generate_audit_pdf(snapshot))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # "spawn": forking the API process would copy its event loop and threads
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=settings.PDF_TASKS_PER_WORKER,
+        )
+    return _pool
+
+
+def _update_gauges() -> None:
+    metrics.PDF_RENDERS_IN_FLIGHT.set(_in_flight)
+    metrics.PDF_QUEUE_DEPTH.set(max(_in_flight - settings.PDF_WORKERS, 0))
+
+
+def _release(future: asyncio.Future) -> None:
+    global _in_flight
+    _in_flight -= 1
+    _update_gauges()
+    if not future.cancelled():
+        future.exception()   # mark as retrieved when the caller already gave up
+
+
+def _batch_semaphore() -> asyncio.Semaphore:
+    global _batch_slots
+    if _batch_slots is None:
+        _batch_slots = asyncio.Semaphore(settings.PDF_BATCH_MAX_IN_FLIGHT)
+    return _batch_slots
+
+
+def _release_batch_slot(_: asyncio.Future) -> None:
+    _batch_semaphore().release()
+
+
+def saturated() -> bool:
+    return _in_flight >= settings.PDF_MAX_PENDING
+
+
+async def render_audit_pdf(snapshot, batch: bool = False) -> bytes:
+    """Render an ``audit_snapshot`` in the process pool.
+
+    When all slots are taken, raises ``PdfBusy``.  With ``batch`` (ZIP
+    exports) it first takes one of the ``PDF_BATCH_MAX_IN_FLIGHT`` batch slots,
+    then polls until a render slot frees up.
+    """
+    global _in_flight
+    if batch:
+        await _batch_semaphore().acquire()
+    try:
+        while saturated():
+            if not batch:
+                metrics.PDF_RENDERS_REJECTED.inc()
+                raise PdfBusy(f"{_in_flight} PDF renders already in progress")
+            await asyncio.sleep(0.1)
+        future = _get_pool().submit(_render, snapshot)
+    except BaseException:
+        if batch:
+            _batch_semaphore().release()
+        raise
+
+    _in_flight += 1
+    _update_gauges()
+    # Runs on the loop thread (wrap_future) so the counter is never raced
+    wrapped = asyncio.wrap_future(future)
+    wrapped.add_done_callback(_release)
+    if batch:
+        # Like the render slot, held until the worker is done, even after a timeout
+        wrapped.add_done_callback(_release_batch_slot)
+
+    started = time.perf_counter()
+    try:
+        pdf_bytes = await asyncio.wait_for(asyncio.shield(wrapped), settings.PDF_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        metrics.PDF_RENDERS_TIMED_OUT.inc()
+        logger.error(f"PDF render of audit {getattr(snapshot, 'id', '?')} timed out")
+        raise PdfTimeout(f"PDF rendering took longer than {settings.PDF_TIMEOUT_SECONDS}s")
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        shutdown()
+        raise
+    metrics.PDF_GENERATION_DURATION.observe(time.perf_counter() - started)
+    return pdf_bytes
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,71 @@
+"""Keeps the ``photos`` table in sync with the audit photo_url JSON columns.
+
+The JSON columns remain what the API reads and writes; the ``photos`` rows
+are rewritten from them whenever an audit is created or updated, so that
+"all photos of audit X", reference counts and garbage collection can use
+indexed queries.
+"""
+
+from typing import List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Audit, AuditAnswer, Photo
+from app.services import image_ingest
+from app.utils.image_utils import parse_photo_urls
+
+
+async def sync_audit_photos(
+    db: AsyncSession, audit: Audit, answers: Optional[List[AuditAnswer]] = None
+) -> None:
+    """
+    Rewrite the photo rows of ``audit`` from its photo_url columns.
+
+    ``answers`` are the audit's current answers; when None only the
+    audit-level photos are refreshed and answer photos are left untouched.
+    The caller commits.
+    """
+    await db.flush()   # assigns ids to new audits / answers
+
+    stmt = delete(Photo).where(Photo.audit_id == audit.id)
+    if answers is None:
+        stmt = stmt.where(Photo.answer_id.is_(None))
+    await db.execute(stmt)
+
+    refs = [(None, position, url) for position, url in enumerate(parse_photo_urls(audit.photo_url))]
+    for answer in answers or []:
+        refs.extend((answer.id, position, url) for position, url in enumerate(parse_photo_urls(answer.photo_url)))
+    if not refs:
+        return
+
+    infos = await image_ingest.describe_photos([url for _, _, url in refs])
+    db.add_all([
+        Photo(audit_id=audit.id, answer_id=answer_id, position=position, path=url, **info)
+        for (answer_id, position, url), info in zip(refs, infos)
+    ])
+
+
+async def sync_answer_photos(db: AsyncSession, audit_id: int, answers: List[AuditAnswer]) -> None:
+    """
+    Rewrite the photo rows of ``answers`` only (answer autosave); the rows of
+    the audit's other answers and of the audit itself are left untouched.
+    The caller commits.
+    """
+    if not answers:
+        return
+    await db.flush()
+
+    await db.execute(delete(Photo).where(Photo.answer_id.in_([answer.id for answer in answers])))
+
+    refs = []
+    for answer in answers:
+        refs.extend((answer.id, position, url) for position, url in enumerate(parse_photo_urls(answer.photo_url)))
+    if not refs:
+        return
+
+    infos = await image_ingest.describe_photos([url for _, _, url in refs])
+    db.add_all([
+        Photo(audit_id=audit_id, answer_id=answer_id, position=position, path=url, **info)
+        for (answer_id, position, url), info in zip(refs, infos)
+    ])
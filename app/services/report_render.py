@@ -0,0 +1,120 @@
+"""Rendering of the audit report emails.
+
+The HTML lives in ``app/templates/emails`` and is compiled by Jinja2 once,
+when this module is imported.  Rendered bodies are memoized for
+``REPORT_RENDER_TTL_SECONDS`` under a key naming the period, the data
+version (audit count and latest change) and the scope of the report, so the
+scheduled job and manual sends for the same window share one query and one
+render until an audit is created, edited or deleted; concurrent requests for a key that is being built
+wait for that build instead of starting their own.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.core.config import settings
+
+_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "emails")
+
+_env = Environment(
+    loader=FileSystemLoader(_TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+)
+_audit_report = _env.get_template("audit_report.html")
+
+_memo: Dict[Hashable, Tuple[float, Any]] = {}
+_building: Dict[Hashable, asyncio.Future] = {}
+
+
+def score_color(score: float) -> str:
+    if score >= 85:
+        return "#2e7d32"
+    if score >= 70:
+        return "#e65100"
+    return "#c62828"
+
+
+def score_badge_bg(score: float) -> str:
+    if score >= 85:
+        return "#e8f5e9"
+    if score >= 70:
+        return "#fff3e0"
+    return "#ffebee"
+
+
+def score_label(score: float) -> str:
+    if score >= 85:
+        return "Conforme"
+    if score >= 70:
+        return "Partiel"
+    return "Non-conforme"
+
+
+def render_audit_report(rows: List[dict], period_label: str, now: datetime,
+                        coffees: Optional[List[dict]] = None) -> str:
+    """HTML body of a report; ``rows`` are dicts with id, coffee, shift, auditor,
+    created_at, score and nc (non-conform answers), newest first.  ``coffees``
+    (coffee, audits, avg_score, nc) adds a per-coffee summary when it has
+    more than one entry."""
+    total = len(rows)
+    avg_score = (sum(r["score"] for r in rows) / total) if total else 0
+    return _audit_report.render(
+        period_label=period_label,
+        generated_at=now.strftime("%d/%m/%Y à %H:%M"),
+        frontend_url=settings.FRONTEND_URL,
+        total=total,
+        avg_score=avg_score,
+        avg_score_color=score_color(avg_score),
+        avg_score_bg=score_badge_bg(avg_score),
+        conformes=sum(1 for r in rows if r["score"] >= 85),
+        total_nc_questions=sum(r["nc"] for r in rows),
+        coffees=[
+            {**c, "score_color": score_color(c["avg_score"]), "score_bg": score_badge_bg(c["avg_score"])}
+            for c in coffees or []
+        ] if coffees and len(coffees) > 1 else [],
+        rows=[
+            {
+                **r,
+                "date": r["created_at"].strftime("%d/%m/%Y %H:%M") if r["created_at"] else "—",
+                "score_color": score_color(r["score"]),
+                "score_bg": score_badge_bg(r["score"]),
+                "score_label": score_label(r["score"]),
+            }
+            for r in rows
+        ],
+    )
+
+
+async def memoized(key: Hashable, build: Callable[[], Awaitable[Any]]) -> Any:
+    """``await build()``, reusing its result for the same key within the TTL."""
+    now = time.monotonic()
+    for stale in [k for k, (expires, _) in _memo.items() if expires <= now]:
+        del _memo[stale]
+    if key in _memo:
+        return _memo[key][1]
+    if key in _building:
+        return await asyncio.shield(_building[key])
+
+    future = asyncio.get_running_loop().create_future()
+    _building[key] = future
+    try:
+        value = await build()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()   # retrieved: waiters (if any) re-raise it
+        raise
+    finally:
+        _building.pop(key, None)
+    future.set_result(value)
+    if settings.REPORT_RENDER_TTL_SECONDS > 0:
+        _memo[key] = (time.monotonic() + settings.REPORT_RENDER_TTL_SECONDS, value)
+    return value
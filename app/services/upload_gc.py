@@ -0,0 +1,236 @@
+"""Incremental garbage collector for uploaded photos.
+
+Uploads live in 256 hash-prefix directories (``uploads/<ab>/<cd>/...``, see
+``image_utils.store_image``) plus legacy uuid-named files at the top level.
+Each run walks the next ``UPLOAD_GC_SHARDS_PER_RUN`` of those directories
+(resuming from a cursor file), so a full sweep is spread over several runs.
+
+Files are examined with ``os.scandir`` in batches of ``UPLOAD_GC_BATCH_SIZE``;
+each batch is checked against the indexed ``photos`` table in one query and
+orphans are deleted.  Files younger than ``UPLOAD_GC_GRACE_HOURS`` are never
+touched, which protects uploads not yet attached to an audit (``POST
+/photos``) and photos re-used through deduplication (their mtime is refreshed
+on every hit, and checked again once a file is set aside for deletion).
+Runs pause between batches and stop after ``UPLOAD_GC_MAX_DELETES``
+deletions, and only read the database.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import exists, or_, select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import Audit, Photo
+from app.utils.image_utils import UPLOAD_DIR, UPLOAD_URL_PREFIX
+
+logger = logging.getLogger("cron_service")
+
+_CURSOR_FILE = ".gc_cursor"
+_LEGACY_SHARD = "."   # top-level (pre content-addressing) files
+
+
+@dataclass
+class GCReport:
+    dry_run: bool
+    shards: List[str] = field(default_factory=list)
+    scanned: int = 0
+    kept_recent: int = 0
+    deleted: int = 0
+    bytes_freed: int = 0
+    errors: int = 0
+    duration_s: float = 0.0
+
+
+def _photo_key(path: str) -> Tuple[str, Optional[str]]:
+    """Main-photo URL and content hash a stored file (or one of its variants) belongs to."""
+    relative = os.path.relpath(path, UPLOAD_DIR).replace(os.sep, "/")
+    directory, filename = os.path.split(relative)
+    stem, ext = os.path.splitext(filename)
+    for variant in settings.IMAGE_VARIANTS:
+        if stem.endswith(f"_{variant}"):
+            stem = stem[: -len(variant) - 1]
+            break
+    url = f"{UPLOAD_URL_PREFIX}/{directory + '/' if directory else ''}{stem}{ext}"
+    return url, stem if len(stem) == 64 else None
+
+
+def _list_shards() -> List[str]:
+    with os.scandir(UPLOAD_DIR) as it:
+        shards = sorted(entry.name for entry in it if entry.is_dir() and not entry.name.startswith("."))
+    return [_LEGACY_SHARD] + shards
+
+
+def _scan_shard(shard: str) -> List[Tuple[str, int, float]]:
+    """(path, size, mtime) of every stored file in one shard directory."""
+    files = []
+    stack = [os.path.join(UPLOAD_DIR, shard)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue   # in-flight uploads, temp files, the cursor
+                if entry.is_dir(follow_symlinks=False):
+                    if shard != _LEGACY_SHARD:
+                        stack.append(entry.path)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                files.append((entry.path, st.st_size, st.st_mtime))
+    return files
+
+
+def _read_cursor() -> Optional[str]:
+    try:
+        with open(os.path.join(UPLOAD_DIR, _CURSOR_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_cursor(shard: str) -> None:
+    with open(os.path.join(UPLOAD_DIR, _CURSOR_FILE), "w", encoding="utf-8") as f:
+        f.write(shard)
+
+
+def _delete(paths: List[Tuple[str, int]], cutoff: float) -> Tuple[int, int, int, int]:
+    """Delete orphans that are still older than ``cutoff``: (deleted, bytes freed, kept, errors).
+
+    Each file is first renamed to a hidden tombstone, so a dedup hit can no
+    longer refresh it (it stores the content again instead), then its age is
+    re-checked: a hit that refreshed it before the rename puts it back.
+    """
+    deleted = freed = kept = errors = 0
+    for path, size in paths:
+        tombstone = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.gc")
+        try:
+            os.rename(path, tombstone)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            errors += 1
+            logger.error(f"Upload GC could not delete {path}: {e}")
+            continue
+        try:
+            if os.stat(tombstone).st_mtime >= cutoff:
+                # Re-used since the scan: restore it (a copy stored meanwhile has the same bytes)
+                os.replace(tombstone, path)
+                kept += 1
+                continue
+            os.remove(tombstone)
+            deleted += 1
+            freed += size
+        except OSError as e:
+            errors += 1
+            logger.error(f"Upload GC could not delete {path}: {e}")
+    return deleted, freed, kept, errors
+
+
+async def _referenced(db, batch: List[Tuple[str, int, float]]) -> set:
+    keys = [_photo_key(path) for path, _, _ in batch]
+    urls = {url for url, _ in keys}
+    hashes = {h for _, h in keys if h}
+    clause = Photo.path.in_(urls)
+    if hashes:
+        clause = or_(clause, Photo.hash.in_(hashes))
+    result = await db.execute(select(Photo.path, Photo.hash).where(clause))
+    found = set()
+    for path, digest in result.all():
+        found.add(path)
+        if digest:
+            found.add(digest)
+    return found
+
+
+async def collect_garbage(
+    dry_run: bool = False,
+    shards_per_run: Optional[int] = None,
+    grace_hours: Optional[float] = None,
+    max_deletes: Optional[int] = None,
+) -> GCReport:
+    """Delete unreferenced uploads in the next slice of shard directories."""
+    report = GCReport(dry_run=dry_run)
+    started = time.perf_counter()
+    if not os.path.isdir(UPLOAD_DIR):
+        return report
+
+    shards_per_run = shards_per_run or settings.UPLOAD_GC_SHARDS_PER_RUN
+    grace_hours = settings.UPLOAD_GC_GRACE_HOURS if grace_hours is None else grace_hours
+    max_deletes = max_deletes or settings.UPLOAD_GC_MAX_DELETES
+    cutoff = time.time() - grace_hours * 3600
+    pause = settings.UPLOAD_GC_BATCH_PAUSE_MS / 1000
+    batch_size = settings.UPLOAD_GC_BATCH_SIZE
+
+    async with SessionLocal() as db:
+        # Refuse to run against a database whose photos table was never backfilled
+        has_photos = await db.scalar(select(exists().where(Photo.id.isnot(None))))
+        has_audit_photos = await db.scalar(select(exists().where(Audit.photo_url.isnot(None))))
+        if not has_photos and has_audit_photos:
+            logger.error("Upload GC skipped: photos table is empty, run the migrations first")
+            return report
+
+        shards = await asyncio.to_thread(_list_shards)
+        cursor = await asyncio.to_thread(_read_cursor)
+        start = shards.index(cursor) + 1 if cursor in shards else 0
+        selected = [shards[(start + i) % len(shards)] for i in range(min(shards_per_run, len(shards)))]
+
+        for shard in selected:
+            files = await asyncio.to_thread(_scan_shard, shard)
+            for offset in range(0, len(files), batch_size):
+                batch = files[offset:offset + batch_size]
+                report.scanned += len(batch)
+                old = [item for item in batch if item[2] < cutoff]
+                report.kept_recent += len(batch) - len(old)
+                if not old:
+                    continue
+
+                found = await _referenced(db, old)
+                orphans = []
+                for path, size, _ in old:
+                    url, digest = _photo_key(path)
+                    if url not in found and (digest is None or digest not in found):
+                        orphans.append((path, size))
+                orphans = orphans[: max_deletes - report.deleted]
+
+                if dry_run:
+                    for path, size in orphans:
+                        logger.info(f"Upload GC (dry run) would delete {path} ({size} bytes)")
+                    report.deleted += len(orphans)
+                    report.bytes_freed += sum(size for _, size in orphans)
+                else:
+                    deleted, freed, kept, errors = await asyncio.to_thread(_delete, orphans, cutoff)
+                    report.deleted += deleted
+                    report.bytes_freed += freed
+                    report.kept_recent += kept
+                    report.errors += errors
+
+                if report.deleted >= max_deletes:
+                    break
+                await asyncio.sleep(pause)
+
+            if report.deleted >= max_deletes:
+                # The interrupted shard is scanned again by the next run
+                logger.warning(f"Upload GC stopped after {report.deleted} deletions (UPLOAD_GC_MAX_DELETES)")
+                break
+            report.shards.append(shard)
+
+    if report.shards and not dry_run:
+        await asyncio.to_thread(_write_cursor, report.shards[-1])
+    report.duration_s = round(time.perf_counter() - started, 2)
+    logger.info(
+        f"Upload GC {'dry run ' if dry_run else ''}done: scanned {report.scanned} files in "
+        f"{len(report.shards)} shards, {'would delete' if dry_run else 'deleted'} {report.deleted} "
+        f"({report.bytes_freed / (1024 * 1024):.2f} MB), kept {report.kept_recent} recent",
+        extra={"gc_scanned": report.scanned, "gc_deleted": report.deleted, "gc_bytes": report.bytes_freed},
+    )
+    return report
+
+
+async def run_upload_gc() -> None:
+    """Scheduled entry point."""
+    await collect_garbage()
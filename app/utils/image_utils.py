@@ -1,9 +1,188 @@
 import base64
+import hashlib
+import io
+import logging
 import os
 import uuid
-from typing import Optional
+from typing import Dict, List, Optional, Tuple, Union
 
-def save_base64_image(data_uri: str, upload_dir: str = "app/static/uploads") -> Optional[str]:
+from PIL import Image, ImageOps
+
+from app.core import metrics
+from app.core.config import settings
+from app.utils.photo_urls import parse_photo_urls, variant_url  # noqa: F401 (re-exported)
+
+logger = logging.getLogger("app.image_utils")
+
+UPLOAD_DIR = "app/static/uploads"
+UPLOAD_URL_PREFIX = "/static/uploads"
+
+_PIL_FORMATS = {"jpeg": ("JPEG", "jpg"), "webp": ("WEBP", "webp")}
+
+
+def sniff_image_extension(head: bytes) -> Optional[str]:
+    """Return the file extension for JPEG/PNG/WebP data based on its magic bytes."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def local_path(url: str) -> str:
+    """Filesystem path of a ``/static/...`` URL."""
+    return "app" + url if url.startswith("/static/") else url
+
+
+def _directory_url(directory: str) -> str:
+    """URL of a directory under ``app/static`` (the inverse of ``local_path``)."""
+    relative = os.path.relpath(directory, "app").replace(os.sep, "/")
+    if not relative.startswith("static/"):
+        raise ValueError(f"{directory} is not served under /static")
+    return "/" + relative
+
+
+def best_variant_url(url: str, variant: str) -> str:
+    """URL of ``variant`` if it was generated for this photo, else the original URL."""
+    candidate = variant_url(url, variant)
+    return candidate if os.path.exists(local_path(candidate)) else url
+
+
+def describe_photo(url: str) -> Dict[str, Optional[int]]:
+    """Hash, size and dimensions of a stored photo (None for whatever is unavailable)."""
+    stem = os.path.splitext(os.path.basename(url))[0]
+    info = {
+        "hash": stem if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem) else None,
+        "size": None, "width": None, "height": None,
+    }
+    path = local_path(url)
+    try:
+        info["size"] = os.path.getsize(path)
+        with Image.open(path) as img:   # reads the header only
+            info["width"], info["height"] = img.size
+    except Exception:
+        pass
+    return info
+
+
+def _encode(img: Image.Image, pil_format: str) -> bytes:
+    buf = io.BytesIO()
+    if pil_format == "JPEG":
+        img.save(buf, "JPEG", quality=settings.IMAGE_QUALITY, optimize=True, progressive=True)
+    else:
+        img.save(buf, pil_format, quality=settings.IMAGE_QUALITY, method=4)
+    return buf.getvalue()
+
+
+def process_image(source: Union[str, io.BytesIO]) -> Tuple[str, Dict[str, bytes]]:
+    """
+    Normalise an uploaded photo for storage.
+
+    Applies the EXIF orientation, caps the long edge at ``IMAGE_MAX_EDGE``,
+    recompresses to ``IMAGE_FORMAT``/``IMAGE_QUALITY`` (dropping metadata) and
+    renders the ``IMAGE_VARIANTS`` thumbnails.  Returns the file extension and
+    the encoded bytes keyed by variant name ("" is the main image).
+    """
+    pil_format, ext = _PIL_FORMATS.get(settings.IMAGE_FORMAT.lower(), _PIL_FORMATS["jpeg"])
+    with Image.open(source) as img:
+        # Let the JPEG decoder downscale by a power of two while decoding
+        img.draft("RGB", (settings.IMAGE_MAX_EDGE, settings.IMAGE_MAX_EDGE))
+        img = ImageOps.exif_transpose(img)
+        if pil_format == "JPEG" and img.mode != "RGB":
+            if img.mode in ("RGBA", "LA", "P"):
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+        img.thumbnail((settings.IMAGE_MAX_EDGE, settings.IMAGE_MAX_EDGE), Image.LANCZOS)
+        outputs = {"": _encode(img, pil_format)}
+        # Largest variant first so each one is downscaled from the previous
+        current = img
+        for name, edge in sorted(settings.IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+            current = current.copy()
+            current.thumbnail((edge, edge), Image.LANCZOS)
+            outputs[name] = _encode(current, pil_format)
+    return ext, outputs
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _shard(digest: str) -> str:
+    # Two levels of 256 directories keep every directory small
+    return f"{digest[:2]}/{digest[2:4]}"
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # Concurrent writers of the same hash produce identical bytes, so the
+    # last rename wins harmlessly and readers never see a partial file.
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def store_image(source: Union[bytes, str], digest: str, ext: str, upload_dir: str = UPLOAD_DIR) -> Tuple[str, List[str], bool]:
+    """
+    Store an image under its content hash (``<ab>/<cd>/<sha256>.<ext>``).
+
+    ``source`` is the raw bytes or the path of a temporary file holding them,
+    ``digest`` their sha256 and ``ext`` the extension they were sent with.
+    Files are immutable: when the same content was stored before nothing is
+    written.  Returns the photo URL, the generated variant names and whether
+    the content was already present.
+    """
+    shard_dir = os.path.join(upload_dir, _shard(digest))
+    url_dir = f"{_directory_url(upload_dir)}/{_shard(digest)}"
+    processed_ext = _PIL_FORMATS.get(settings.IMAGE_FORMAT.lower(), _PIL_FORMATS["jpeg"])[1]
+
+    for candidate in dict.fromkeys((processed_ext, ext)):
+        existing = os.path.join(shard_dir, f"{digest}.{candidate}")
+        try:
+            # Refresh the mtimes so the upload GC grace period covers the re-use;
+            # the GC looks at variant files on their own.  A file missing here
+            # (or being deleted by the GC right now) is stored again below
+            os.utime(existing)
+        except FileNotFoundError:
+            continue
+        variants = []
+        for name in settings.IMAGE_VARIANTS:
+            try:
+                os.utime(os.path.join(shard_dir, f"{digest}_{name}.{candidate}"))
+                variants.append(name)
+            except FileNotFoundError:
+                pass
+        return f"{url_dir}/{digest}.{candidate}", variants, True
+
+    os.makedirs(shard_dir, exist_ok=True)
+    if settings.IMAGE_PROCESSING_ENABLED:
+        try:
+            out_ext, outputs = process_image(io.BytesIO(source) if isinstance(source, bytes) else source)
+            # Variants first: once the main file exists the photo counts as stored
+            for variant in sorted(outputs, reverse=True):
+                name = f"{digest}_{variant}.{out_ext}" if variant else f"{digest}.{out_ext}"
+                _write_atomic(os.path.join(shard_dir, name), outputs[variant])
+            return f"{url_dir}/{digest}.{out_ext}", [name for name in outputs if name], False
+        except Exception as e:
+            # Not something Pillow can read: keep the bytes as they were sent
+            logger.warning(f"Image processing failed, storing original {digest}.{ext}: {e}", exc_info=True)
+
+    target = os.path.join(shard_dir, f"{digest}.{ext}")
+    if isinstance(source, bytes):
+        _write_atomic(target, source)
+    else:
+        os.replace(source, target)
+    return f"{url_dir}/{digest}.{ext}", [], False
+
+
+def save_base64_image(data_uri: str, upload_dir: str = UPLOAD_DIR) -> Optional[str]:
     """
     Decodes a base64 image string and saves it to the specified directory.
     Returns the relative URL path to the saved image.
@@ -31,17 +210,17 @@ def save_base64_image(data_uri: str, upload_dir: str = "app/static/uploads") ->
             encoded = data_uri
             ext = "jpg"
 
-        # Generate unique filename
-        filename = f"{uuid.uuid4()}.{ext}"
-        filepath = os.path.join(upload_dir, filename)
-
-        # Decode and save
-        with open(filepath, "wb") as f:
-            f.write(base64.b64decode(encoded))
+        # Decode and save under the content hash (re-sent photos are not duplicated)
+        data = base64.b64decode(encoded)
+        url, _, existed = store_image(data, content_hash(data), ext, upload_dir)
+        if existed:
+            metrics.UPLOAD_DEDUPLICATED.inc()
+        else:
+            metrics.UPLOAD_BYTES.inc(len(data))
+        metrics.UPLOAD_SIZE.observe(len(data))
 
         # Return relative URL (assuming static mount at /static)
-        # We return the path relative to the mounting point
-        return f"/static/uploads/{filename}"
+        return url
     except Exception as e:
         print(f"Error saving image: {e}")
         return None
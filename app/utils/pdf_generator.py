@@ -1,20 +1,47 @@
-import json
 import os
+from types import SimpleNamespace
 from fpdf import FPDF
+from app.core.config import settings
 from app.models.models import Audit
+from app.utils.image_utils import best_variant_url, local_path, parse_photo_urls
 
 
-def _parse_photo_urls(raw: str | None) -> list[str]:
-    """Parse photo_url field which may be a JSON array or a legacy single path."""
-    if not raw:
-        return []
-    try:
-        parsed = json.loads(raw)
-        if isinstance(parsed, list):
-            return parsed
-    except (json.JSONDecodeError, TypeError):
-        pass
-    return [raw]
+def audit_snapshot(audit: Audit) -> SimpleNamespace:
+    """
+    Plain, picklable copy of the audit fields the PDF uses, so rendering can
+    run in another process (or after the DB session is closed).
+    The audit must be loaded with its coffee, auditor and answers/questions/categories.
+    """
+    return SimpleNamespace(
+        id=audit.id,
+        score=audit.score,
+        status=audit.status,
+        created_at=audit.created_at,
+        shift=audit.shift,
+        staff_present=audit.staff_present,
+        photo_url=audit.photo_url,
+        conclusion=audit.conclusion,
+        actions_correctives=audit.actions_correctives,
+        training_needs=audit.training_needs,
+        purchases=audit.purchases,
+        coffee=SimpleNamespace(name=audit.coffee.name),
+        auditor=SimpleNamespace(full_name=audit.auditor.full_name, email=audit.auditor.email),
+        answers=[
+            SimpleNamespace(
+                value=ans.value,
+                choice=ans.choice,
+                comment=ans.comment,
+                photo_url=ans.photo_url,
+                question=SimpleNamespace(
+                    text=ans.question.text,
+                    weight=ans.question.weight,
+                    category=SimpleNamespace(name=ans.question.category.name) if ans.question.category else None,
+                ) if ans.question else None,
+            )
+            for ans in audit.answers
+        ],
+    )
+
 
 class AuditPDF(FPDF):
     def header(self):
@@ -82,7 +109,7 @@ def generate_audit_pdf(audit: Audit) -> bytes:
     pdf.ln(5)
 
     # General Photos
-    photo_urls = _parse_photo_urls(audit.photo_url)
+    photo_urls = parse_photo_urls(audit.photo_url)
     if photo_urls:
         pdf.ln(2)
         pdf.set_font('Arial', 'B', 12)
@@ -94,9 +121,7 @@ def generate_audit_pdf(audit: Audit) -> bytes:
         gap = 2
         
         for i, pu in enumerate(photo_urls):
-            img_path = pu
-            if img_path.startswith('/static/'):
-                img_path = "app" + img_path
+            img_path = local_path(best_variant_url(pu, settings.PDF_IMAGE_VARIANT))
             if os.path.exists(img_path):
                 try:
                     col = i % 5
@@ -169,7 +194,7 @@ def generate_audit_pdf(audit: Audit) -> bytes:
             pdf.set_text_color(100, 100, 100)
             pdf.cell(25, 8, pts_str, border='RTB', align='C', ln=1)
             
-            ans_photo_urls = _parse_photo_urls(ans.photo_url)
+            ans_photo_urls = parse_photo_urls(ans.photo_url)
             if ans.comment or ans_photo_urls:
                 pdf.set_font('Arial', 'I', 9)
                 pdf.set_text_color(80, 80, 80)
@@ -184,9 +209,7 @@ def generate_audit_pdf(audit: Audit) -> bytes:
                 gap = 2
                 
                 for i, apu in enumerate(ans_photo_urls):
-                    img_path = apu
-                    if img_path.startswith('/static/'):
-                        img_path = "app" + img_path
+                    img_path = local_path(best_variant_url(apu, settings.PDF_IMAGE_VARIANT))
                     if os.path.exists(img_path):
                         try:
                             # 5 images per row horizontally
@@ -0,0 +1,28 @@
+"""Photo URL helpers that never touch the filesystem (safe in schemas and on the event loop)."""
+
+import json
+import os
+from typing import List, Optional
+
+
+def parse_photo_urls(raw: Optional[str]) -> List[str]:
+    """Parse a photo_url column, which may be a JSON array or a legacy single path."""
+    if not raw:
+        return []
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list):
+            return parsed
+    except (json.JSONDecodeError, TypeError):
+        pass
+    return [raw]
+
+
+def variant_url(url: str, variant: str) -> str:
+    """URL of a resized variant of an uploaded photo (``<name>_<variant>.<ext>``).
+
+    Static file serving falls back to the original photo when the variant was
+    never generated, so the URL is usable without checking the disk.
+    """
+    stem, ext = os.path.splitext(url)
+    return f"{stem}_{variant}{ext}"
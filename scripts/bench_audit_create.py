@@ -0,0 +1,142 @@
+"""Compare the database work of audit creation, old flow vs POST /audits.
+
+Creates --runs audits of --questions answers (no photos) against the
+configured database with each flow, counts the SQL statements through the
+query_stats instrumentation and reports statements and wall time per audit:
+
+  legacy   what create_audit used to do: insert and commit the audit, refresh
+           it, add the answers one by one, commit, refresh, then reload the
+           audit with the five-level eager load for the response
+  current  app.api.api_v1.endpoints.audits.create_audit (one transaction,
+           answers in one multi-row INSERT ... RETURNING, response built from
+           the rows already loaded)
+
+The audits created are deleted at the end.
+
+Usage (from the project root, with the backend environment configured):
+    python -m scripts.bench_audit_create --questions 60 --runs 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app.api.api_v1.endpoints import audits  # noqa: E402
+from app.core import query_stats  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.models import (  # noqa: E402
+    Audit, AuditAnswer, AuditCategory, AuditQuestion, AuditStatus, Coffee, Photo, User, UserRole,
+)
+from app.schemas import schemas  # noqa: E402
+
+
+async def legacy(db, audit_in, current_user):
+    q_result = await db.execute(
+        select(AuditQuestion).where(AuditQuestion.id.in_([a.question_id for a in audit_in.answers]))
+    )
+    questions_map = {q.id: q for q in q_result.scalars().all()}
+    audit = Audit(
+        coffee_id=audit_in.coffee_id,
+        auditor_id=current_user.id,
+        score=0.0,
+        status=audit_in.status or AuditStatus.IN_PROGRESS,
+    )
+    db.add(audit)
+    await db.commit()
+    await db.refresh(audit)
+
+    scored = possible = 0
+    for answer in audit_in.answers:
+        question = questions_map[answer.question_id]
+        value = audits._answer_value(question, answer.choice)
+        if (answer.choice or "").lower() != "n/a":
+            scored += value
+            possible += question.weight or 1
+        db.add(AuditAnswer(audit_id=audit.id, question_id=answer.question_id, value=value,
+                           choice=answer.choice, comment=answer.comment))
+    audit.score = round(scored / possible * 100, 2) if possible else 0.0
+    await db.commit()
+    await db.refresh(audit)
+
+    result = await db.execute(
+        select(Audit).options(
+            selectinload(Audit.coffee).selectinload(Coffee.schedules),
+            selectinload(Audit.auditor),
+            selectinload(Audit.answers).selectinload(AuditAnswer.question)
+            .selectinload(AuditQuestion.category).selectinload(AuditCategory.questions),
+        ).where(Audit.id == audit.id)
+    )
+    return result.scalars().first()
+
+
+async def current(db, audit_in, current_user):
+    return await audits.create_audit(db=db, audit_in=audit_in, current_user=current_user)
+
+
+async def _fixtures(count):
+    async with SessionLocal() as db:
+        user = (await db.execute(
+            select(User).options(selectinload(User.managed_coffees), selectinload(User.rights))
+            .where(User.role.in_([UserRole.ADMIN, UserRole.AUDITOR]), User.is_active.is_(True))
+            .order_by(User.id).limit(1)
+        )).scalars().first()
+        coffee_id = await db.scalar(select(Coffee.id).order_by(Coffee.id).limit(1))
+        question_ids = (await db.execute(
+            select(AuditQuestion.id).order_by(AuditQuestion.id).limit(count)
+        )).scalars().all()
+    if not user or not coffee_id or not question_ids:
+        sys.exit("Needs an active admin or auditor, a coffee and audit questions in the database")
+    choices = ("oui", "non", "n/a")
+    audit_in = schemas.AuditCreate(
+        coffee_id=coffee_id,
+        answers=[
+            schemas.AuditAnswerCreate(question_id=qid, choice=choices[i % 3], comment=f"bench {i}")
+            for i, qid in enumerate(question_ids)
+        ],
+    )
+    return user, audit_in
+
+
+async def main(args):
+    user, audit_in = await _fixtures(args.questions)
+    print(f"{args.runs} audits of {len(audit_in.answers)} answers per flow")
+    created = []
+    try:
+        for name, create in (("legacy", legacy), ("current", current)):
+            statements, timings = [], []
+            for _ in range(args.runs):
+                stats = query_stats.QueryStats()
+                token = query_stats._current_stats.set(stats)
+                try:
+                    async with SessionLocal() as db:
+                        started = time.perf_counter()
+                        audit = await create(db, audit_in, user)
+                        timings.append(time.perf_counter() - started)
+                finally:
+                    query_stats._current_stats.reset(token)
+                statements.append(stats.count)
+                created.append(audit.id)
+            print(f"  {name:8s} {statistics.mean(statements):5.1f} statements  "
+                  f"median {statistics.median(timings) * 1000:7.1f} ms  "
+                  f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:7.1f} ms")
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(Photo).where(Photo.audit_id.in_(created)))
+            await db.execute(delete(AuditAnswer).where(AuditAnswer.audit_id.in_(created)))
+            await db.execute(delete(Audit).where(Audit.id.in_(created)))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
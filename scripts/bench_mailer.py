@@ -0,0 +1,133 @@
+"""Compare report delivery with one SMTP session per email vs the pooled mailer.
+
+Starts a local stand-in SMTP server (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT; no TLS) that adds --latency-ms to every reply, the
+way a remote provider would, then sends --count emails:
+
+  per-message  aiosmtplib.send() for each email, as the report jobs used to
+               (connect + EHLO + AUTH + QUIT every time)
+  pooled       app.services.mailer.send_messages() with SMTP_POOL_SIZE sessions
+
+Usage (from the project root, with the backend environment configured):
+    python -m scripts.bench_mailer --count 300 --latency-ms 20 --pool-size 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiosmtplib  # noqa: E402
+
+from app.core import metrics  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services import mailer  # noqa: E402
+
+
+class StandInSmtpServer:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sessions = 0
+        self.messages = 0
+
+    async def _reply(self, writer, line: str):
+        await asyncio.sleep(self.latency)
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        await self._reply(writer, "220 stand-in ESMTP")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    await self._reply(writer, "250-stand-in\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+                elif verb == "HELO":
+                    await self._reply(writer, "250 stand-in")
+                elif verb == "AUTH":
+                    if command.upper().startswith("AUTH LOGIN"):
+                        await self._reply(writer, "334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await self._reply(writer, "334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    self.messages += 1
+                    await self._reply(writer, "250 2.0.0 queued")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 bye")
+                    break
+                else:   # MAIL, RCPT, RSET, NOOP
+                    await self._reply(writer, "250 OK")
+        finally:
+            writer.close()
+
+
+def _messages(count):
+    return [
+        mailer.build_message("Rapport d'audit", f"user{i}@example.com", "<p>Rapport</p>", "Rapport")
+        for i in range(count)
+    ]
+
+
+async def per_message(messages):
+    for message in messages:
+        await aiosmtplib.send(
+            message,
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            start_tls=False,
+            timeout=settings.SMTP_TIMEOUT,
+        )
+
+
+async def pooled(messages):
+    await mailer.send_messages(messages)
+    await mailer.close()
+
+
+async def main(args):
+    server = StandInSmtpServer(args.latency_ms / 1000)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    settings.SMTP_HOST = "127.0.0.1"
+    settings.SMTP_PORT = listener.sockets[0].getsockname()[1]
+    settings.SMTP_USER = settings.SMTP_USER or "bench"
+    settings.SMTP_PASSWORD = settings.SMTP_PASSWORD or "bench"
+    settings.SMTP_START_TLS = False
+    settings.SMTP_POOL_SIZE = args.pool_size
+    print(f"{args.count} emails, {args.latency_ms} ms per SMTP reply, pool size {args.pool_size}")
+
+    async with listener:
+        for name, send in (("per-message", per_message), ("pooled", pooled)):
+            if name == "per-message" and args.skip_per_message:
+                continue
+            server.sessions = server.messages = 0
+            before = metrics.EMAIL_SEND_DURATION.count()
+            started = time.perf_counter()
+            await send(_messages(args.count))
+            elapsed = time.perf_counter() - started
+            print(f"  {name:12s} {elapsed:7.2f}s  {args.count / elapsed:7.1f} emails/s  "
+                  f"{server.sessions:4d} SMTP sessions  {server.messages} delivered")
+        observed = metrics.EMAIL_SEND_DURATION.count() - before
+        print(f"  per-message latency samples recorded by the pooled mailer: {observed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--skip-per-message", action="store_true", help="only run the pooled mailer")
+    asyncio.run(main(parser.parse_args()))
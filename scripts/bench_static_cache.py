@@ -0,0 +1,106 @@
+"""Measure photo bandwidth for repeated audit views.
+
+Fetches a set of uploaded photos from a running backend the way a browser
+would on the first and on later views of an audit, and reports requests and
+bytes per view for three client behaviours:
+
+  cold        no cache: every view downloads every photo
+  revalidate  cache without freshness (what responses without Cache-Control
+              lead to): every view sends If-None-Match and gets 304 or 200
+  cache       honours Cache-Control max-age / immutable: fresh photos are
+              not requested at all
+
+Usage (from the project root):
+    python scripts/bench_static_cache.py --base-url http://localhost:8000 --views 5
+    python scripts/bench_static_cache.py --base-url http://localhost:8000 /static/uploads/ab/cd/<hash>.jpg ...
+
+Without explicit URLs, up to --limit photos found under app/static/uploads
+are used.
+"""
+import argparse
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+
+UPLOAD_DIR = "app/static/uploads"
+
+
+def _find_photos(limit):
+    urls = []
+    for dirpath, _, filenames in os.walk(UPLOAD_DIR):
+        for filename in sorted(filenames):
+            if filename.startswith(".") or "_" in os.path.splitext(filename)[0]:
+                continue   # temp files and resized variants
+            relative = os.path.relpath(os.path.join(dirpath, filename), UPLOAD_DIR).replace(os.sep, "/")
+            urls.append(f"/static/uploads/{relative}")
+            if len(urls) >= limit:
+                return urls
+    return urls
+
+
+def _fetch(url, etag=None):
+    request = urllib.request.Request(url, headers={"If-None-Match": etag} if etag else {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            return response.status, response.headers, len(body)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, e.headers, 0
+        raise
+
+
+def _max_age(headers):
+    match = re.search(r"max-age=(\d+)", headers.get("Cache-Control", ""))
+    return int(match.group(1)) if match else 0
+
+
+def run(base_url, paths, views, mode):
+    cache = {}   # url -> (etag, expires_at)
+    rows = []
+    for view in range(1, views + 1):
+        requests = transferred = 0
+        started = time.perf_counter()
+        for path in paths:
+            url = base_url.rstrip("/") + path
+            cached = cache.get(url) if mode != "cold" else None
+            if cached and mode == "cache" and cached[1] > time.time():
+                continue
+            status, headers, size = _fetch(url, cached[0] if cached else None)
+            requests += 1
+            transferred += size
+            if status == 200:
+                cache[url] = (headers.get("ETag"), time.time() + _max_age(headers))
+        rows.append((view, requests, transferred, time.perf_counter() - started))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="photo URLs relative to the base URL")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--views", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=50, help="photos to use when no paths are given")
+    args = parser.parse_args()
+
+    paths = args.paths or _find_photos(args.limit)
+    if not paths:
+        parser.error(f"no photos given and none found under {UPLOAD_DIR}")
+    print(f"{len(paths)} photos, {args.views} views, {args.base_url}")
+
+    for mode in ("cold", "revalidate", "cache"):
+        rows = run(args.base_url, paths, args.views, mode)
+        total_bytes = sum(r[2] for r in rows)
+        repeat_bytes = sum(r[2] for r in rows[1:])
+        repeat_requests = sum(r[1] for r in rows[1:])
+        print(f"\n[{mode}]")
+        for view, requests, transferred, elapsed in rows:
+            print(f"  view {view}: {requests:4d} requests {transferred / 1024:10.1f} KB {elapsed * 1000:8.1f} ms")
+        print(f"  total {total_bytes / 1024:.1f} KB, repeat views {repeat_requests} requests / "
+              f"{repeat_bytes / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
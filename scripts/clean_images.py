@@ -1,106 +1,45 @@
+"""Remove uploaded photos that no audit or audit answer references.
+
+Runs the same incremental collector as the nightly ``upload_gc`` job (see
+``app/services/upload_gc.py``), by default over the whole uploads tree.
+
+Usage (from the project root, inside the backend container):
+    python -m scripts.clean_images --dry-run
+    python -m scripts.clean_images --grace-hours 1 --max-deletes 100000
+"""
+import argparse
 import asyncio
-import json
 import os
 import sys
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine
-
-# Database configuration from environment variables
-POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
-POSTGRES_SERVER = os.getenv("POSTGRES_SERVER", "db")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
-POSTGRES_DB = os.getenv("POSTGRES_DB", "caribou")
-
-DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
-
-# Upload directory in the container
-UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/app/app/static/uploads")
-
-async def get_used_photos():
-    engine = create_async_engine(DATABASE_URL)
-    used_files = set()
 
-    try:
-        async with engine.connect() as conn:
-            # Get photos from audit_answers
-            result = await conn.execute(text("SELECT photo_url FROM audit_answers WHERE photo_url IS NOT NULL"))
-            for row in result:
-                val = row[0]
-                if not val:
-                    continue
-                try:
-                    urls = json.loads(val)
-                    if isinstance(urls, list):
-                        for u in urls:
-                            if isinstance(u, str):
-                                used_files.add(os.path.basename(u))
-                    elif isinstance(urls, str):
-                        used_files.add(os.path.basename(urls))
-                except json.JSONDecodeError:
-                    # Fallback for legacy single-string paths
-                    used_files.add(os.path.basename(val))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-            # Get photos from audits
-            result = await conn.execute(text("SELECT photo_url FROM audits WHERE photo_url IS NOT NULL"))
-            for row in result:
-                val = row[0]
-                if not val:
-                    continue
-                try:
-                    urls = json.loads(val)
-                    if isinstance(urls, list):
-                        for u in urls:
-                            if isinstance(u, str):
-                                used_files.add(os.path.basename(u))
-                    elif isinstance(urls, str):
-                        used_files.add(os.path.basename(urls))
-                except json.JSONDecodeError:
-                    used_files.add(os.path.basename(val))
+from app.services.upload_gc import collect_garbage  # noqa: E402
 
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        sys.exit(1)
-    finally:
-        await engine.dispose()
+ALL_SHARDS = 256 + 1  # hash directories + legacy top-level files
 
-    return used_files
-
-async def clean_uploads():
-    print(f"--- Starting Image Cleanup ---")
-    print(f"Checking directory: {UPLOAD_DIR}")
-    
-    if not os.path.exists(UPLOAD_DIR):
-        print(f"Error: Directory {UPLOAD_DIR} does not exist.")
-        return
-
-    used_photos = await get_used_photos()
-    print(f"Found {len(used_photos)} unique used images in database.")
-
-    all_files = os.listdir(UPLOAD_DIR)
-    deleted_count = 0
-    total_size = 0
-
-    for filename in all_files:
-        filepath = os.path.join(UPLOAD_DIR, filename)
-        
-        # Skip directories
-        if os.path.isdir(filepath):
-            continue
-
-        if filename not in used_photos:
-            try:
-                file_size = os.path.getsize(filepath)
-                os.remove(filepath)
-                deleted_count += 1
-                total_size += file_size
-                print(f"Deleted unused image: {filename} ({file_size / 1024:.2f} KB)")
-            except Exception as e:
-                print(f"Failed to delete {filename}: {e}")
 
+async def clean_uploads(args):
+    print(f"--- Starting Image Cleanup{' (dry run)' if args.dry_run else ''} ---")
+    report = await collect_garbage(
+        dry_run=args.dry_run,
+        shards_per_run=args.shards or ALL_SHARDS,
+        grace_hours=args.grace_hours,
+        max_deletes=args.max_deletes,
+    )
     print(f"--- Cleanup Complete ---")
-    print(f"Deleted {deleted_count} unused images.")
-    print(f"Freed up {total_size / (1024 * 1024):.2f} MB.")
+    print(f"Scanned {report.scanned} files in {len(report.shards)} directories "
+          f"({report.kept_recent} kept as too recent).")
+    print(f"{'Would delete' if args.dry_run else 'Deleted'} {report.deleted} unused images.")
+    print(f"{'Would free' if args.dry_run else 'Freed up'} {report.bytes_freed / (1024 * 1024):.2f} MB.")
+    if report.errors:
+        print(f"{report.errors} files could not be deleted, see the logs.")
+
 
 if __name__ == "__main__":
-    asyncio.run(clean_uploads())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    parser.add_argument("--shards", type=int, default=None, help="directories to process (default: all)")
+    parser.add_argument("--grace-hours", type=float, default=None, help="skip files younger than this")
+    parser.add_argument("--max-deletes", type=int, default=None, help="stop after this many deletions")
+    asyncio.run(clean_uploads(parser.parse_args()))
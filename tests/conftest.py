@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+# Settings refuse to load without these; the tests never send mail nor sign real tokens
+for _name, _value in {
+    "SECRET_KEY": "test-secret-key",
+    "POSTGRES_PASSWORD": "test",
+    "SMTP_USER": "test",
+    "SMTP_PASSWORD": "test",
+    "EMAILS_FROM_EMAIL": "tests@example.com",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+# Tests that need PostgreSQL run against TEST_DATABASE_URL (a throwaway database)
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+QUESTIONS = 30
+
+
+@pytest.fixture
+async def database():
+    """Empty tables in the TEST_DATABASE_URL database (the test is skipped without one)."""
+    if not os.environ.get("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app.db.base import Base
+    from app.db.session import engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def fixtures(database):
+    """An admin (and its auth headers), a coffee and QUESTIONS audit questions."""
+    from app.core.security import create_access_token
+    from app.db.session import SessionLocal
+    from app.models.models import AuditCategory, AuditQuestion, Coffee, User, UserRole
+
+    async with SessionLocal() as db:
+        admin = User(email="admin@example.com", full_name="Admin", role=UserRole.ADMIN, is_active=True)
+        coffee = Coffee(name="Cafe test", location="Casablanca")
+        category = AuditCategory(name="Hygiene")
+        questions = [
+            AuditQuestion(text=f"Question {i}", weight=1 + i % 3, display_order=i, category=category)
+            for i in range(QUESTIONS)
+        ]
+        db.add_all([admin, coffee, category, *questions])
+        await db.commit()
+        return {
+            "user_id": admin.id,
+            "headers": {"Authorization": f"Bearer {create_access_token(admin.id)}"},
+            "coffee_id": coffee.id,
+            "question_ids": [q.id for q in questions],
+        }
+
+
+@pytest.fixture
+async def client(fixtures):
+    """httpx client on the app, authenticated as the fixtures' admin."""
+    httpx = pytest.importorskip("httpx")
+    from app.main import app
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test", headers=fixtures["headers"]
+    ) as client:
+        yield client
@@ -0,0 +1,52 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import deps
+from app.api.api_v1.endpoints import audits
+from app.core import admission as admission_control
+from app.models.models import UserRole
+from app.services import jobs
+
+ADMIN = SimpleNamespace(id=1, role=UserRole.ADMIN, rights=None)
+
+
+def test_rejection_message_follows_lane_and_reason():
+    export = deps.admission_rejected(admission_control.AdmissionRejected("export", "queue_full", 3))
+    assert export.status_code == 429
+    assert "exports" in export.detail
+    assert export.headers == {"Retry-After": "3"}
+
+    analytics = deps.admission_rejected(admission_control.AdmissionRejected("analytics", "timeout"))
+    assert "indicateurs" in analytics.detail
+    assert "exports" not in analytics.detail
+
+    user_limit = deps.admission_rejected(admission_control.AdmissionRejected("analytics", "user_limit"))
+    assert "Vous avez déjà" in user_limit.detail
+
+
+class _FakeDB:
+    async def execute(self, statement):
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [1, 2]))
+
+
+@asynccontextmanager
+async def _rejecting_admit(lane, user_id, route=None):
+    raise admission_control.AdmissionRejected(lane, "user_limit")
+    yield
+
+
+@pytest.mark.anyio
+async def test_pdf_zip_job_does_not_take_the_export_slot(monkeypatch):
+    monkeypatch.setattr(admission_control, "admit", _rejecting_admit)
+
+    with pytest.raises(HTTPException) as rejected:
+        await audits.export_audits_pdf_zip(db=_FakeDB(), current_user=ADMIN)
+    assert rejected.value.status_code == 429
+
+    handler = jobs._handlers["audits_pdf_zip"]
+    response = await handler(db=_FakeDB(), current_user=ADMIN, **jobs.validate_params("audits_pdf_zip", {}))
+    assert response.media_type == "application/zip"
+    await response.background()
@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.anyio
+async def test_create_audit_keeps_the_last_answer_of_a_repeated_question(client, fixtures):
+    first, second = fixtures["question_ids"][:2]
+    response = await client.post("/api/v1/audits", json={
+        "coffee_id": fixtures["coffee_id"],
+        "answers": [
+            {"question_id": first, "choice": "non"},
+            {"question_id": second, "choice": "oui"},
+            {"question_id": first, "choice": "oui", "comment": "corrigé"},
+        ],
+    })
+
+    assert response.status_code == 200, response.text
+    audit = response.json()
+    answers = {answer["question_id"]: answer for answer in audit["answers"]}
+    assert len(audit["answers"]) == 2
+    assert answers[first]["choice"] == "oui" and answers[first]["comment"] == "corrigé"
+    assert audit["score"] == 100.0
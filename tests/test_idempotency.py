@@ -0,0 +1,174 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from starlette.responses import JSONResponse
+
+from app.core import idempotency, security
+from app.core.config import settings
+from app.models.models import IdempotencyStatus
+
+PATH = f"{settings.API_V1_STR}/audits"
+
+
+class _Store:
+    """In-memory stand-in for the idempotency_keys table."""
+
+    def __init__(self):
+        self.rows = {}
+        self.released = []
+
+    async def claim(self, user_id, key, method, path, request_hash):
+        earlier = self.rows.get((user_id, key))
+        if earlier is not None:
+            return None, earlier
+        row = SimpleNamespace(
+            id=len(self.rows) + len(self.released) + 1, request_hash=request_hash,
+            status=IdempotencyStatus.IN_PROGRESS.value,
+            response_status=None, response_body=None, response_headers=None,
+        )
+        self.rows[(user_id, key)] = row
+        return row.id, None
+
+    def _by_id(self, key_id):
+        return next((k, row) for k, row in self.rows.items() if row.id == key_id)
+
+    async def complete(self, key_id, response, body):
+        _, row = self._by_id(key_id)
+        row.status = IdempotencyStatus.COMPLETED.value
+        row.response_status = response.status_code
+        row.response_body = body
+        row.response_headers = idempotency._stored_headers(response)
+
+    async def release(self, key_id):
+        key, _ = self._by_id(key_id)
+        del self.rows[key]
+        self.released.append(key_id)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = _Store()
+    monkeypatch.setattr(idempotency, "_claim", store.claim)
+    monkeypatch.setattr(idempotency, "_complete", store.complete)
+    monkeypatch.setattr(idempotency, "_release", store.release)
+    return store
+
+
+@pytest.fixture
+def endpoint():
+    """The answer of the fake POST /audits (``answer``) and how often it ran (``calls``)."""
+    return SimpleNamespace(calls=0, answer=(201, {"id": 1}))
+
+
+@pytest.fixture
+def app(endpoint):
+    app = FastAPI()
+
+    @app.post(PATH)
+    async def create_audit():
+        endpoint.calls += 1
+        status_code, content = endpoint.answer
+        return JSONResponse(content, status_code=status_code, headers={"Location": f"{PATH}/{endpoint.calls}"})
+
+    app.add_middleware(idempotency.IdempotencyMiddleware)
+    return app
+
+
+async def _post(app, body: bytes, key: str = "key-1"):
+    token = security.create_access_token(7)
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": PATH, "raw_path": PATH.encode(), "query_string": b"", "root_path": "",
+        "server": ("test", 80), "client": ("test", 1234),
+        "headers": [
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"idempotency-key", key.encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    sent = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    content = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return start["status"], headers, content
+
+
+@pytest.mark.anyio
+async def test_retry_replays_the_stored_response(app, endpoint, store):
+    status, headers, content = await _post(app, b'{"a": 1}')
+    assert status == 201
+    assert idempotency.REPLAYED_HEADER.lower() not in headers
+
+    status, replayed, replayed_content = await _post(app, b'{"a": 1}')
+    assert endpoint.calls == 1
+    assert status == 201
+    assert replayed_content == content
+    assert replayed[idempotency.REPLAYED_HEADER.lower()] == "true"
+    assert replayed["location"] == headers["location"] == f"{PATH}/1"
+    assert replayed["content-type"] == "application/json"
+    assert replayed["content-length"] == str(len(content))
+    stored = dict(json.loads(next(iter(store.rows.values())).response_headers))
+    assert "content-length" not in stored
+
+
+@pytest.mark.anyio
+async def test_retry_while_in_progress_gets_409(app, endpoint, store):
+    request_hash = hashlib.sha256(f"POST {PATH}".encode() + b"\n" + b'{"a": 1}').hexdigest()
+    await store.claim(7, "key-1", "POST", PATH, request_hash)   # the first request, still running
+
+    status, headers, _ = await _post(app, b'{"a": 1}')
+    assert status == 409
+    assert headers["retry-after"] == "1"
+    assert endpoint.calls == 0
+
+
+@pytest.mark.anyio
+async def test_same_key_with_another_payload_gets_422(app, endpoint, store):
+    await _post(app, b'{"a": 1}')
+    status, _, _ = await _post(app, b'{"a": 2}')
+    assert status == 422
+    assert endpoint.calls == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("status_code", [401, 500, 503])
+async def test_non_results_release_the_key(app, endpoint, store, status_code):
+    endpoint.answer = (status_code, {"detail": "nope"})
+    status, _, _ = await _post(app, b'{"a": 1}')
+    assert status == status_code
+    assert store.rows == {}
+    assert store.released == [1]
+
+    endpoint.answer = (201, {"id": 1})
+    status, headers, _ = await _post(app, b'{"a": 1}')
+    assert status == 201
+    assert idempotency.REPLAYED_HEADER.lower() not in headers
+    assert endpoint.calls == 2
+
+
+@pytest.mark.anyio
+async def test_business_conflict_is_stored(app, endpoint, store):
+    endpoint.answer = (409, {"detail": "Un audit existe déjà."})
+    await _post(app, b'{"a": 1}')
+    endpoint.answer = (201, {"id": 1})
+    status, headers, _ = await _post(app, b'{"a": 1}')
+    assert status == 409
+    assert headers[idempotency.REPLAYED_HEADER.lower()] == "true"
+    assert endpoint.calls == 1
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import mailer
+from scripts.bench_mailer import StandInSmtpServer
+
+
+class RejectingSmtpServer(StandInSmtpServer):
+    """Refuses RCPT for one address and/or hangs up after each message."""
+
+    def __init__(self, rejected: str = "", drop_after_message: bool = False):
+        super().__init__(latency=0)
+        self.rejected = rejected.encode()
+        self.drop_after_message = drop_after_message
+
+    async def handle(self, reader, writer):
+        await super().handle(_FilteredReader(self, reader, writer), writer)
+
+
+class _FilteredReader:
+    def __init__(self, server: RejectingSmtpServer, reader, writer):
+        self.server, self.reader, self.writer = server, reader, writer
+        self.messages = server.messages
+
+    async def readline(self) -> bytes:
+        while True:
+            if self.server.drop_after_message and self.server.messages > self.messages:
+                return b""   # no 221: the server just goes away
+            line = await self.reader.readline()
+            if self.server.rejected and line.upper().startswith(b"RCPT") and self.server.rejected in line:
+                await self.server._reply(self.writer, "550 5.1.1 mailbox unavailable")
+                continue
+            return line
+
+
+@pytest.fixture
+async def smtp_server(request, monkeypatch):
+    server = getattr(request, "param", None) or StandInSmtpServer(latency=0)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", listener.sockets[0].getsockname()[1])
+    monkeypatch.setattr(settings, "SMTP_USER", "tests")
+    monkeypatch.setattr(settings, "SMTP_PASSWORD", "tests")
+    monkeypatch.setattr(settings, "SMTP_START_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_TIMEOUT", 5)
+    async with listener:
+        yield server
+        await mailer.close()
+
+
+def _messages(count, to="user{}@example.com"):
+    return [mailer.build_message("Rapport", to.format(i), "<p>Rapport</p>", "Rapport") for i in range(count)]
+
+
+@pytest.mark.anyio
+async def test_sessions_are_reused_across_messages(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "SMTP_MAX_MESSAGES_PER_CONNECTION", 100)
+
+    errors = await mailer.send_messages(_messages(10))
+
+    assert errors == [None] * 10
+    assert smtp_server.messages == 10
+    assert smtp_server.sessions <= 2
+
+
+@pytest.mark.anyio
+async def test_sessions_are_recycled_after_max_messages(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "SMTP_MAX_MESSAGES_PER_CONNECTION", 3)
+
+    assert await mailer.send_messages(_messages(7)) == [None] * 7
+    assert smtp_server.sessions == 3
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("smtp_server", [RejectingSmtpServer(drop_after_message=True)], indirect=True)
+async def test_dropped_session_is_replaced(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "SMTP_MAX_MESSAGES_PER_CONNECTION", 100)
+
+    assert await mailer.send_messages(_messages(3)) == [None] * 3
+    assert smtp_server.messages == 3
+    assert smtp_server.sessions == 3
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("smtp_server", [RejectingSmtpServer(rejected="bad@example.com")], indirect=True)
+async def test_failures_are_reported_per_message(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "SMTP_MAX_MESSAGES_PER_CONNECTION", 100)
+    messages = _messages(2) + _messages(1, to="bad@example.com") + _messages(1)
+
+    errors = await mailer.send_messages(messages)
+
+    assert errors[:2] == [None, None] and errors[3] is None
+    assert "mailbox unavailable" in errors[2]
+    assert smtp_server.messages == 3
@@ -0,0 +1,78 @@
+import pytest
+
+from app.core import metrics
+from app.core.config import settings
+
+
+def test_counter_and_gauge_render_labelled_samples():
+    counter = metrics.Counter("test_counter_total", "A counter.", ["route"])
+    counter.inc(route="/a")
+    counter.inc(2, route="/a")
+    gauge = metrics.Gauge("test_gauge", "A gauge.", ["lane"])
+    gauge.inc(lane="export")
+    gauge.dec(lane="export")
+    gauge.inc(3, lane="export")
+
+    assert counter.value(route="/a") == 3
+    assert 'test_counter_total{route="/a"} 3' in counter.render()
+    assert 'test_gauge{lane="export"} 3' in gauge.render()
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+
+def test_gauge_function_is_read_at_scrape_time():
+    gauge = metrics.Gauge("test_lazy_gauge", "A lazy gauge.")
+    value = [1]
+    gauge.set_function(lambda: value[0])
+    value[0] = 7
+    assert gauge.render().endswith("test_lazy_gauge 7")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_duration_seconds", "A histogram.", ["kind"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, kind="x")
+
+    text = histogram.render()
+    assert 'test_duration_seconds_bucket{kind="x",le="0.1"} 1' in text
+    assert 'test_duration_seconds_bucket{kind="x",le="1"} 2' in text
+    assert 'test_duration_seconds_bucket{kind="x",le="+Inf"} 3' in text
+    assert 'test_duration_seconds_count{kind="x"} 3' in text
+    assert histogram.count(kind="x") == 3
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_escaped_total", "Escaping.", ["path"])
+    counter.inc(path='a"b\\c\nd')
+    assert 'test_escaped_total{path="a\\"b\\\\c\\nd"} 1' in counter.render()
+
+
+class TestMetricsEndpoint:
+    @pytest.fixture(autouse=True)
+    def token(self, monkeypatch):
+        monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+
+    @pytest.fixture
+    def read_metrics(self):
+        from app.main import read_metrics
+        return read_metrics
+
+    def test_serves_registry_with_token(self, read_metrics):
+        response = read_metrics(authorization="Bearer scrape-token")
+        assert response.status_code == 200
+        assert b"# TYPE http_request_duration_seconds histogram" in response.body
+
+    @pytest.mark.parametrize("authorization", [None, "", "Bearer wrong", "Basic scrape-token", "scrape-token"])
+    def test_rejects_missing_or_wrong_token(self, read_metrics, authorization):
+        response = read_metrics(authorization=authorization)
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+
+    def test_hidden_without_configured_token(self, read_metrics, monkeypatch):
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+        assert read_metrics(authorization="Bearer ").status_code == 404
+
+    def test_hidden_when_disabled(self, read_metrics, monkeypatch):
+        monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+        assert read_metrics(authorization="Bearer scrape-token").status_code == 404
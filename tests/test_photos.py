@@ -0,0 +1,77 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from starlette.requests import Request
+
+from app.api.api_v1.endpoints.photos import upload_photo
+from app.core.config import settings
+from app.models.models import UserRole
+
+BOUNDARY = "test-boundary"
+ADMIN = SimpleNamespace(role=UserRole.ADMIN, rights=None)
+
+
+def _jpeg() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), "blue").save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def _multipart(data: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="photo.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _chunked_request(body: bytes, chunk_size: int = 4096):
+    """Multipart request sent without Content-Length; also counts the chunks read."""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    state = {"read": 0}
+
+    async def receive():
+        index = state["read"]
+        state["read"] += 1
+        if index >= len(chunks):
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunks[index], "more_body": index < len(chunks) - 1}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/photos",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())],
+    }
+    return Request(scope, receive), state, len(chunks)
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)   # uploads go to ./app/static/uploads
+    (tmp_path / "app" / "static" / "uploads").mkdir(parents=True)
+
+
+@pytest.mark.anyio
+async def test_chunked_multipart_upload_is_stored():
+    request, _, _ = _chunked_request(_multipart(_jpeg()))
+
+    result = await upload_photo(request, current_user=ADMIN)
+
+    assert result["url"].startswith("/static/uploads/")
+    assert result["size"] > 0
+
+
+@pytest.mark.anyio
+async def test_chunked_multipart_upload_is_cut_off_at_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 64 * 1024)
+    request, state, total = _chunked_request(_multipart(b"\xff\xd8\xff" + b"x" * (1024 * 1024)))
+
+    with pytest.raises(HTTPException) as e:
+        await upload_photo(request, current_user=ADMIN)
+
+    assert e.value.status_code == 413
+    assert state["read"] < total / 4   # stopped reading long before the end of the body
@@ -0,0 +1,93 @@
+"""Run the endpoints that declare a query budget with QUERY_BUDGET_STRICT on.
+
+Needs a throwaway PostgreSQL database in TEST_DATABASE_URL and httpx (see
+conftest.py); skipped otherwise.  Fixtures hold
+enough answers that an N+1 pattern would blow any budget.
+"""
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_stats import QueryBudgetExceeded
+
+# Every (method, path) with a @query_budget and the case exercising it below
+BUDGETED_ROUTES = {
+    ("GET", "/api/v1/audits"),
+    ("POST", "/api/v1/audits"),
+    ("GET", "/api/v1/audits/{audit_id}"),
+    ("PUT", "/api/v1/audits/{id}"),
+    ("PATCH", "/api/v1/audits/{id}/answers"),
+    ("GET", "/api/v1/questions"),
+}
+
+
+def test_every_budgeted_route_is_exercised():
+    from app.main import app
+
+    budgeted = {
+        (method, route.path)
+        for route in app.routes
+        if getattr(getattr(route, "endpoint", None), "__query_budget__", None) is not None
+        for method in route.methods
+    }
+    assert budgeted == BUDGETED_ROUTES
+
+
+@pytest.fixture(autouse=True)
+def strict(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_STATS_ENABLED", True)
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", True)
+
+
+def _answers(question_ids, choice="oui", photos=False):
+    return [
+        {
+            "question_id": qid,
+            "choice": ("oui", "non", "n/a")[i % 3] if choice is None else choice,
+            "comment": f"Commentaire {i}",
+            "photo_data": [f"/static/uploads/answer_{qid}.jpg"] if photos else None,
+        }
+        for i, qid in enumerate(question_ids)
+    ]
+
+
+@pytest.mark.anyio
+async def test_budgeted_endpoints_stay_within_budget(client, fixtures):
+    question_ids = fixtures["question_ids"]
+    created = await client.post("/api/v1/audits", json={
+        "coffee_id": fixtures["coffee_id"],
+        "existing_photo_urls": ["/static/uploads/general.jpg"],
+        "answers": _answers(question_ids, choice=None, photos=True),
+    })
+    assert created.status_code == 200, created.text
+    audit_id = created.json()["id"]
+    await client.post("/api/v1/audits", json={"coffee_id": fixtures["coffee_id"], "answers": _answers(question_ids)})
+
+    for path in ("/api/v1/audits", f"/api/v1/audits/{audit_id}", "/api/v1/questions"):
+        response = await client.get(path)
+        assert response.status_code == 200, (path, response.text)
+
+    # Full update touching every path: changed, unchanged and removed answers, new photos
+    updated = await client.put(f"/api/v1/audits/{audit_id}", json={
+        "conclusion": "Revu",
+        "existing_photo_urls": ["/static/uploads/general2.jpg"],
+        "answers": _answers(question_ids[:10], choice="non", photos=True) + _answers(question_ids[10:-5], choice=None),
+    })
+    assert updated.status_code == 200, updated.text
+
+    patched = await client.patch(f"/api/v1/audits/{audit_id}/answers", json={
+        "answers": [
+            {"question_id": question_ids[0], "choice": "oui", "photo_data": ["/static/uploads/patched.jpg"]},
+            {"question_id": question_ids[-1], "choice": "non"},   # removed by the update: inserted again
+        ],
+    })
+    assert patched.status_code == 200, patched.text
+
+
+@pytest.mark.anyio
+async def test_strict_mode_raises_over_budget(client, monkeypatch):
+    from app.api.api_v1.endpoints import questions
+
+    monkeypatch.setattr(questions.read_questions, "__query_budget__", 1)
+    with pytest.raises(QueryBudgetExceeded):
+        await client.get("/api/v1/questions")
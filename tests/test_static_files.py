@@ -0,0 +1,40 @@
+import os
+
+from app.core.static_files import CachedStaticFiles
+from app.schemas import schemas
+
+
+def _static_dir(tmp_path):
+    uploads = tmp_path / "uploads" / "ab" / "cd"
+    uploads.mkdir(parents=True)
+    (uploads / "photo.jpg").write_bytes(b"original")
+    (uploads / "other.jpg").write_bytes(b"original")
+    (uploads / "other_thumb.jpg").write_bytes(b"thumbnail")
+    return CachedStaticFiles(directory=str(tmp_path))
+
+
+def test_missing_variant_is_served_as_the_original(tmp_path):
+    static = _static_dir(tmp_path)
+
+    full_path, stat_result = static.lookup_path("uploads/ab/cd/photo_thumb.jpg")
+    assert stat_result is not None
+    assert full_path == os.path.join(str(tmp_path), "uploads", "ab", "cd", "photo.jpg")
+
+    full_path, _ = static.lookup_path("uploads/ab/cd/other_thumb.jpg")
+    assert full_path.endswith("other_thumb.jpg")
+
+
+def test_no_fallback_for_unknown_files_or_outside_uploads(tmp_path):
+    static = _static_dir(tmp_path)
+    (tmp_path / "logo.png").write_bytes(b"logo")
+
+    assert static.lookup_path("uploads/ab/cd/missing_thumb.jpg")[1] is None
+    assert static.lookup_path("uploads/ab/cd/photo_large.jpg")[1] is None
+    assert static.lookup_path("logo_thumb.png")[1] is None
+
+
+def test_thumbnail_urls_are_built_without_the_disk():
+    answer = schemas.AuditAnswerResponse(
+        id=1, photo_url='["/static/uploads/ab/cd/a.jpg", "/static/uploads/legacy.png"]'
+    )
+    assert answer.photo_thumbnails == ["/static/uploads/ab/cd/a_thumb.jpg", "/static/uploads/legacy_thumb.png"]
@@ -0,0 +1,135 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import upload_gc
+
+OLD = time.time() - 48 * 3600
+HASH_A = "a" * 64
+HASH_B = "b" * 64
+
+
+class _Session:
+    """Stand-in for SessionLocal: ``photos`` are the (path, hash) rows of the photos table."""
+
+    def __init__(self, photos):
+        self.photos = photos
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, statement):
+        return bool(self.photos)
+
+    async def execute(self, statement):
+        return SimpleNamespace(all=lambda: list(self.photos))
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_gc, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_GC_BATCH_PAUSE_MS", 0)
+    return tmp_path
+
+
+@pytest.fixture
+def photos(monkeypatch):
+    rows = []
+    monkeypatch.setattr(upload_gc, "SessionLocal", _Session(rows))
+    return rows
+
+
+def _store(uploads, relative: str, mtime: float = OLD) -> str:
+    path = uploads / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * 10)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+@pytest.mark.anyio
+async def test_grace_period_protects_recent_files(uploads, photos):
+    old = _store(uploads, f"aa/aa/{HASH_A}.jpg")
+    recent = _store(uploads, f"bb/bb/{HASH_B}.jpg", mtime=time.time() - 3600)
+
+    report = await upload_gc.collect_garbage(grace_hours=24)
+
+    assert not os.path.exists(old)
+    assert os.path.exists(recent)
+    assert (report.deleted, report.bytes_freed, report.kept_recent) == (1, 10, 1)
+
+
+@pytest.mark.anyio
+async def test_referenced_files_and_their_variants_are_kept(uploads, photos):
+    by_path = _store(uploads, "legacy.jpg")
+    by_hash = _store(uploads, f"aa/aa/{HASH_A}.jpg")
+    variant = _store(uploads, f"aa/aa/{HASH_A}_thumb.jpg")
+    orphan_variant = _store(uploads, f"bb/bb/{HASH_B}_thumb.jpg")
+    photos.append(("/static/uploads/legacy.jpg", None))
+    # Deduplicated photo stored under another URL: its hash still references the file
+    photos.append(("/static/uploads/elsewhere.jpg", HASH_A))
+
+    report = await upload_gc.collect_garbage()
+
+    assert os.path.exists(by_path) and os.path.exists(by_hash) and os.path.exists(variant)
+    assert not os.path.exists(orphan_variant)
+    assert report.deleted == 1
+
+
+@pytest.mark.anyio
+async def test_dry_run_deletes_nothing(uploads, photos):
+    photos.append(("/static/uploads/kept.jpg", None))
+    orphan = _store(uploads, f"aa/aa/{HASH_A}.jpg")
+
+    report = await upload_gc.collect_garbage(dry_run=True)
+
+    assert os.path.exists(orphan)
+    assert report.dry_run and report.deleted == 1
+    assert not (uploads / upload_gc._CURSOR_FILE).exists()
+
+
+@pytest.mark.anyio
+async def test_max_deletes_stops_the_run(uploads, photos):
+    orphans = [_store(uploads, f"aa/aa/{i:064x}.jpg") for i in range(5)]
+
+    report = await upload_gc.collect_garbage(max_deletes=2)
+
+    assert report.deleted == 2
+    assert sum(os.path.exists(path) for path in orphans) == 3
+    assert "aa" not in report.shards   # scanned again by the next run
+
+
+@pytest.mark.anyio
+async def test_empty_photos_table_with_audit_photos_skips_the_run(uploads, monkeypatch):
+    class _NotBackfilled(_Session):
+        async def scalar(self, statement):
+            return "audits" in str(statement)
+
+    monkeypatch.setattr(upload_gc, "SessionLocal", _NotBackfilled([]))
+    orphan = _store(uploads, f"aa/aa/{HASH_A}.jpg")
+
+    report = await upload_gc.collect_garbage()
+
+    assert os.path.exists(orphan)
+    assert report.scanned == 0
+
+
+def test_delete_restores_a_file_refreshed_since_the_scan(uploads):
+    cutoff = time.time() - 24 * 3600
+    refreshed = _store(uploads, f"aa/aa/{HASH_A}.jpg", mtime=time.time())
+    orphan = _store(uploads, f"bb/bb/{HASH_B}.jpg")
+
+    deleted, freed, kept, errors = upload_gc._delete([(refreshed, 10), (orphan, 10)], cutoff)
+
+    assert (deleted, freed, kept, errors) == (1, 10, 1, 0)
+    assert os.path.exists(refreshed) and not os.path.exists(orphan)
+    assert os.listdir(uploads / "aa" / "aa") == [f"{HASH_A}.jpg"]   # no tombstone left behind